@@ -0,0 +1,176 @@
+"""Décodage vectorisé d'une trace complète en séries temporelles par signal (NumPy).
+
+Les trames sont regroupées par ID, puis chaque signal DBC est extrait par des opérations bit à bit sur
+toutes les trames de son message à la fois. Le résultat est un dictionnaire
+{nom du message: {'timestamp': tableau, nom du signal: tableau, ...}}.
+"""
+from frame_store import FLAG_REMOTE, FLAG_ERROR, PAYLOAD_SIZE, RECORD_SIZE
+from signal_decoder import signal_end_byte, signal_shift
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    # Même disposition que frame_store.RECORD ('<dIBB8s'), sans alignement.
+    RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('id', '<u4'), ('dlc', 'u1'), ('flags', 'u1'), ('payload', 'u1', (PAYLOAD_SIZE,))])
+    assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+
+def store_to_arrays(store):
+    """Copie tout l'historique d'un FrameStore (segment disque compris) dans des tableaux NumPy.
+
+    Renvoie (timestamps float64, ids uint32, flags uint8, payloads uint8 de forme (n, 8))."""
+    parts = []
+    if store.spilled and (path := store.spill_file()):
+        records = np.fromfile(path, dtype=RECORD_DTYPE, count=store.spilled)
+        parts.append((records['timestamp'], records['id'], records['flags'], records['payload']))
+    timestamps = np.frombuffer(store.timestamps, dtype=np.float64); ids = np.frombuffer(store.ids, dtype=np.uint32)
+    flags = np.frombuffer(store.flags, dtype=np.uint8); payloads = np.frombuffer(store.payloads, dtype=np.uint8).reshape(-1, PAYLOAD_SIZE)
+    for start, end in store.ring_slices():
+        parts.append((timestamps[start:end], ids[start:end], flags[start:end], payloads[start:end]))
+    return tuple(np.concatenate([part[i] for part in parts]) if parts else empty
+                 for i, empty in enumerate((np.empty(0, np.float64), np.empty(0, np.uint32), np.empty(0, np.uint8),
+                                            np.empty((0, PAYLOAD_SIZE), np.uint8))))
+
+
+def store_records(store, start=0):
+    """Enregistrements (RECORD_DTYPE) des trames [start, len(store)) d'un FrameStore, segment disque compris.
+    Seules les trames demandées sont lues : un appel pour quelques trames récentes reste bon marché."""
+    records = np.empty(max(0, len(store) - start), dtype=RECORD_DTYPE); filled = 0
+    if start < store.spilled and (path := store.spill_file()):
+        spilled = np.fromfile(path, dtype=RECORD_DTYPE, count=store.spilled - start, offset=start * RECORD_SIZE)
+        records[:len(spilled)] = spilled; filled = len(spilled)
+    if filled < len(records):
+        slots = (store._head + np.arange(start + filled - store.spilled, len(store) - store.spilled)) % store.capacity
+        records['timestamp'][filled:] = np.frombuffer(store.timestamps, dtype=np.float64)[slots]
+        records['id'][filled:] = np.frombuffer(store.ids, dtype=np.uint32)[slots]
+        records['dlc'][filled:] = np.frombuffer(store.dlcs, dtype=np.uint8)[slots]
+        records['flags'][filled:] = np.frombuffer(store.flags, dtype=np.uint8)[slots]
+        records['payload'][filled:] = np.frombuffer(store.payloads, dtype=np.uint8).reshape(-1, PAYLOAD_SIZE)[slots]
+    return records
+
+
+def snapshot_to_arrays(snapshot, progress=None, is_cancelled=None, block=65536):
+    """Comme store_to_arrays pour un FrameSnapshot, lu par blocs depuis un autre thread que celui qui
+    alimente le stockage (voir FrameSnapshot). 'progress(trames lues)' et 'is_cancelled()' sont appelés à
+    chaque bloc. Renvoie None si annulé ; ValueError si le stockage est vidé pendant la lecture."""
+    store = snapshot.store; n = len(snapshot)
+    timestamps = np.empty(n, np.float64); ids = np.empty(n, np.uint32); flags = np.empty(n, np.uint8)
+    payloads = np.empty((n, PAYLOAD_SIZE), np.uint8)
+    index = 0
+    while index < n:
+        count = min(block, n - index); state = snapshot.state(); _, spilled, head = state
+        if index < spilled:
+            count = min(count, spilled - index)
+            reader = snapshot.spill_reader(); reader.seek(index * RECORD_SIZE)
+            records = np.frombuffer(reader.read(count * RECORD_SIZE), dtype=RECORD_DTYPE)
+            if len(records) != count: raise ValueError("Segment de débordement tronqué.")
+            columns = (records['timestamp'], records['id'], records['flags'], records['payload'])
+        else:
+            slot = (head + index - spilled) % store.capacity; count = min(count, store.capacity - slot)
+            columns = (np.frombuffer(store.timestamps, np.float64, count, slot * 8).copy(),
+                       np.frombuffer(store.ids, np.uint32, count, slot * 4).copy(),
+                       np.frombuffer(store.flags, np.uint8, count, slot).copy(),
+                       np.frombuffer(store.payloads, np.uint8, count * PAYLOAD_SIZE, slot * PAYLOAD_SIZE).reshape(-1, PAYLOAD_SIZE).copy())
+            # Slots libérés par un déversement pendant la copie : le bloc est relu sur disque.
+            if store._state is not state: continue
+        snapshot.state()
+        for target, values in zip((timestamps, ids, flags, payloads), columns): target[index:index + count] = values
+        index += count
+        if progress: progress(index)
+        if is_cancelled and is_cancelled(): return None
+    return timestamps, ids, flags, payloads
+
+
+def _extract(signal, big, little):
+    """Valeurs physiques (float64) d'un signal pour toutes les trames d'un message."""
+    source = big if signal.byte_order == 'big_endian' else little
+    raw = (source >> np.uint64(signal_shift(signal, PAYLOAD_SIZE))) & np.uint64((1 << signal.length) - 1)
+    if signal.is_float:
+        with np.errstate(invalid='ignore'): # Motifs NaN quelconques dans les trames brutes
+            values = raw.astype(np.uint32).view(np.float32).astype(np.float64) if signal.length == 32 else raw.view(np.float64)
+    elif signal.is_signed:
+        sign_bit = np.uint64(1 << (signal.length - 1))
+        values = ((raw ^ sign_bit) - sign_bit).view(np.int64).astype(np.float64)
+    else:
+        values = raw.astype(np.float64)
+    if signal.scale != 1: values = values * signal.scale
+    if signal.offset != 0: values = values + signal.offset
+    return raw, values
+
+
+def decode_message(message, timestamps, payloads):
+    """Décode toutes les trames (payloads (n, 8) uint8) d'un message cantools. Les signaux multiplexés
+    inactifs valent NaN ; les signaux qui dépassent 8 octets sont ignorés."""
+    payloads = np.ascontiguousarray(payloads, dtype=np.uint8)
+    big = payloads.view('>u8').ravel().astype(np.uint64); little = payloads.view('<u8').ravel().astype(np.uint64)
+    by_name = {signal.name: signal for signal in message.signals}
+
+    def depth(signal):
+        level = 0
+        while signal.multiplexer_signal in by_name: signal = by_name[signal.multiplexer_signal]; level += 1
+        return level
+    columns = {'timestamp': timestamps}; selectors = {}
+    for signal in sorted(message.signals, key=depth):
+        if signal_end_byte(signal) > PAYLOAD_SIZE: continue
+        raw, values = _extract(signal, big, little)
+        active = None
+        if signal.multiplexer_signal in selectors and signal.multiplexer_ids:
+            selector_raw, selector_active = selectors[signal.multiplexer_signal]
+            active = np.isin(selector_raw, np.array(signal.multiplexer_ids, dtype=np.uint64))
+            if selector_active is not None: active &= selector_active
+            values[~active] = np.nan
+        if signal.is_multiplexer: selectors[signal.name] = (raw, active)
+        columns[signal.name] = values
+    return columns
+
+
+def decode_trace(timestamps, ids, payloads, db, flags=None):
+    """Décode une trace complète avec la base cantools 'db'. Les trames distantes et d'erreur sont ignorées."""
+    messages = {message.frame_id: message for message in db.messages} # La dernière définition l'emporte, comme cantools.
+    if flags is not None and len(flags):
+        keep = (flags & (FLAG_REMOTE | FLAG_ERROR)) == 0
+        timestamps, ids, payloads = timestamps[keep], ids[keep], payloads[keep]
+    # Tri stable : les trames d'un même ID restent dans l'ordre chronologique.
+    order = np.argsort(ids, kind='stable')
+    unique_ids, starts = np.unique(ids[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    decoded = {}
+    for frame_id, start, end in zip(unique_ids.tolist(), starts, ends):
+        if (message := messages.get(frame_id)) is None: continue
+        rows = order[start:end]
+        decoded[message.name] = decode_message(message, timestamps[rows], payloads[rows])
+    return decoded
+
+
+def decode_store(store, db):
+    """Décode tout le contenu d'un FrameStore."""
+    timestamps, ids, flags, payloads = store_to_arrays(store)
+    return decode_trace(timestamps, ids, payloads, db, flags)
+
+
+def save_npz(path, decoded):
+    """Enregistre les séries décodées dans une archive NumPy, une entrée 'MESSAGE.SIGNAL' par colonne."""
+    np.savez_compressed(path, **{f"{message}.{column}": values for message, columns in decoded.items() for column, values in columns.items()})
+
+
+if __name__ == "__main__":
+    # Banc d'essai : décodage vectorisé d'une trace synthétique comparé à une boucle cantools.
+    import sys, time
+    import cantools
+    db = cantools.database.load_file(sys.argv[1] if len(sys.argv) > 1 else "DBC_Total_Final.dbc", strict=False)
+    rng = np.random.default_rng(0); n = 2_000_000
+    frame_ids = np.array([message.frame_id for message in db.messages], dtype=np.uint32)
+    ids = frame_ids[rng.integers(0, len(frame_ids), n)]
+    timestamps = np.cumsum(rng.uniform(0.0001, 0.0003, n)); payloads = rng.integers(0, 256, (n, PAYLOAD_SIZE), dtype=np.uint8)
+    start = time.perf_counter(); decoded = decode_trace(timestamps, ids, payloads, db)
+    elapsed = time.perf_counter() - start
+    print(f"numpy   : {n:,} trames, {sum(len(c) - 1 for c in decoded.values())} signaux en {elapsed:.2f} s ({n / elapsed:,.0f} trames/s)")
+    sample = 20000; start = time.perf_counter()
+    for frame_id, payload in zip(ids[:sample].tolist(), payloads[:sample]):
+        try: db.decode_message(frame_id, payload.tobytes(), decode_choices=False)
+        except Exception: pass
+    rate = sample / (time.perf_counter() - start)
+    print(f"cantools: {rate:,.0f} trames/s, soit {n / rate:.0f} s estimées pour {n:,} trames")
@@ -0,0 +1,281 @@
+"""Statistiques de réception en continu : par ID (période min/moy/max, gigue, débit lissé, changements de
+DLC, cycles manqués d'après le DBC) et charge du bus.
+
+Chaque ID reçoit à sa première trame un emplacement dans des tableaux préalloués (array) ; une trame ne
+coûte ensuite qu'une recherche d'emplacement et quelques affectations, sans allocation de dictionnaire.
+La charge du bus compte la longueur exacte de chaque trame sur la ligne, bits de bourrage compris : le
+bourrage est suivi par un automate octet par octet (tables précalculées), le CRC-15 de même, et la partie
+en-tête (ID, RTR, DLC) est mise en cache par emplacement. Trames CAN classiques ; aucun import Qt."""
+import math
+from array import array
+
+RATE_TIME_CONSTANT = 1.0        # Constante de temps du débit lissé (s)
+INITIAL_CAPACITY = 256          # Emplacements préalloués, doublés au besoin
+CRC15_POLYNOMIAL = 0x4599
+FRAME_TAIL_BITS = 13            # Délimiteur CRC, ACK, délimiteur ACK, EOF (7), intertrame (3) : non bourrés
+
+
+def _stuff_tables(width):
+    """Automate de bourrage : état = dernier bit * 5 + (longueur de la série - 1). Pour chaque état et chaque
+    valeur de 'width' bits (bit de poids fort en premier) : bits de bourrage ajoutés * 16 + nouvel état."""
+    table = array('B', bytes(10 << width))
+    for state in range(10):
+        if state % 5 == 4: continue         # Série de 5 : toujours interrompue par un bit de bourrage
+        for value in range(1 << width):
+            last, run = divmod(state, 5); run += 1; stuffed = 0
+            for shift in range(width - 1, -1, -1):
+                bit = value >> shift & 1
+                if bit == last: run += 1
+                else: last = bit; run = 1
+                # Après cinq bits identiques, un bit inverse est inséré et entame la série suivante.
+                if run == 5: stuffed += 1; last ^= 1; run = 1
+            table[state << width | value] = stuffed << 4 | (last * 5 + run - 1)
+    return table
+
+
+def _crc15_table():
+    table = array('H', bytes(512))
+    for value in range(256):
+        crc = 0
+        for shift in range(7, -1, -1):
+            feedback = (value >> shift & 1) ^ (crc >> 14); crc = (crc << 1) & 0x7FFF
+            if feedback: crc ^= CRC15_POLYNOMIAL
+        table[value] = crc
+    return table
+
+
+def _wide_tables():
+    """Tables 16 bits composées des tables 8 bits : deux octets de données par recherche."""
+    stuff = []
+    for state in range(10):
+        for high in range(256):
+            entry = STUFF_8[state << 8 | high]; next_state = entry & 0x0F
+            # Octet bas traité depuis l'état atteint ; les bourrages de l'octet haut s'ajoutent à chaque entrée.
+            stuff.append(STUFF_8[next_state << 8:(next_state << 8) + 256].tobytes().translate(bytes((b + (entry & 0xF0)) & 0xFF for b in range(256))))
+    crc = array('H', bytes(2 << 16))
+    for high in range(256):
+        partial = CRC15[high]; top = partial >> 7; shifted = (partial << 8) & 0x7FFF
+        for low in range(256): crc[high << 8 | low] = CRC15[top ^ low] ^ shifted
+    return b"".join(stuff), crc
+
+
+STUFF_8 = _stuff_tables(8)
+STUFF_7 = _stuff_tables(7)
+CRC15 = _crc15_table()
+STUFF_16, CRC15_16 = _wide_tables()
+
+
+def _header(arbitration_id, is_extended, is_remote, dlc):
+    """Bits de l'en-tête, SOF compris. Renvoie (longueur, bits de bourrage, état de l'automate, CRC partiel)."""
+    if is_extended:
+        fields = [(0, 1), (arbitration_id >> 18, 11), (1, 1), (1, 1), (arbitration_id & 0x3FFFF, 18), (int(is_remote), 1), (0, 2), (dlc, 4)]
+    else:
+        fields = [(0, 1), (arbitration_id, 11), (int(is_remote), 1), (0, 2), (dlc, 4)]
+    length = 0; crc = 0; last = -1; run = 0; stuffed = 0
+    for value, width in fields:
+        for shift in range(width - 1, -1, -1):
+            bit = value >> shift & 1; length += 1
+            feedback = bit ^ (crc >> 14); crc = (crc << 1) & 0x7FFF
+            if feedback: crc ^= CRC15_POLYNOMIAL
+            if bit == last: run += 1
+            else: last = bit; run = 1
+            if run == 5: stuffed += 1; last ^= 1; run = 1
+    return length, stuffed, last * 5 + run - 1, crc
+
+
+def frame_bits(arbitration_id, is_extended, is_remote, data):
+    """Longueur sur la ligne d'une trame CAN classique, en bits, bourrage et intertrame compris."""
+    length, stuffed, state, crc = _header(arbitration_id, is_extended, is_remote, len(data))
+    return _tail_bits(length, stuffed, state, crc, b"" if is_remote else data)
+
+
+def _tail_bits(length, stuffed, state, crc, data):
+    """Complète la longueur de l'en-tête avec les données, le CRC et la fin de trame."""
+    size = len(data); value = int.from_bytes(data, 'big'); shift = 8 * size
+    while shift >= 16:
+        shift -= 16; word = value >> shift & 0xFFFF
+        # Registre de 15 bits : après 16 bits, le nouveau CRC ne dépend que de (crc << 1) ^ mot.
+        crc = CRC15_16[(crc << 1) ^ word]
+        entry = STUFF_16[state << 16 | word]; stuffed += entry >> 4; state = entry & 0x0F
+    if shift:
+        byte = value & 0xFF
+        crc = CRC15[(crc >> 7) ^ byte] ^ ((crc << 8) & 0x7FFF)
+        entry = STUFF_8[state << 8 | byte]; stuffed += entry >> 4; state = entry & 0x0F
+    entry = STUFF_7[state << 7 | crc >> 8]; stuffed += entry >> 4; state = entry & 0x0F
+    stuffed += STUFF_8[state << 8 | (crc & 0xFF)] >> 4
+    return length + 8 * size + 15 + stuffed + FRAME_TAIL_BITS
+
+
+class BusStatistics:
+    """Statistiques par ID et charge du bus, alimentées par lots de can.Message (update).
+
+    Les grandeurs par ID sont lues par leur emplacement : 'index[arbitration_id]' puis les tableaux publics
+    (périodes en ms). La charge se lit par bus_load(), sur l'intervalle écoulé depuis l'appel précédent."""
+    def __init__(self, bitrate=500000, cycle_times=None, rate_time_constant=RATE_TIME_CONSTANT, capacity=INITIAL_CAPACITY):
+        self.bitrate = bitrate
+        self.rate_time_constant = rate_time_constant
+        self.cycle_times = dict(cycle_times or {})      # {ID: cycle du DBC en ms}
+        self._capacity = capacity
+        self.reset()
+
+    def reset(self):
+        capacity = self._capacity
+        self.index = {}                                     # ID -> emplacement
+        self.ids = array('I')                               # Emplacement -> ID
+        self.count = array('Q', bytes(8 * capacity))
+        self.last_timestamp = array('d', bytes(8 * capacity))
+        self.period = array('d', bytes(8 * capacity))       # Dernière période (ms)
+        self.period_min = array('d', [math.inf]) * capacity
+        self.period_max = array('d', bytes(8 * capacity))
+        self.period_mean = array('d', bytes(8 * capacity))  # Moyenne et somme des carrés des écarts (Welford)
+        self.period_m2 = array('d', bytes(8 * capacity))
+        self.rate = array('d', bytes(8 * capacity))         # Débit lissé à la dernière trame (trames/s)
+        self.dlc = array('b', [-1]) * capacity
+        self.dlc_changes = array('I', bytes(4 * capacity))
+        self.cycle = array('d', bytes(8 * capacity))        # Cycle du DBC (ms), 0 si inconnu
+        self.missed = array('Q', bytes(8 * capacity))
+        self.bits = array('Q', bytes(8 * capacity))         # Bits sur la ligne, pour la part de charge de l'ID
+        # En-tête en cache : clé (DLC, RTR, étendu), longueur, bourrage, état de l'automate, CRC partiel.
+        self._header_key = array('h', [-1]) * capacity
+        self._header_length = array('B', bytes(capacity))
+        self._header_stuffed = array('B', bytes(capacity))
+        self._header_state = array('B', bytes(capacity))
+        self._header_crc = array('H', bytes(2 * capacity))
+        # Dernière charge utile et sa longueur : une trame au contenu inchangé ne se recalcule pas.
+        self._payload = [None] * capacity
+        self._payload_bits = array('H', bytes(2 * capacity))
+        self.frames = 0; self.total_bits = 0
+        self.latest = 0.0                                   # Horodatage le plus récent
+        self._window_start = None; self._window_bits = 0
+        self.peak_load = 0.0
+
+    def set_bitrate(self, bitrate):
+        self.bitrate = bitrate
+
+    def set_cycle_times(self, cycle_times):
+        """Cycles du DBC ({ID: ms}) : appliqués aux ID déjà vus et aux suivants."""
+        self.cycle_times = dict(cycle_times or {})
+        for slot, frame_id in enumerate(self.ids): self.cycle[slot] = self.cycle_times.get(frame_id) or 0.0
+
+    def _grow(self):
+        for name in ("count", "last_timestamp", "period", "period_max", "period_mean", "period_m2", "rate", "dlc_changes",
+                     "cycle", "missed", "bits", "_header_length", "_header_stuffed", "_header_state", "_header_crc", "_payload_bits"):
+            table = getattr(self, name); table.extend(array(table.typecode, bytes(table.itemsize * len(table))))
+        self.period_min.extend(array('d', [math.inf]) * len(self.period_min))
+        self.dlc.extend(array('b', [-1]) * len(self.dlc)); self._header_key.extend(array('h', [-1]) * len(self._header_key))
+        self._payload.extend([None] * len(self._payload))
+
+    def _new_slot(self, frame_id):
+        slot = len(self.ids)
+        if slot == len(self.count): self._grow()
+        self.ids.append(frame_id); self.index[frame_id] = slot
+        self.cycle[slot] = self.cycle_times.get(frame_id) or 0.0
+        return slot
+
+    def update(self, msgs):
+        """Intègre un lot de trames (ordre chronologique par ID)."""
+        index = self.index; tau = self.rate_time_constant; exp = math.exp; new_slot = self._new_slot
+        count = self.count; last_timestamp = self.last_timestamp; period_now = self.period
+        period_min = self.period_min; period_max = self.period_max; period_mean = self.period_mean; period_m2 = self.period_m2
+        rate = self.rate; dlc_of = self.dlc; dlc_changes = self.dlc_changes; cycle = self.cycle; missed = self.missed; bits_of = self.bits
+        header_key = self._header_key; payload = self._payload; payload_bits = self._payload_bits
+        batch_bits = 0
+        for msg in msgs:
+            frame_id = msg.arbitration_id; timestamp = msg.timestamp
+            slot = index.get(frame_id)
+            if slot is None: slot = new_slot(frame_id)
+            n = count[slot]
+            if n:
+                dt = timestamp - last_timestamp[slot]; period = dt * 1000.0
+                period_now[slot] = period
+                if period < period_min[slot]: period_min[slot] = period
+                if period > period_max[slot]: period_max[slot] = period
+                delta = period - period_mean[slot]; period_mean[slot] += delta / n
+                period_m2[slot] += delta * (period - period_mean[slot])
+                # Débit lissé : chaque trame ajoute 1/tau, la valeur décroît en exp(-dt/tau).
+                rate[slot] = (rate[slot] * exp(-dt / tau) if dt > 0 else rate[slot]) + 1.0 / tau
+                if cycle[slot] and period > 1.5 * cycle[slot]: missed[slot] += int(period / cycle[slot] + 0.5) - 1
+            else: rate[slot] = 1.0 / tau
+            count[slot] = n + 1; last_timestamp[slot] = timestamp
+            dlc = msg.dlc
+            if dlc != dlc_of[slot]:
+                if dlc_of[slot] >= 0: dlc_changes[slot] += 1
+                dlc_of[slot] = dlc
+            key = dlc | msg.is_remote_frame << 4 | msg.is_extended_id << 5
+            if header_key[slot] != key:
+                header_key[slot] = key; payload[slot] = None
+                (self._header_length[slot], self._header_stuffed[slot], self._header_state[slot],
+                 self._header_crc[slot]) = _header(frame_id, msg.is_extended_id, msg.is_remote_frame, min(dlc, 8))
+            data = msg.data
+            if data == payload[slot]: frame_bits = payload_bits[slot]
+            else:
+                frame_bits = _tail_bits(self._header_length[slot], self._header_stuffed[slot], self._header_state[slot],
+                                        self._header_crc[slot], b"" if msg.is_remote_frame else data[:8])
+                payload[slot] = data; payload_bits[slot] = frame_bits
+            bits_of[slot] += frame_bits; batch_bits += frame_bits
+        if msgs:
+            self.frames += len(msgs); self.total_bits += batch_bits; self._window_bits += batch_bits
+            self.latest = max(self.latest, msgs[-1].timestamp)
+            if self._window_start is None: self._window_start = msgs[0].timestamp
+
+    def jitter(self, slot):
+        """Écart type de la période (ms)."""
+        n = self.count[slot] - 1
+        return math.sqrt(self.period_m2[slot] / n) if n > 1 else 0.0
+
+    def rate_at(self, slot, now=None):
+        """Débit lissé (trames/s) ramené à 'now' (par défaut la trame la plus récente, tous ID confondus)."""
+        elapsed = (self.latest if now is None else now) - self.last_timestamp[slot]
+        return self.rate[slot] * math.exp(-max(0.0, elapsed) / self.rate_time_constant)
+
+    def bus_load(self, now):
+        """Charge du bus (%) depuis l'appel précédent ; 'now' dans la même base de temps que les horodatages."""
+        if self._window_start is None: return 0.0
+        elapsed = now - self._window_start
+        if elapsed <= 0: return 0.0
+        load = min(100.0, self._window_bits * 100.0 / (self.bitrate * elapsed))
+        self._window_start = now; self._window_bits = 0
+        self.peak_load = max(self.peak_load, load)
+        return load
+
+    def summary(self, frame_id):
+        """Statistiques d'un ID sous forme de dictionnaire (affichage, export), None si l'ID n'a pas été vu."""
+        slot = self.index.get(frame_id)
+        if slot is None: return None
+        return {'count': self.count[slot], 'period': self.period[slot], 'min': self.period_min[slot] if self.count[slot] > 1 else 0.0,
+                'avg': self.period_mean[slot], 'max': self.period_max[slot], 'jitter': self.jitter(slot), 'rate': self.rate_at(slot),
+                'dlc_changes': self.dlc_changes[slot], 'cycle': self.cycle[slot], 'missed': self.missed[slot],
+                'share': self.bits[slot] * 100.0 / self.total_bits if self.total_bits else 0.0}
+
+
+if __name__ == "__main__":
+    # Banc d'essai : coût par trame comparé à la mise à jour du cache Monitor à dictionnaires
+    # (la longueur des trames est vérifiée bit à bit dans tests/test_bus_stats.py).
+    import random, time
+    import can
+    rng = random.Random(0)
+    print(f"longueurs : 8 octets à zéro {frame_bits(0, False, False, bytes(8))} bits, maximum théorique 11 bits : 135")
+
+    ids = rng.sample(range(0x800), 100)
+    msgs = [can.Message(timestamp=k * 0.0005, arbitration_id=ids[k % 100], is_extended_id=False,
+                        data=bytes(rng.randrange(256) for _ in range(8))) for k in range(200_000)]
+    cache = {}
+
+    def legacy(msg):
+        msg_id = msg.arbitration_id; new_data = bytes(msg.data)
+        if msg_id in cache:
+            entry = cache[msg_id]
+            entry['changed'] = new_data != entry.get('data', b'')
+            entry['period'] = (msg.timestamp - entry['last_ts']) * 1000; entry['last_ts'] = msg.timestamp
+            entry['data'] = new_data; entry['count'] += 1; entry['dlc'] = msg.dlc
+        else: cache[msg_id] = {'dlc': msg.dlc, 'data': new_data, 'count': 1, 'last_ts': msg.timestamp, 'period': 0.0, 'changed': True}
+    start = time.perf_counter()
+    for msg in msgs: legacy(msg)
+    legacy_elapsed = time.perf_counter() - start
+    stats = BusStatistics(500000, {frame_id: 50.0 for frame_id in ids})
+    start = time.perf_counter()
+    for k in range(0, len(msgs), 256): stats.update(msgs[k:k + 256])
+    elapsed = time.perf_counter() - start
+    print(f"cache Monitor à dictionnaires (période, compteur) : {legacy_elapsed / len(msgs) * 1e9:5.0f} ns/trame")
+    print(f"BusStatistics (statistiques complètes, charge)     : {elapsed / len(msgs) * 1e9:5.0f} ns/trame")
+    print(f"charge : {stats.bus_load(msgs[-1].timestamp):.1f} % à 2000 trames/s sur 500 kbit/s ; ID {ids[0]:X} : {stats.summary(ids[0])}")
@@ -1,22 +1,28 @@
-import sys, csv, time
+import sys, os, csv, time, itertools
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
-                             QTableWidgetItem, QHeaderView, QMenuBar, QMenu, QFileDialog,
+                             QTableWidgetItem, QTableView, QAbstractItemView, QHeaderView, QMenuBar, QMenu, QFileDialog,
                              QMessageBox, QLineEdit, QPushButton, QCheckBox,
-                             QSplitter, QStatusBar, QLabel, QGroupBox, QGridLayout, QComboBox)
+                             QSplitter, QStatusBar, QLabel, QGroupBox, QGridLayout, QComboBox, QApplication, QInputDialog, QProgressDialog)
 from PyQt6.QtCore import Qt, QTimer, QRegularExpression
-from PyQt6.QtGui import QAction, QIntValidator, QRegularExpressionValidator , QBrush, QColor
-from can_worker import CanWorker
-from dialogs import ConnectDialog, SettingsDialog, FilterDialog
+from PyQt6.QtGui import QAction, QIntValidator, QRegularExpressionValidator
+from can_worker import CanWorker, CompiledMessage
+from tx_scheduler import TxScheduler
+from trace_replay import TraceReplayer
+from dialogs import ConnectDialog, SettingsDialog, FilterDialog, ReplayDialog
+from frame_store import FrameStore
+from trace_log import TraceWriter, TraceReader, TRACE_SUFFIX
+from trace_jobs import TraceConversionJob, SignalExportJob
+from trace_cache import TraceCache
+from hw_filter import offload_software_filter
+from bus_stats import BusStatistics
+import bulk_decoder
+from rx_models import TracerTableModel, MonitorTableModel, SignalTableModel, TraceFileModel
 import can
 
 # --- DBC ---
-from dbc_manager import DBCManager
+from dbc_manager import DBCManager, UNKNOWN_MESSAGE
 
-class NumericTableWidgetItem(QTableWidgetItem):
-    """ Widget d'item de tableau pour permettre un tri numérique correct. """
-    def __lt__(self, other):
-        try: return float(self.text()) < float(other.text())
-        except (ValueError, TypeError): return super().__lt__(other)
+MONITOR_REFRESH_MS = 25    # Période de rafraîchissement de la vue Monitor (40 Hz), indépendante du débit de trames
 
 class SelectAllLineEdit(QLineEdit):
     """ QLineEdit qui sélectionne tout son contenu lorsqu'il reçoit le focus. """
@@ -44,33 +50,49 @@ class CanLabGUI(QMainWindow):
         
         self.TX_MODE_ROLE = Qt.ItemDataRole.UserRole
         self.TRIGGER_ID_ROLE = Qt.ItemDataRole.UserRole + 1
+        self.RTR_ROLE = Qt.ItemDataRole.UserRole + 2
+        self.TX_KEY_ROLE = Qt.ItemDataRole.UserRole + 3   # Clé de la ligne dans l'ordonnanceur, stable quand des lignes sont supprimées
 
         # --- DBC ---
         self.dbc_manager = DBCManager()
 
         self.can_worker = None; self.is_monitoring = True
-        self.settings = {"can_device": "arduino_serial", "can_baudrate": 500000, "com_baudrate": 921600, "listen_only": True}
+        self.settings = {"can_device": "arduino_serial", "can_baudrate": 500000, "com_baudrate": 921600, "listen_only": True,
+                         "rx_batch_interval_ms": 20, "rx_batch_max": 256, "rx_memory_cap_mb": 64,
+                         "serial_framing": "auto", "hw_filter_slots": 4}
         self.can_filters = []; 
-        self.tx_periodic_timers = {}; self.start_time = 0
-        self.monitor_data_cache = {}; self.tracer_data_cache = [] 
-        self.monitor_id_to_row = {} 
-        self.trace_save_file = None; self.trace_save_buffer = []; self.tx_save_file = None; self.tx_save_buffer = []
-        self.save_timer = QTimer(self); self.save_timer.timeout.connect(self._flush_save_buffers)
+        self.tx_scheduler = None; self.start_time = 0; self._tx_keys = itertools.count()
+        self.tx_dispatch = ({}, {})
+        # Trames compilées par ligne Tx : {(ligne, force_not_rtr): CompiledMessage}, invalidées par les éditions.
+        self.tx_row_cache = {}
+        self.monitor_data_cache = {}; self.monitor_dirty = set(); self._rx_batch_time = 0.0; self.tracer_data_cache = FrameStore(self.settings["rx_memory_cap_mb"] * 1024 * 1024)
+        self.tracer_model = TracerTableModel(self.tracer_data_cache, self.dbc_manager, self)
+        # Statistiques par ID et charge du bus, en tableaux préalloués (bus_stats)
+        self.bus_stats = BusStatistics(self.settings["can_baudrate"])
+        self.monitor_model = MonitorTableModel(self.monitor_data_cache, self.dbc_manager, self.bus_stats, self)
+        self.signal_model = SignalTableModel(self)
+        self.trace_writer = None; self.trace_view = None; self.trace_replayer = None; self.conversion_job = None; self.trace_cache = TraceCache(); self.tx_save_file = None; self.tx_save_buffer = []
         
         self.mask_filters = []
         self.range_filter = {}
         self.range_filter_enabled = False
-        self.discrete_filters = []          
+        self.discrete_filters = {}          # Règles de id_filter.parse_filter_list (ID, plages, code/masque, noms DBC)
+        self.hw_offload = False; self.fp_budget = 32   # Règles logicielles couvertes par des filtres matériels (hw_filter)
         self.discrete_filter_enabled = False 
         
         self._create_actions(); self._create_menu_bar(); self._create_central_widget(); self._create_status_bar()
         self.connection_check_timer = QTimer(self); self.connection_check_timer.timeout.connect(self.check_connection_status); self.connection_check_timer.start(2000)
+        self.bus_load_timer = QTimer(self); self.bus_load_timer.timeout.connect(self._update_bus_load); self.bus_load_timer.start(1000)
+        self.monitor_refresh_timer = QTimer(self); self.monitor_refresh_timer.timeout.connect(self._refresh_monitor_view); self.monitor_refresh_timer.start(MONITOR_REFRESH_MS)
 
     def _create_actions(self):
         self.actions = { 
             "connect": QAction("Connect", self), "reset": QAction("Reset", self), "settings": QAction("Settings", self), 
             "filter": QAction("Filter", self), "quit": QAction("Quit", self),
             "save_rx_tracer": QAction("Save Rx Tracer", self), "save_rx_monitor": QAction("Save Rx Monitor", self), 
+            "export_signals": QAction("Export Decoded Signals", self),
+            "open_trace": QAction("Open Trace", self), "replay_trace": QAction("Replay Trace", self), "close_trace": QAction("Close Trace", self), "goto_time": QAction("Go to Time", self),
+            "convert_trace": QAction("Convert Trace", self),
             "load_tx_list": QAction("Load Tx List", self), "save_tx_list": QAction("Save Tx List", self),
             "load_dbc_file": QAction("Load DBC File", self),
             "load_dbc_folder": QAction("Load DBC Folder", self),
@@ -80,6 +102,11 @@ class CanLabGUI(QMainWindow):
         self.actions["settings"].triggered.connect(self.show_settings_dialog); self.actions["filter"].triggered.connect(self.show_filter_dialog)
         self.actions["trace_monitor"].triggered.connect(self.toggle_receive_mode); self.actions["quit"].triggered.connect(self.close)
         self.actions["save_rx_tracer"].triggered.connect(self.save_rx_tracer_data); self.actions["save_rx_monitor"].triggered.connect(self.save_rx_monitor_data)
+        self.actions["export_signals"].triggered.connect(self.export_decoded_signals)
+        self.actions["open_trace"].triggered.connect(self.open_trace); self.actions["close_trace"].triggered.connect(self.close_trace)
+        self.actions["goto_time"].triggered.connect(self.goto_trace_time); self.actions["replay_trace"].triggered.connect(self.toggle_replay)
+        self.actions["convert_trace"].triggered.connect(self.convert_trace)
+        self.actions["close_trace"].setEnabled(False); self.actions["goto_time"].setEnabled(False)
         self.actions["load_tx_list"].triggered.connect(self.load_tx_list); self.actions["save_tx_list"].triggered.connect(self.save_tx_list)
         self.actions["load_dbc_file"].triggered.connect(self._handle_load_dbc_file)
         self.actions["load_dbc_folder"].triggered.connect(self._handle_load_dbc_folder)
@@ -90,6 +117,13 @@ class CanLabGUI(QMainWindow):
         file_menu = menu_bar.addMenu("File")
         file_menu.addAction(self.actions["save_rx_tracer"])
         file_menu.addAction(self.actions["save_rx_monitor"])
+        file_menu.addAction(self.actions["export_signals"])
+        file_menu.addSeparator()
+        file_menu.addAction(self.actions["open_trace"])
+        file_menu.addAction(self.actions["goto_time"])
+        file_menu.addAction(self.actions["close_trace"])
+        file_menu.addAction(self.actions["replay_trace"])
+        file_menu.addAction(self.actions["convert_trace"])
         file_menu.addSeparator()
         file_menu.addAction(self.actions["load_tx_list"])
         file_menu.addAction(self.actions["save_tx_list"])
@@ -111,32 +145,66 @@ class CanLabGUI(QMainWindow):
         splitter.setSizes([500, 300]); self.setCentralWidget(splitter)
 
     def _create_receive_panel(self):
-        self.rx_group = QGroupBox(); layout = QVBoxLayout(self.rx_group); self.rx_table = QTableWidget()
-        self.rx_table.setSortingEnabled(True); self.rx_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.rx_group = QGroupBox(); layout = QVBoxLayout(self.rx_group); self.rx_table = QTableView()
+        self.rx_table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked)
         self.rx_table.doubleClicked.connect(self.copy_rx_to_tx_form)
-        self.rx_table.itemChanged.connect(self._on_rx_comment_changed)
         self.rx_table.setAlternatingRowColors(True)
-        layout.addWidget(self.rx_table); self._setup_receive_table()
+        self.rx_table.verticalHeader().setDefaultSectionSize(22)
+        # Panneau des signaux décodés (DBC) de la ligne sélectionnée.
+        self.signal_table = QTableView(); self.signal_table.setModel(self.signal_model)
+        self.signal_table.setAlternatingRowColors(True); self.signal_table.verticalHeader().setVisible(False)
+        self.signal_table.verticalHeader().setDefaultSectionSize(22); self.signal_table.setColumnWidth(0, 160)
+        self.signal_table.horizontalHeader().setStretchLastSection(True)
+        rx_splitter = QSplitter(Qt.Orientation.Horizontal); rx_splitter.addWidget(self.rx_table); rx_splitter.addWidget(self.signal_table)
+        rx_splitter.setSizes([800, 300]); layout.addWidget(rx_splitter); self._setup_receive_table()
         return self.rx_group
 
     def _setup_receive_table(self):
-        self.rx_table.setSortingEnabled(False); self.rx_table.clear(); self.rx_table.setRowCount(0); header = self.rx_table.horizontalHeader()
-        if self.is_monitoring:
+        # Changer de vue ne fait que changer de modèle : aucune ligne n'est reconstruite.
+        header = self.rx_table.horizontalHeader()
+        if self.trace_view is not None:
+            # Trace ouverte depuis un fichier : elle remplace la vue en direct jusqu'à sa fermeture.
+            self.rx_group.setTitle(f"Receive (Trace: {self.trace_view.name}, {len(self.trace_view.store)} frames)")
+            self.rx_table.setSortingEnabled(False); self.rx_table.setModel(self.trace_view)
+            header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive); self.rx_table.setColumnWidth(0, 100); self.rx_table.setColumnWidth(1, 90); self.rx_table.setColumnWidth(2, 90); self.rx_table.setColumnWidth(3, 380);
+            header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
+            header.setSortIndicator(0, Qt.SortOrder.AscendingOrder); self.rx_table.setSortingEnabled(True)
+        elif self.is_monitoring:
             self.rx_group.setTitle("Receive (Monitor)")
-            self.rx_table.setColumnCount(6)
-            self.rx_table.setHorizontalHeaderLabels(["ID", "DLC", "Data", "Period", "Count", "Comment / Message Name"])
-            header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive); self.rx_table.setColumnWidth(0,   90); self.rx_table.setColumnWidth(1, 90); self.rx_table.setColumnWidth(2, 340); self.rx_table.setColumnWidth(3, 100); self.rx_table.setColumnWidth(4, 100); 
-            header.setSectionResizeMode(5, QHeaderView.ResizeMode.Stretch)
-            self.rx_table.itemDoubleClicked.connect(self._edit_rx_comment)
+            self.rx_table.setModel(self.monitor_model)
+            header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive); self.rx_table.setColumnWidth(0,   90); self.rx_table.setColumnWidth(1, 50); self.rx_table.setColumnWidth(2, 200)
+            for column in range(3, MonitorTableModel.COMMENT_COLUMN): self.rx_table.setColumnWidth(column, 65)
+            header.setSectionResizeMode(MonitorTableModel.COMMENT_COLUMN, QHeaderView.ResizeMode.Stretch)
+            self.rx_table.setSortingEnabled(True)
         else:
             self.rx_group.setTitle("Receive (Tracer)")
-            self.rx_table.setColumnCount(5)
-            self.rx_table.setHorizontalHeaderLabels(["Time", "ID", "DLC", "Data", "Comment / Message Name"])
+            self.rx_table.setSortingEnabled(False); self.rx_table.setModel(self.tracer_model)
             header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive); self.rx_table.setColumnWidth(0, 100); self.rx_table.setColumnWidth(1, 90); self.rx_table.setColumnWidth(2, 90); self.rx_table.setColumnWidth(3, 380);
             header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
-            try: self.rx_table.itemDoubleClicked.disconnect()
-            except TypeError: pass
-        self.rx_table.setSortingEnabled(True)
+            # L'indicateur reprend le tri en cours du modèle : réactiver le tri ne recalcule rien.
+            header.setSortIndicator(self.tracer_model.sort_column, Qt.SortOrder.DescendingOrder if self.tracer_model.descending else Qt.SortOrder.AscendingOrder)
+            self.rx_table.setSortingEnabled(True)
+            self.rx_table.scrollToBottom()
+        # setModel crée un nouveau modèle de sélection : la connexion est refaite à chaque changement de vue.
+        self.rx_table.selectionModel().currentRowChanged.connect(self._on_rx_current_row_changed)
+        self.signal_model.clear()
+
+    def _on_rx_current_row_changed(self, current, previous=None):
+        """Affiche dans le panneau des signaux le message de la ligne courante (dernier contenu reçu en Monitor)."""
+        if not current.isValid(): self.signal_model.clear(); return
+        if self.trace_view is not None:
+            _, msg_id, _, _, data = self.trace_view.store.frame(self.trace_view.record_index(current.row()))
+            decoder = self.dbc_manager.lookup(msg_id).decoder
+            self.signal_model.show_message(msg_id, decoder, decoder.decode(data) if decoder else None)
+        elif self.is_monitoring:
+            msg_id = self.monitor_model.row_ids[current.row()]; entry = self.monitor_data_cache[msg_id]
+            decoder = self.dbc_manager.lookup(msg_id).decoder
+            if decoder is not None and 'signals' not in entry: entry['signals'] = decoder.decode(entry['data'])
+            self.signal_model.show_message(msg_id, decoder, entry.get('signals'))
+        else:
+            _, msg_id, _, _, data = self.tracer_data_cache.frame(self.tracer_model.record_index(current.row()))
+            decoder = self.dbc_manager.lookup(msg_id).decoder
+            self.signal_model.show_message(msg_id, decoder, decoder.decode(data) if decoder else None)
 
     def _create_transmit_panel(self):
         tx_group = QGroupBox("Transmit"); main_layout = QVBoxLayout(tx_group)
@@ -242,9 +310,47 @@ class CanLabGUI(QMainWindow):
         self._create_default_tx_row()
         
         self.tx_table.itemSelectionChanged.connect(self.copy_tx_table_to_form)
+
+        # La table de réponses Trigger/RTR n'est recompilée que lorsque la table Tx change (regroupé via un timer).
+        self.tx_dispatch_timer = QTimer(self); self.tx_dispatch_timer.setSingleShot(True)
+        self.tx_dispatch_timer.timeout.connect(self._rebuild_tx_dispatch)
+        tx_model = self.tx_table.model()
+        tx_model.dataChanged.connect(self._on_tx_table_data_changed)
+        for signal in (tx_model.rowsInserted, tx_model.rowsRemoved, tx_model.modelReset):
+            signal.connect(self.tx_dispatch_timer.start)
+        self._rebuild_tx_dispatch()
         
         return tx_group
 
+    def _on_tx_table_data_changed(self, top_left, bottom_right, roles=()):
+        # Les compteurs (colonne 4), commentaires et infobulles ne changent pas les réponses à envoyer.
+        if top_left.column() > 3: return
+        if roles and all(role == Qt.ItemDataRole.ToolTipRole for role in roles): return
+        self.tx_dispatch_timer.start()
+
+    def _rebuild_tx_dispatch(self):
+        """Compile les lignes Trigger/RTR de la table Tx en tables de correspondance ID -> réponses."""
+        trigger_map, rtr_map = {}, {}
+        for row in range(self.tx_table.rowCount()):
+            period_item = self.tx_table.item(row, 3); id_item = self.tx_table.item(row, 0)
+            if not period_item or not id_item: continue
+            tx_mode = period_item.data(self.TX_MODE_ROLE)
+            try:
+                if tx_mode == "RTR":
+                    if (response_msg := self._get_message_from_table_row(row, force_not_rtr=True)):
+                        rtr_map.setdefault(int(id_item.text(), 16), []).append((row, response_msg))
+                elif tx_mode == "Trigger":
+                    trigger_id_text = period_item.data(self.TRIGGER_ID_ROLE)
+                    if trigger_id_text and (triggered_msg := self._get_message_from_table_row(row)):
+                        trigger_map.setdefault(int(trigger_id_text, 16), []).append((row, triggered_msg))
+            except (ValueError, AttributeError): continue
+        self.tx_dispatch = (trigger_map, rtr_map)
+        if self.can_worker: self.can_worker.set_tx_dispatch(trigger_map, rtr_map)
+
+    def _on_tx_dispatched(self, counts):
+        for row, count in counts.items():
+            if row < self.tx_table.rowCount(): self._increment_tx_count(row, count)
+
     def _focus_on_dlc(self):
         self.tx_dlc.setFocus()
 
@@ -301,8 +407,18 @@ class CanLabGUI(QMainWindow):
         if mode == "Periodic": period_item.setText(self.tx_period.text())
         else: period_item.setText(mode)
         period_item.setData(self.TX_MODE_ROLE, mode); period_item.setData(self.TRIGGER_ID_ROLE, self.tx_trigger_id.text().upper())
+        period_item.setData(self.RTR_ROLE, self.tx_rtr.isChecked())
         self.tx_table.item(row, 5).setText(self.tx_comment.text())
         self.tx_table.blockSignals(False)
+        self._invalidate_tx_row(row)
+        # Une ligne déjà en émission périodique prend la nouvelle trame sans perdre sa phase.
+        if self.tx_scheduler: self.tx_scheduler.update_message(self._tx_key(row), self._get_message_from_table_row(row))
+
+    def _invalidate_tx_row(self, row):
+        self.tx_row_cache.pop((row, False), None); self.tx_row_cache.pop((row, True), None)
+
+    def _invalidate_tx_cache(self):
+        self.tx_row_cache.clear()
         
     def _create_status_bar(self):
         self.status_bar = QStatusBar()
@@ -314,6 +430,10 @@ class CanLabGUI(QMainWindow):
         separator = QLabel("    |   ")
         separator.setStyleSheet("color: red; font-weight: bold;")
 
+        self.bus_load_label = QLabel("Bus Load: -")
+        self.bus_load_label.setStyleSheet("font-weight: bold;")
+
+        self.status_bar.addPermanentWidget(self.bus_load_label)
         self.status_bar.addPermanentWidget(self.connection_status_label)
         self.status_bar.addPermanentWidget(separator)
         self.status_bar.addPermanentWidget(self.filter_status_label)
@@ -326,140 +446,80 @@ class CanLabGUI(QMainWindow):
         else:
             self.actions["trace_monitor"].setText("Tracer")
             
-        self._setup_receive_table(); self.monitor_id_to_row.clear() 
-        if self.is_monitoring: self._repopulate_monitor_from_cache()
-        else: self._repopulate_tracer_from_cache()
+        self._setup_receive_table()
 
-    def _repopulate_monitor_from_cache(self):
-        self.rx_table.setSortingEnabled(False)
-        for msg_id in sorted(self.monitor_data_cache.keys()):
-            cache_entry = self.monitor_data_cache[msg_id]
-            row = self.rx_table.rowCount(); self.rx_table.insertRow(row); self.monitor_id_to_row[msg_id] = row 
-            self.rx_table.setItem(row, 0, QTableWidgetItem(f"{msg_id:X}")); self.rx_table.setItem(row, 1, NumericTableWidgetItem(str(cache_entry['dlc'])))
-            self.rx_table.setItem(row, 2, QTableWidgetItem(cache_entry['data'])); self.rx_table.setItem(row, 3, NumericTableWidgetItem(f"{cache_entry.get('period', 0.0):.2f}"))
-            self.rx_table.setItem(row, 4, NumericTableWidgetItem(str(cache_entry['count']))); self.rx_table.setItem(row, 5, QTableWidgetItem(cache_entry.get('comment', '')))
-        self.rx_table.setSortingEnabled(True)
-
-    def _repopulate_tracer_from_cache(self):
-        self.rx_table.setSortingEnabled(False)
-        for msg, name in self.tracer_data_cache:
-            self._add_tracer_row(msg, name, scroll=False)
-        self.rx_table.scrollToBottom()
-        self.rx_table.setSortingEnabled(True)
-
-    def _update_monitor_cache(self, msg: can.Message, message_name=""):
+    def _update_monitor_cache(self, msg: can.Message, message_info=UNKNOWN_MESSAGE):
         msg_id = msg.arbitration_id
-        new_data_str = msg.data.hex(' ').upper()
+        new_data = bytes(msg.data)
+        message_name = message_info.name
         
         if msg_id in self.monitor_data_cache:
             cache_entry = self.monitor_data_cache[msg_id]
             
-            # --- HIGHLIGHT : Détecter le changement ---
-            if new_data_str != cache_entry.get('data', ''):
-                cache_entry['changed'] = True
-            else:
-                cache_entry['changed'] = False
-
-            cache_entry['period'] = (msg.timestamp - cache_entry['last_ts']) * 1000
-            cache_entry['last_ts'] = msg.timestamp
-            cache_entry['data'] = new_data_str
-            cache_entry['count'] += 1
+            # --- HIGHLIGHT : Horodatage du dernier changement, d'où la vue déduit le fondu ---
+            if new_data != cache_entry.get('data', b''):
+                cache_entry['changed_at'] = self._rx_batch_time
+                # Les signaux ne sont décodés que lorsque le contenu de la trame change.
+                if message_info.decoder is not None: cache_entry['signals'] = message_info.decoder.decode(new_data)
+
+            cache_entry['data'] = new_data
             cache_entry['dlc'] = msg.dlc
             if self.dbc_manager.is_loaded():
                 cache_entry['comment'] = message_name
         else:
             self.monitor_data_cache[msg_id] = { 
                 'dlc': msg.dlc, 
-                'data': new_data_str, 
-                'count': 1, 
-                'last_ts': msg.timestamp, 
-                'period': 0.0, 
+                'data': new_data, 
                 'comment': message_name,
                 # --- HIGHLIGHT : Marquer comme changé à la création ---
-                'changed': True 
+                'changed_at': self._rx_batch_time
             }
+            if message_info.decoder is not None: self.monitor_data_cache[msg_id]['signals'] = message_info.decoder.decode(new_data)
 
-    def _update_monitor_view(self, msg: can.Message):
-        msg_id = msg.arbitration_id
-        if msg_id not in self.monitor_data_cache: return
-        cache_entry = self.monitor_data_cache[msg_id]
-        
-        if msg_id in self.monitor_id_to_row:
-            row = self.monitor_id_to_row[msg_id]
-            self.rx_table.item(row, 1).setText(str(cache_entry['dlc']))
-            self.rx_table.item(row, 2).setText(cache_entry['data'])
-            self.rx_table.item(row, 3).setText(f"{cache_entry['period']:.2f}")
-            self.rx_table.item(row, 4).setText(str(cache_entry['count']))
-            self.rx_table.item(row, 5).setText(cache_entry.get('comment', ''))
-
-            # --- HIGHLIGHT : Appeler la surbrillance si changé ---
-            if cache_entry.get('changed', False):
-                self.highlight_row(row, 150)
-
-        else:
-            sorting_enabled = self.rx_table.isSortingEnabled()
-            self.rx_table.setSortingEnabled(False)
-            row = self.rx_table.rowCount()
-            self.rx_table.insertRow(row)
-            self.monitor_id_to_row[msg_id] = row
-            
-            self.rx_table.setItem(row, 0, QTableWidgetItem(f"{msg_id:X}"))
-            self.rx_table.setItem(row, 1, NumericTableWidgetItem(str(cache_entry['dlc'])))
-            self.rx_table.setItem(row, 2, QTableWidgetItem(cache_entry['data']))
-            self.rx_table.setItem(row, 3, NumericTableWidgetItem(f"{cache_entry['period']:.2f}"))
-            self.rx_table.setItem(row, 4, NumericTableWidgetItem(str(cache_entry['count'])))
-            self.rx_table.setItem(row, 5, QTableWidgetItem(cache_entry.get('comment', '')))
-            
-            self.rx_table.setSortingEnabled(sorting_enabled)
-            # --- HIGHLIGHT : Appeler la surbrillance pour les nouvelles lignes ---
-            self.highlight_row(row, 150)
-
-    def _add_tracer_row(self, msg: can.Message, message_name="", scroll=True):
-        relative_time = msg.timestamp - self.start_time; row = self.rx_table.rowCount(); self.rx_table.insertRow(row)
-        self.rx_table.setItem(row, 0, NumericTableWidgetItem(f"{relative_time:.3f}")); self.rx_table.setItem(row, 1, QTableWidgetItem(f"{msg.arbitration_id:X}"))
-        self.rx_table.setItem(row, 2, NumericTableWidgetItem(str(msg.dlc))); self.rx_table.setItem(row, 3, QTableWidgetItem(msg.data.hex(' ').upper())); 
-        self.rx_table.setItem(row, 4, QTableWidgetItem(message_name))
-        if scroll: self.rx_table.scrollToBottom()
-        if self.trace_save_file:
-            self.trace_save_buffer.append([f"{relative_time:.3f}", f"{msg.arbitration_id:X}", f"{msg.dlc}", msg.data.hex(' ').upper(), message_name])
+    def _refresh_monitor_view(self):
+        """Repeint la vue Monitor à cadence fixe : les ID reçus depuis le dernier passage, en une seule passe."""
+        if not self.is_monitoring or (not self.monitor_dirty and not self.monitor_model.fading): return
+        dirty = self.monitor_dirty; self.monitor_dirty = set()
+        try:
+            self.monitor_model.refresh(dirty, time.monotonic())
+            if (msg_id := self.signal_model.msg_id) in dirty:
+                self.signal_model.show_message(msg_id, self.signal_model.decoder, self.monitor_data_cache[msg_id].get('signals'))
+        except Exception as e: print(f"Display Error: {e}")
 
     def handle_can_message(self, msg: can.Message):
-        if not self.start_time: self.start_time = msg.timestamp
-        
-        for row in range(self.tx_table.rowCount()):
-            period_item = self.tx_table.item(row, 3)
-            if not period_item: continue
-            tx_mode = period_item.data(self.TX_MODE_ROLE)
-            try:
-                tx_id = int(self.tx_table.item(row, 0).text(), 16)
-                if tx_mode == "RTR" and msg.is_remote_frame and msg.arbitration_id == tx_id:
-                    response_msg = self._get_message_from_table_row(row, force_not_rtr=True)
-                    if response_msg and self.can_worker.send_message(response_msg): self._increment_tx_count(row)
-                elif tx_mode == "Trigger":
-                    trigger_id_text = period_item.data(self.TRIGGER_ID_ROLE)
-                    if trigger_id_text and msg.arbitration_id == int(trigger_id_text, 16):
-                        triggered_msg = self._get_message_from_table_row(row)
-                        if triggered_msg and self.can_worker.send_message(triggered_msg): self._increment_tx_count(row)
-            except (ValueError, AttributeError): continue
+        self.handle_can_messages([msg])
+
+    def handle_can_messages(self, msgs):
+        """Traite un lot de trames reçues du worker en une seule passe."""
+        if not msgs: return
+        scrollbar = self.rx_table.verticalScrollBar(); at_bottom = scrollbar.value() == scrollbar.maximum()
+        self._rx_batch_time = time.monotonic()
+        self.bus_stats.update(msgs)
+        for msg in msgs:
+            self._process_rx_message(msg)
+        # Les nouvelles lignes du Tracer sont publiées en un seul beginInsertRows par lot.
+        self.tracer_model.sync()
+        if self.trace_writer: self.trace_writer.write(msgs)
+        # Défilement automatique seulement dans l'ordre chronologique, où les nouvelles trames arrivent en bas.
+        if self.rx_table.model() is self.tracer_model and at_bottom and self.tracer_model.order is None and not self.tracer_model.descending: self.rx_table.scrollToBottom()
+
+    def _process_rx_message(self, msg: can.Message):
+        if not self.start_time: self.start_time = self.tracer_model.start_time = msg.timestamp
+        # Les réponses Trigger/RTR sont envoyées par le worker lui-même (voir _rebuild_tx_dispatch).
             
         # --- DBC ---
-        message_name = self.dbc_manager.get_message_name(msg.arbitration_id)
+        message_info = self.dbc_manager.lookup(msg.arbitration_id); message_name = message_info.name
             
-        self._update_monitor_cache(msg, message_name)
-        self.tracer_data_cache.append((msg, message_name))
-        
-        try:
-            if self.is_monitoring:
-                self._update_monitor_view(msg)
-            else:
-                self._add_tracer_row(msg, message_name)
-        except Exception as e: print(f"Display Error: {e}")
+        self._update_monitor_cache(msg, message_info)
+        self.tracer_data_cache.append(msg)
+        # La vue Monitor n'est repeinte que par _refresh_monitor_view.
+        self.monitor_dirty.add(msg.arbitration_id)
 
     def copy_rx_to_tx_form(self, index):
         if not index or not index.isValid(): return
-        row = index.row()
-        if self.is_monitoring: id_text, dlc_text, data_text = (self.rx_table.item(row, i).text() if self.rx_table.item(row, i) else "" for i in [0,1,2])
-        else: id_text, dlc_text, data_text = (self.rx_table.item(row, i).text() if self.rx_table.item(row, i) else "" for i in [1,2,3])
+        row = index.row(); model = self.rx_table.model()
+        columns = [0, 1, 2] if self.rx_table.model() is self.monitor_model else [1, 2, 3]
+        id_text, dlc_text, data_text = (model.index(row, i).data() or "" for i in columns)
         
         self.tx_29bit.setChecked(len(id_text) > 3)
         self.tx_id.setText(id_text); self.tx_dlc.setText(dlc_text)
@@ -479,6 +539,7 @@ class CanLabGUI(QMainWindow):
         period_item = self.tx_table.item(row, 3)
         mode = period_item.data(self.TX_MODE_ROLE) if period_item else "off"; trigger_id = period_item.data(self.TRIGGER_ID_ROLE) if period_item else ""
         self.tx_mode_combo.setCurrentText(mode); self.tx_trigger_id.setText(trigger_id)
+        self.tx_rtr.setChecked(bool(period_item.data(self.RTR_ROLE)) if period_item else False)
         if mode == "Periodic": self.tx_period.setText(period_item.text())
         else: self.tx_period.setText("0")
         self.tx_comment.setText(self.tx_table.item(row, 5).text()); data_bytes = self.tx_table.item(row, 2).text().split()
@@ -504,16 +565,25 @@ class CanLabGUI(QMainWindow):
                 baudrate=self.settings.get("can_baudrate"), 
                 com_baudrate=self.settings.get("com_baudrate"), 
                 listen_only=self.settings.get("listen_only"), 
-                can_filters=self.mask_filters,
-                range_filter={'enabled': self.range_filter_enabled, **self.range_filter},
-                discrete_filter={'enabled': self.discrete_filter_enabled, 'ids': self.discrete_filters}
+                can_filters=self._hardware_filters()[0],
+                **self._software_filter_args(),
+                batch_interval_ms=self.settings.get("rx_batch_interval_ms", 20),
+                batch_max_size=self.settings.get("rx_batch_max", 256),
+                serial_framing=self.settings.get("serial_framing", "auto")
             )
             
-            self.can_worker.message_received.connect(self.handle_can_message); self.can_worker.error_occurred.connect(self.handle_can_error)
+            self.can_worker.message_received.connect(self.handle_can_message); self.can_worker.messages_received.connect(self.handle_can_messages)
+            self.can_worker.error_occurred.connect(self.handle_can_error); self.can_worker.tx_dispatched.connect(self._on_tx_dispatched)
+            self.can_worker.set_tx_dispatch(*self.tx_dispatch)
             self.can_worker.connection_status.connect(self.update_connection_status); self.can_worker.start(); self.status_bar.showMessage(f"Connecting to {port}...", 5000)
+            # Les émissions périodiques sont cadencées par un thread dédié qui envoie directement au worker.
+            self.tx_scheduler = TxScheduler(self.can_worker.send_messages)
+            self.tx_scheduler.stats_updated.connect(self._on_tx_stats); self.tx_scheduler.start()
                 
     def disconnect_can(self):
-        self._flush_save_buffers(); self.save_timer.stop(); self.trace_save_file = None; self.tx_save_file = None
+        self._stop_trace_recording(); self.tx_save_file = None
+        if self.trace_replayer: self.trace_replayer.stop()
+        if self.tx_scheduler: self.tx_scheduler.stop(); self.tx_scheduler = None
         if self.can_worker: self.can_worker.stop(); self.can_worker = None
         self.update_connection_status(False)
 
@@ -521,18 +591,28 @@ class CanLabGUI(QMainWindow):
         self.actions["connect"].setText("Disconnect" if is_connected else "Connect")
         self.connection_status_label.setText("Connected" if is_connected else "Not Connected")
         if not is_connected:
+            # Worker arrêté (déconnexion ou erreur) : plus aucune émission ne doit lui parvenir.
+            if self.trace_replayer: self.trace_replayer.stop()
             self._stop_all_timers()
 
     def check_connection_status(self):
         if self.can_worker and not self.can_worker.isRunning(): self.disconnect_can()
+
+    def _update_bus_load(self):
+        """Charge du bus depuis la mise à jour précédente (horodatages de réception en temps hôte)."""
+        if not (self.can_worker and self.can_worker.isRunning()): self.bus_load_label.setText("Bus Load: -"); return
+        load = self.bus_stats.bus_load(time.time())
+        self.bus_load_label.setText(f"Bus Load: {load:.1f} % (peak {self.bus_stats.peak_load:.1f} %)")
         
     def handle_can_error(self, error): 
         QMessageBox.critical(self, "CAN Error", error); self.disconnect_can()
         
     def reset_all(self):
         self._stop_all_timers()
-        self.rx_table.setRowCount(0); self.monitor_id_to_row.clear(); self.monitor_data_cache.clear(); self.tracer_data_cache.clear()
-        self.start_time = 0
+        self.monitor_data_cache.clear(); self.monitor_dirty.clear(); self.tracer_data_cache.clear(self.settings.get("rx_memory_cap_mb", 64) * 1024 * 1024)
+        self.bus_stats.reset(); self.bus_stats.set_bitrate(self.settings.get("can_baudrate", 500000))
+        self.monitor_model.reset(); self.tracer_model.reset(); self.signal_model.clear()
+        self.start_time = self.tracer_model.start_time = 0
         self.clear_transmit_panel(confirm=False)
         self.status_bar.showMessage("Application reset.", 2000)
 
@@ -549,10 +629,144 @@ class CanLabGUI(QMainWindow):
 
     def save_rx_tracer_data(self):
         if not self.tracer_data_cache: QMessageBox.information(self, "Save Rx Tracer", "No trace data to save."); return
-        path, _ = QFileDialog.getSaveFileName(self, "Save Rx Tracer", "rx_tracer", "Text Files (*.txt);;CSV Files (*.csv)")
+        path, _ = QFileDialog.getSaveFileName(self, "Save Rx Tracer", "rx_tracer", "CANLab Trace (*.cltrace);;Text Files (*.txt);;CSV Files (*.csv);;Vector ASC (*.asc);;Vector BLF (*.blf)")
+        if not path: return
+        if path.lower().endswith(('.asc', '.blf', '.txt', '.csv')):
+            # Export en arrière-plan et en flux, à partir d'une copie figée de l'historique. Les noms DBC sont
+            # figés eux aussi : un rechargement du DBC pendant l'export n'affecte pas le fichier.
+            names = self.dbc_manager.message_names()
+            self._start_conversion("Save Rx Tracer", self.tracer_data_cache.snapshot(), path,
+                                   lambda count: self.status_bar.showMessage(f"{count} frames exported to {path}.", 5000),
+                                   start_time=self.start_time, name_of=lambda msg_id: names.get(msg_id, ""))
+        else:
+            # Trace binaire : l'historique (copie figée) est relu par le thread d'écriture, puis
+            # l'enregistrement continue en temps réel à sa suite.
+            if not path.endswith(TRACE_SUFFIX): path += TRACE_SUFFIX
+            self._stop_trace_recording()
+            try: self.trace_writer = TraceWriter(path, self.dbc_manager.source_hash)
+            except OSError as e: QMessageBox.critical(self, "Save Error", f"Failed to create trace file:\n{e}"); return
+            self.trace_writer.write_frames(self.tracer_data_cache.snapshot())
+            self.status_bar.showMessage(f"Rx Tracer saved to {path}. Real-time recording enabled.", 5000)
+
+    def _start_conversion(self, title, source, destination, on_completed, **options):
+        """Lance une TraceConversionJob avec une fenêtre de progression non modale. 'source' est un chemin
+        de trace ou un itérable de trames (FrameSnapshot) ; 'on_completed(count)' est appelé à la fin.
+        'options' : start_time et name_of des exports TXT/CSV."""
+        if self.conversion_job is not None:
+            if hasattr(source, 'close'): source.close()
+            QMessageBox.information(self, title, "A trace conversion is already running."); return
+        self._run_job(title, TraceConversionJob(source, destination, self.dbc_manager.source_hash, self, **options),
+                      destination, on_completed, "Trace conversion failed")
+
+    def _run_job(self, title, job, destination, on_completed, failure):
+        """Démarre un job d'arrière-plan (progress, completed, error_occurred, cancel) avec une fenêtre de
+        progression non modale. Un seul job à la fois : voir self.conversion_job."""
+        total = len(job.source) if hasattr(job.source, '__len__') else 0
+        dialog = QProgressDialog(f"Writing {os.path.basename(destination)}...", "Cancel", 0, total, self)
+        dialog.setWindowTitle(title); dialog.setMinimumDuration(300); dialog.setAutoClose(False); dialog.setAutoReset(False)
+        dialog.canceled.connect(job.cancel)
+        job.progress.connect(lambda count: dialog.setValue(min(count, total)) if total else dialog.setLabelText(f"{count} frames written..."))
+        job.completed.connect(on_completed)
+        job.error_occurred.connect(lambda message: QMessageBox.critical(self, title, f"{failure}:\n{message}"))
+        job.finished.connect(lambda: self._on_conversion_finished(job, dialog))
+        self.conversion_job = job; job.start()
+
+    def _on_conversion_finished(self, job, dialog):
+        dialog.close(); dialog.deleteLater()
+        if getattr(job, 'read_stats', {}).get('skipped'): self.status_bar.showMessage(f"{job.read_stats['skipped']} unreadable lines skipped.", 5000)
+        if self.conversion_job is job: self.conversion_job = None
+        job.deleteLater()
+
+    def convert_trace(self):
+        """Convertit un fichier de trace vers un autre format, en arrière-plan."""
+        source, _ = QFileDialog.getOpenFileName(self, "Convert Trace", "", "Trace Files (*.cltrace *.asc *.blf *.txt *.csv)")
+        if not source: return
+        destination, _ = QFileDialog.getSaveFileName(self, "Convert Trace", os.path.splitext(source)[0], "CANLab Trace (*.cltrace);;Vector ASC (*.asc);;Vector BLF (*.blf)")
+        if not destination: return
+        if not destination.lower().endswith(('.asc', '.blf', TRACE_SUFFIX)): destination += TRACE_SUFFIX
+        if os.path.abspath(destination) == os.path.abspath(source): QMessageBox.warning(self, "Convert Trace", "Source and destination are the same file."); return
+        self._start_conversion("Convert Trace", source, destination,
+                               lambda count: self.status_bar.showMessage(f"{count} frames converted to {destination}.", 5000))
+
+    def open_trace(self):
+        """Ouvre une trace enregistrée (projetée en mémoire) à la place de la vue en direct. Les journaux Vector
+        et les exports TXT/CSV du Tracer sont d'abord convertis en .cltrace dans le cache des traces (TraceCache) :
+        le dossier du journal n'est jamais modifié et un journal inchangé n'est converti qu'une fois."""
+        path, _ = QFileDialog.getOpenFileName(self, "Open Trace", "", "CANLab Trace (*.cltrace);;Vector Logs (*.asc *.blf);;Rx Tracer Export (*.txt *.csv)")
         if not path: return
-        self._save_tracer_to_file(path); self.trace_save_file = path; self.trace_save_buffer.clear(); self.save_timer.start(2000)
-        self.status_bar.showMessage(f"Rx Tracer saved to {path}. Real-time recording enabled.", 5000)
+        if not path.lower().endswith(('.txt', '.csv', '.asc', '.blf')): self._open_trace_file(path); return
+        try:
+            key = self.trace_cache.key(path)
+            if cached := self.trace_cache.lookup(key): self._open_trace_file(cached, os.path.basename(path)); return
+            pending = self.trace_cache.pending_path(key)
+        except OSError as e: QMessageBox.critical(self, "Open Trace", f"Failed to prepare the trace conversion:\n{e}"); return
+        self._start_conversion("Open Trace", path, pending, lambda count: self._open_converted_trace(path, key, pending, count))
+
+    def _open_converted_trace(self, source, key, pending, count):
+        if not count:
+            self.trace_cache.discard(pending); QMessageBox.warning(self, "Open Trace", "No frame could be read from this file."); return
+        self.status_bar.showMessage(f"{count} frames imported from {source}", 5000)
+        self._open_trace_file(self.trace_cache.commit(key, pending), os.path.basename(source))
+
+    def _open_trace_file(self, path, name=None):
+        try: reader = TraceReader(path)
+        except (OSError, ValueError) as e: QMessageBox.critical(self, "Open Trace", f"Failed to open trace:\n{e}"); return
+        if not len(reader): reader.close(); QMessageBox.information(self, "Open Trace", "The trace is empty."); return
+        self.close_trace(refresh=False)
+        self.trace_view = TraceFileModel(reader, self.dbc_manager, self, name)
+        self.actions["close_trace"].setEnabled(True); self.actions["goto_time"].setEnabled(True)
+        self._setup_receive_table()
+        if reader.header['dbc_hash'] and self.dbc_manager.source_hash and reader.header['dbc_hash'] != self.dbc_manager.source_hash:
+            self.status_bar.showMessage("Warning: this trace was recorded with a different DBC than the one loaded.", 8000)
+
+    def close_trace(self, refresh=True):
+        if self.trace_view is None: return
+        view, self.trace_view = self.trace_view, None
+        self.actions["close_trace"].setEnabled(False); self.actions["goto_time"].setEnabled(False)
+        if refresh: self._setup_receive_table()
+        view.store.close()
+
+    def goto_trace_time(self):
+        """Sélectionne la première trame de la trace ouverte à partir d'un instant donné (secondes depuis le début)."""
+        if self.trace_view is None: return
+        reader = self.trace_view.store; duration = reader.frame(-1)[0] - self.trace_view.start_time
+        seconds, ok = QInputDialog.getDouble(self, "Go to Time", "Time (s):", 0.0, 0.0, max(0.0, duration), 3)
+        if not ok: return
+        # Au-delà de la dernière trame (arrondi de la saisie), la dernière est sélectionnée.
+        row = self.trace_view.row_of_record(min(reader.find_time(self.trace_view.start_time + seconds), len(reader) - 1))
+        self.rx_table.selectRow(row); self.rx_table.scrollTo(self.trace_view.index(row, 0), QAbstractItemView.ScrollHint.PositionAtTop)
+
+    def toggle_replay(self):
+        """Démarre le rejeu d'une trace sur le bus connecté, ou l'arrête s'il est en cours."""
+        if self.trace_replayer: self.trace_replayer.stop(); return
+        if not self.can_worker or not self.can_worker.is_running():
+            QMessageBox.warning(self, "Replay Trace", "Connect to a CAN bus before replaying a trace."); return
+        dialog = ReplayDialog(self)
+        if not dialog.exec(): return
+        try: settings = dialog.get_settings()
+        except ValueError: QMessageBox.warning(self, "Replay Trace", "Invalid ID list."); return
+        if not os.path.isfile(settings['path']): QMessageBox.warning(self, "Replay Trace", "Trace file not found."); return
+        self.trace_replayer = TraceReplayer(settings['path'], self.can_worker.send_messages, settings['speed'], settings['id_filter'], parent=self)
+        self.trace_replayer.stats_updated.connect(self._on_replay_stats)
+        self.trace_replayer.error_occurred.connect(lambda error: QMessageBox.warning(self, "Replay Trace", error))
+        self.trace_replayer.finished.connect(self._on_replay_finished)
+        self.actions["replay_trace"].setText("Stop Replay"); self.trace_replayer.start()
+
+    def _on_replay_stats(self, stats):
+        self.status_bar.showMessage(f"Replay: {stats['sent']} frames sent ({stats['skipped']} filtered, {stats['errors']} errors) - "
+                                    f"timing error mean {stats['mean_ms']:.3f} ms, std {stats['std_ms']:.3f} ms, max {stats['max_ms']:.3f} ms")
+
+    def _on_replay_finished(self):
+        replayer, self.trace_replayer = self.trace_replayer, None
+        self.actions["replay_trace"].setText("Replay Trace")
+        if replayer: self._on_replay_stats(replayer.stats.as_dict()); replayer.deleteLater()
+
+    def _stop_trace_recording(self):
+        if not self.trace_writer: return
+        writer, self.trace_writer = self.trace_writer, None
+        writer.close()
+        if writer.error: QMessageBox.warning(self, "Trace Recording", f"Trace recording stopped on error:\n{writer.error}")
+        else: self.status_bar.showMessage(f"Trace recording stopped: {writer.frames_written} frames in {writer.path}", 5000)
 
     def save_rx_monitor_data(self):
         if not self.monitor_data_cache: QMessageBox.information(self, "Save Rx Monitor", "No monitor data to save."); return
@@ -560,19 +774,31 @@ class CanLabGUI(QMainWindow):
         if not path: return
         self._save_monitor_to_file(path); self.status_bar.showMessage(f"Rx Monitor saved to {path}", 3000)
 
-    def _save_tracer_to_file(self, path):
-        headers = ["Time", "ID", "DLC", "Data", "Message Name"]
-        data_to_save = []
-        for msg, name in self.tracer_data_cache:
-            data_to_save.append([f"{(msg.timestamp - self.start_time):.3f}", f"{msg.arbitration_id:X}", str(msg.dlc), msg.data.hex(' ').upper(), name])
-        self._save_data_to_file_generic(path, headers, data_to_save)
+    def export_decoded_signals(self):
+        """Décode tout le Tracer avec le DBC chargé et enregistre une série temporelle par signal (.npz)."""
+        if bulk_decoder.np is None:
+            QMessageBox.critical(self, "Bibliothèque manquante", "La bibliothèque 'numpy' est requise pour cette fonctionnalité.\n"
+                                 "Veuillez l'installer avec la commande : pip install numpy"); return
+        if not self.dbc_manager.is_loaded(): QMessageBox.information(self, "Export Decoded Signals", "Load a DBC first."); return
+        if not self.tracer_data_cache: QMessageBox.information(self, "Export Decoded Signals", "No trace data to decode."); return
+        if self.conversion_job is not None: QMessageBox.information(self, "Export Decoded Signals", "A trace conversion is already running."); return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Decoded Signals", "rx_signals", "NumPy Archive (*.npz)")
+        if not path: return
+        # Décodage en arrière-plan sur une copie figée de l'historique : la réception continue pendant l'export.
+        job = SignalExportJob(self.tracer_data_cache.snapshot(), self.dbc_manager.db, path, self)
+        self._run_job("Export Decoded Signals", job, path,
+                      lambda count: self.status_bar.showMessage(f"{count} signals of {job.message_count} messages exported to {path}", 5000),
+                      "Could not export decoded signals")
 
     def _save_monitor_to_file(self, path):
-        headers = ["ID", "DLC", "Data", "Period", "Count", "Message Name"]
+        headers = ["ID", "DLC", "Data", "Period", "Min", "Avg", "Max", "Jitter", "Rate", "Count", "DLC Changes", "Missed", "Load Share %", "Message Name"]
         data_to_save = []
         for msg_id in sorted(self.monitor_data_cache.keys()):
-            cache_entry = self.monitor_data_cache[msg_id]
-            data_to_save.append([f"{msg_id:X}", str(cache_entry['dlc']), cache_entry['data'], f"{cache_entry.get('period', 0.0):.2f}", str(cache_entry['count']), cache_entry.get('comment', '')])
+            cache_entry = self.monitor_data_cache[msg_id]; stats = self.bus_stats.summary(msg_id)
+            data_to_save.append([f"{msg_id:X}", str(cache_entry['dlc']), cache_entry['data'].hex(' ').upper()]
+                                + ([f"{stats[key]:.2f}" for key in ('period', 'min', 'avg', 'max', 'jitter', 'rate')]
+                                   + [str(stats['count']), str(stats['dlc_changes']), str(stats['missed']) if stats['cycle'] else "", f"{stats['share']:.2f}"]
+                                   if stats else [""] * 10) + [cache_entry.get('comment', '')])
         self._save_data_to_file_generic(path, headers, data_to_save)
 
     def _save_data_to_file_generic(self, path, headers, data_rows):
@@ -653,6 +879,7 @@ class CanLabGUI(QMainWindow):
                     period_item.setData(self.TX_MODE_ROLE, tx_mode)
                     period_item.setData(self.TRIGGER_ID_ROLE, trigger_id)
 
+            self._invalidate_tx_cache()
             self.tx_table.selectRow(0)
             self.copy_tx_table_to_form()
             self.status_bar.showMessage(f"File loaded: {path}", 3000)
@@ -660,21 +887,6 @@ class CanLabGUI(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Load Error", f"Failed to load or parse file:\n{e}")
             
-    def _edit_rx_comment(self, item):
-        if self.is_monitoring and item.column() == 5:
-            if not self.dbc_manager.is_loaded():
-                self.rx_table.editItem(item)
-
-    def _on_rx_comment_changed(self, item):
-        if not self.is_monitoring or item.column() != 5: return
-        if self.dbc_manager.is_loaded(): return
-        
-        row = item.row(); id_item = self.rx_table.item(row, 0)
-        if not id_item: return
-        try: msg_id = int(id_item.text(), 16)
-        except (ValueError, KeyError): return
-        if msg_id in self.monitor_data_cache: self.monitor_data_cache[msg_id]['comment'] = item.text()
-
     def show_settings_dialog(self):
         dialog = SettingsDialog(self);
         if dialog.exec(): self.settings = dialog.get_settings(); self.status_bar.showMessage("Settings updated. Reconnect to apply.", 3000)
@@ -685,16 +897,41 @@ class CanLabGUI(QMainWindow):
             filters = dialog.get_filters()
             self.mask_filters = filters.get('mask', [])
             self.range_filter = filters.get('range', {})
-            self.discrete_filters = filters.get('discrete_ids', [])
+            self.discrete_filters = filters.get('discrete_rules', {})
+            self.hw_offload = filters.get('hw_offload', False); self.fp_budget = filters.get('fp_budget', 32)
             
             self.range_filter_enabled = filters.get('range_enabled', False) and bool(self.range_filter)
-            self.discrete_filter_enabled = filters.get('discrete_enabled', False) and bool(self.discrete_filters)
+            self.discrete_filter_enabled = filters.get('discrete_enabled', False) and any(self.discrete_filters.values())
 
             mask_filter_on = filters.get('mask_enabled', False)
             filter_on = mask_filter_on or self.range_filter_enabled or self.discrete_filter_enabled
             
             self.filter_status_label.setText("Filter: On" if filter_on else "Filter: Off")
-            self.status_bar.showMessage("Filters updated. Reconnect to apply mask filters.", 3000)
+            self._apply_filters()
+
+    def _software_filter_args(self):
+        """Filtres logiciels au format de CanWorker ; les motifs de noms sont résolus avec le DBC chargé."""
+        return {'range_filter': {'enabled': self.range_filter_enabled, **self.range_filter},
+                'discrete_filter': {'enabled': self.discrete_filter_enabled, **self.discrete_filters},
+                'message_names': self.dbc_manager.message_names()}
+
+    def _hardware_filters(self):
+        """Filtres matériels : le couple saisi, sinon les règles logicielles optimisées pour le contrôleur si
+        le déport est demandé. Renvoie (filtres, faux positifs estimés ou None)."""
+        if self.mask_filters or not self.hw_offload: return self.mask_filters, None
+        args = self._software_filter_args(); names = args['message_names']
+        # Faux positifs comptés sur les ID connus (Monitor et DBC), à défaut sur tout l'espace des ID.
+        universe = set(self.monitor_data_cache) | set(names) or None
+        return offload_software_filter(args['range_filter'], args['discrete_filter'], names, self.settings.get("hw_filter_slots", 4),
+                                       self.fp_budget, universe, mcp2515=self.settings.get("can_device") == "arduino_serial")
+
+    def _apply_filters(self):
+        """Transmet les filtres au worker en cours de réception (le prédicat logiciel est recompilé)."""
+        can_filters, false_positives = self._hardware_filters()
+        if self.can_worker and self.can_worker.isRunning(): self.can_worker.update_filters(can_filters, **self._software_filter_args())
+        if false_positives is None: self.status_bar.showMessage("Filters updated.", 3000)
+        else: self.status_bar.showMessage(f"Filters updated: {len({(f['can_id'], f['can_mask']) for f in can_filters})} hardware pair(s), "
+                                          f"{false_positives} extra ID(s) left to the software filter.", 5000)
 
     def _get_message_from_form(self):
         try:
@@ -706,11 +943,16 @@ class CanLabGUI(QMainWindow):
         except Exception as e: QMessageBox.warning(self, "Invalid Message", f"Cannot create message: {e}"); return None
         
     def _get_message_from_table_row(self, row, force_not_rtr=False):
+        """Renvoie la trame compilée d'une ligne Tx ; le texte de la ligne n'est analysé qu'après une édition."""
+        if (msg := self.tx_row_cache.get((row, force_not_rtr))) is not None: return msg
+        msg = self._compile_table_row(row, force_not_rtr)
+        if msg is not None: self.tx_row_cache[(row, force_not_rtr)] = msg
+        return msg
+
+    def _compile_table_row(self, row, force_not_rtr=False):
         try:
-            is_rtr_flag = False
-            selected_rows = self.tx_table.selectionModel().selectedRows()
-            if selected_rows and selected_rows[0].row() == row:
-                is_rtr_flag = self.tx_rtr.isChecked()
+            period_item = self.tx_table.item(row, 3)
+            is_rtr_flag = bool(period_item.data(self.RTR_ROLE)) if period_item else False
             if force_not_rtr: is_rtr_flag = False
             id_text = self.tx_table.item(row, 0).text()
             msg_id = int(id_text, 16)
@@ -718,7 +960,7 @@ class CanLabGUI(QMainWindow):
             data_text = self.tx_table.item(row, 2).text().replace(" ", "")
             data = bytes.fromhex(data_text) if data_text else b''
             is_extended = len(id_text) > 3
-            return can.Message(arbitration_id=msg_id, is_extended_id=is_extended, is_remote_frame=is_rtr_flag, dlc=dlc, data=data)
+            return CompiledMessage(arbitration_id=msg_id, is_extended_id=is_extended, is_remote_frame=is_rtr_flag, dlc=dlc, data=data)
         except Exception as e: print(f"Error parsing row {row}: {e}"); return None
         
     def send_single_shot(self):
@@ -749,8 +991,10 @@ class CanLabGUI(QMainWindow):
         self.tx_table.setItem(row_position, 2, QTableWidgetItem(data_text))
         period_item = self.tx_table.item(row_position, 3); period_item.setText(period_text)
         period_item.setData(self.TX_MODE_ROLE, mode); period_item.setData(self.TRIGGER_ID_ROLE, trigger_id)
+        period_item.setData(self.RTR_ROLE, self.tx_rtr.isChecked())
         self.tx_table.setItem(row_position, 4, QTableWidgetItem("0"))
         self.tx_table.setItem(row_position, 5, QTableWidgetItem(comment_text))
+        self._invalidate_tx_row(row_position)
         self.tx_table.selectRow(row_position)
         self._update_scenario_list()
     
@@ -760,8 +1004,15 @@ class CanLabGUI(QMainWindow):
             if not self.tx_table.item(row, i): self.tx_table.setItem(row, i, QTableWidgetItem())
         if not self.tx_table.item(row, 4) or not self.tx_table.item(row, 4).text():
             self.tx_table.setItem(row, 4, QTableWidgetItem("0"))
+        if self.tx_table.item(row, 3).data(self.TX_KEY_ROLE) is None: self.tx_table.item(row, 3).setData(self.TX_KEY_ROLE, next(self._tx_keys))
         return row
 
+    def _tx_key(self, row):
+        return self.tx_table.item(row, 3).data(self.TX_KEY_ROLE)
+
+    def _tx_rows_by_key(self):
+        return {self._tx_key(row): row for row in range(self.tx_table.rowCount()) if self.tx_table.item(row, 3)}
+
     def delete_tx_message(self):
         selected_rows = self.tx_table.selectionModel().selectedRows()
         if not selected_rows: QMessageBox.information(self, "Information", "Please select one or more rows to delete."); return
@@ -771,14 +1022,16 @@ class CanLabGUI(QMainWindow):
         
         for index in sorted(selected_rows, key=lambda i: i.row(), reverse=True):
             if index.row() == 0: continue
-            if index.row() in self.tx_periodic_timers: self.tx_periodic_timers.pop(index.row()).stop()
+            if self.tx_scheduler: self.tx_scheduler.cancel(self._tx_key(index.row()))
             self.tx_table.removeRow(index.row())
+        self._invalidate_tx_cache()
         self._update_scenario_list()
     
     def delete_all_tx_messages(self):
         if self.tx_table.rowCount() <= 1: return
         self._stop_all_timers()
         while self.tx_table.rowCount() > 1: self.tx_table.removeRow(1)
+        self._invalidate_tx_cache()
         self.tx_table.selectRow(0); self.copy_tx_table_to_form()
         self.status_bar.showMessage("Transmit list cleared.", 2000)
         self._update_scenario_list()
@@ -800,18 +1053,13 @@ class CanLabGUI(QMainWindow):
             msg = self._get_message_from_table_row(row)
             if not msg: continue
             if period_ms > 0: 
-                timer = QTimer(self); timer.timeout.connect(lambda r=row: self.send_periodic_message(r))
-                timer.start(period_ms); self.tx_periodic_timers[row] = timer; periodic_count += 1
+                self.tx_scheduler.schedule(self._tx_key(row), msg, period_ms); periodic_count += 1
         
         if periodic_count > 0:
             self.status_bar.showMessage(f"{periodic_count} envoi(s) périodique(s) démarré(s).", 4000)
 
     def _stop_all_timers(self):
-        if not self.tx_periodic_timers:
-            return
-        for timer in self.tx_periodic_timers.values():
-            timer.stop()
-        self.tx_periodic_timers.clear()
+        if self.tx_scheduler: self.tx_scheduler.clear()
 
     def clear_transmit_panel(self, confirm=True):
         if confirm:
@@ -826,6 +1074,7 @@ class CanLabGUI(QMainWindow):
         
         while self.tx_table.rowCount() > 1:
             self.tx_table.removeRow(1)
+        self._invalidate_tx_cache()
 
         self._reset_transmit_form()
         self._update_tx_table_from_form()
@@ -835,27 +1084,21 @@ class CanLabGUI(QMainWindow):
         if confirm:
             self.status_bar.showMessage("Panneau de transmission réinitialisé.", 3000)
 
-    def send_periodic_message(self, row):
-        msg = self._get_message_from_table_row(row)
-        if msg and self.can_worker and self.can_worker.isRunning() and self.can_worker.send_message(msg): self._increment_tx_count(row)
-
-    def _increment_tx_count(self, row):
+    def _on_tx_stats(self, stats):
+        """Reporte les compteurs d'envoi et la gigue mesurée par l'ordonnanceur dans la table Tx."""
+        rows = self._tx_rows_by_key()
+        for key, row_stats in stats.items():
+            # Ligne supprimée depuis le relevé : ses compteurs sont ignorés.
+            if (row := rows.get(key)) is None: continue
+            self._increment_tx_count(row, row_stats['sent'])
+            if (period_item := self.tx_table.item(row, 3)):
+                period_item.setToolTip(f"Jitter: mean {row_stats['mean_ms']:.3f} ms, std {row_stats['std_ms']:.3f} ms, "
+                                       f"max {row_stats['max_ms']:.3f} ms, missed cycles {row_stats['missed']}")
+
+    def _increment_tx_count(self, row, increment=1):
         if (count_item := self.tx_table.item(row, 4)):
             current_count = int(count_item.text()) if count_item.text().isdigit() else 0
-            count_item.setText(str(current_count + 1))
-            
-    def _flush_save_buffers(self):
-        if self.trace_save_file and self.trace_save_buffer:
-            try:
-                with open(self.trace_save_file, 'a', newline='', encoding='utf-8') as f:
-                    if self.trace_save_file.endswith('.csv'):
-                        writer = csv.writer(f, delimiter=';')
-                        writer.writerows(self.trace_save_buffer)
-                    else:
-                        for buffer_line in self.trace_save_buffer:
-                            f.write("  ".join(buffer_line) + "\n")
-                self.trace_save_buffer.clear()
-            except Exception as e: print(f"Error flushing trace buffer: {e}")
+            count_item.setText(str(current_count + increment))
             
     def _update_scenario_list(self):
         self.scenario_combo.blockSignals(True)
@@ -908,13 +1151,16 @@ class CanLabGUI(QMainWindow):
             self._increment_tx_count(first_row)
             self.status_bar.showMessage(f"Scénario '{scenario_name}' [1/2]: Impulsion envoyée. Démarrage de l'environnement dans {delay_ms} ms.", 5000)
 
-            QTimer.singleShot(delay_ms, lambda: self._activate_scenario_periodic_part(scenario_name, scenario_rows))
+            # Les lignes sont retrouvées par leur clé : des lignes peuvent être supprimées pendant le délai.
+            scenario_keys = [self._tx_key(row) for row in scenario_rows]
+            QTimer.singleShot(delay_ms, lambda: self._activate_scenario_periodic_part(scenario_name, scenario_keys))
         else:
             QMessageBox.warning(self, "Erreur de Scénario", f"Impossible d'envoyer la trame d'initialisation pour le scénario '{scenario_name}'.")
 
-    def _activate_scenario_periodic_part(self, scenario_name, periodic_rows):
-        periodic_count = 0
-        for row in periodic_rows:
+    def _activate_scenario_periodic_part(self, scenario_name, periodic_keys):
+        if not self.tx_scheduler: return
+        periodic_count = 0; rows = self._tx_rows_by_key()
+        for row in (rows[key] for key in periodic_keys if key in rows):
             try:
                 if (mode_item := self.tx_table.item(row, 3)) and mode_item.data(self.TX_MODE_ROLE) == "Periodic":
                     period_ms = int(mode_item.text())
@@ -922,10 +1168,7 @@ class CanLabGUI(QMainWindow):
                         msg = self._get_message_from_table_row(row)
                         if not msg: continue
                         
-                        timer = QTimer(self)
-                        timer.timeout.connect(lambda r=row: self.send_periodic_message(r))
-                        timer.start(period_ms)
-                        self.tx_periodic_timers[row] = timer
+                        self.tx_scheduler.schedule(self._tx_key(row), msg, period_ms)
                         periodic_count += 1
             except (ValueError, AttributeError, IndexError):
                 continue
@@ -939,60 +1182,33 @@ class CanLabGUI(QMainWindow):
         file_name = self.dbc_manager.load_file(self)
         if file_name:
             self.setWindowTitle(f"CANLab - [{file_name}]")
-            self.reset_all_views()
+            self.reset_all_views(); self._apply_filters()
         elif not self.dbc_manager.is_loaded():
             self.setWindowTitle("CANLab")
             
     def _handle_load_dbc_folder(self):
-        """Gère le clic sur l'action "Load DBC FoldeR", appelle le manager et met à jour l'UI."""
-        folder_name = self.dbc_manager.load_folder(self)
+        """Gère le clic sur l'action "Load DBC FoldeR" : le manager charge le dossier en arrière-plan puis met à jour l'UI."""
+        self.dbc_manager.load_folder(self, self._on_dbc_folder_loaded)
+
+    def _on_dbc_folder_loaded(self, folder_name):
         if folder_name:
             self.setWindowTitle(f"CANLab - [DBC: {folder_name}]")
-            self.reset_all_views()
+            self.reset_all_views(); self._apply_filters()
         elif not self.dbc_manager.is_loaded():
             self.setWindowTitle("CANLab")
 
     def reset_all_views(self):
         """Rafraîchit les vues pour appliquer les informations du DBC aux données déjà reçues."""
-        if self.is_monitoring:
-            for msg_id, cache_entry in self.monitor_data_cache.items():
-                cache_entry['comment'] = self.dbc_manager.get_message_name(msg_id)
-            self.rx_table.setRowCount(0)
-            self.monitor_id_to_row.clear()
-            self._repopulate_monitor_from_cache()
-        else:
-            new_tracer_cache = []
-            # L'ancien cache du traceur contient des messages, pas des tuples
-            for msg in self.tracer_data_cache:
-                # Vérifier si l'élément est un tuple ou un objet message
-                if isinstance(msg, tuple):
-                    can_msg = msg[0]
-                else:
-                    can_msg = msg
-                name = self.dbc_manager.get_message_name(can_msg.arbitration_id)
-                new_tracer_cache.append((can_msg, name))
-            self.tracer_data_cache = new_tracer_cache
-            self.rx_table.setRowCount(0)
-            self._repopulate_tracer_from_cache()
-
-    # --- HIGHLIGHT ---
-    def highlight_row(self, row, duration_ms):
-        """Met en surbrillance une ligne en rouge pour une durée donnée."""
-        for col in range(self.rx_table.columnCount()):
-            item = self.rx_table.item(row, col)
-            if item:
-                item.setBackground(QBrush(QColor("#FFCCCC"))) # Rouge clair
-        QTimer.singleShot(duration_ms, lambda: self.unhighlight_row(row))
-
-    def unhighlight_row(self, row):
-        """Restaure la couleur de fond par défaut d'une ligne."""
-        if row < self.rx_table.rowCount():
-            # Utiliser la palette de base pour être compatible avec les thèmes et les lignes alternées
-            default_brush = self.rx_table.palette().base()
-            for col in range(self.rx_table.columnCount()):
-                item = self.rx_table.item(row, col)
-                if item:
-                    item.setBackground(default_brush)
+        for msg_id, cache_entry in self.monitor_data_cache.items():
+            cache_entry['comment'] = self.dbc_manager.get_message_name(msg_id)
+            cache_entry.pop('signals', None) # Décodés avec l'ancien DBC : redécodés à la prochaine sélection.
+        self.bus_stats.set_cycle_times(self.dbc_manager.cycle_times())
+        # Les noms du Tracer sont résolus à l'affichage : une réinitialisation des modèles suffit.
+        self.monitor_model.reset(); self.tracer_model.reset(); self.signal_model.clear()
+        if self.trace_view is not None: self.trace_view.reset()
 
     def closeEvent(self, event): 
-        self.disconnect_can(); event.accept()
\ No newline at end of file
+        self.disconnect_can(); self.tracer_data_cache.close(); self.close_trace(refresh=False)
+        if (loader := self.dbc_manager.folder_loader) is not None and loader.isRunning(): loader.cancel(); loader.wait()
+        if self.conversion_job is not None: self.conversion_job.cancel(); self.conversion_job.wait()
+        event.accept()
\ No newline at end of file
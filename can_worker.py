@@ -2,126 +2,138 @@ from PyQt6.QtCore import QThread, pyqtSignal, QMutex, QMutexLocker
 import can
 import time
 import serial
+from collections import Counter
+from capture_core import open_source, serial_command
+from id_filter import compile_software_filter
+
+class CompiledMessage(can.Message):
+    """can.Message figé à la compilation d'une ligne Tx, avec sa commande série pré-encodée."""
+    __slots__ = ("serial_command",)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.serial_command = serial_command(self)
 
 class CanWorker(QThread):
     message_received = pyqtSignal(can.Message)
+    messages_received = pyqtSignal(list)
+    tx_dispatched = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
     connection_status = pyqtSignal(bool)
 
     def __init__(self, interface, channel, baudrate, com_baudrate=115200, listen_only=False, 
-                 can_filters=None, range_filter=None, discrete_filter=None):
+                 can_filters=None, range_filter=None, discrete_filter=None,
+                 batch_interval_ms=20, batch_max_size=256, serial_framing="auto", message_names=None):
         super().__init__()
         self.mutex = QMutex()
+        self._send_mutex = QMutex() # Les envois peuvent venir du GUI et de l'ordonnanceur Tx.
         self._is_running = True
         self.interface = interface
         self.channel = channel      
         self.baudrate = baudrate    
         self.com_baudrate = com_baudrate 
         self.listen_only = listen_only
-        self.bus = None
+        self.source = None          # Source de trames de capture_core (bus python-can ou passerelle série)
+        # "auto" : tente de négocier le mode binaire avec le sketch, sinon repli sur le protocole texte.
+        self.serial_framing = serial_framing
         
-        # Initialisation directe et simplifiée des filtres avec les dictionnaires fournis par le GUI.
+        # Filtres matériels transmis au bus. Les filtres logiciels (dictionnaires du GUI, motifs de noms
+        # résolus avec 'message_names') sont compilés en un prédicat immuable, voir id_filter.
         self.can_filters = can_filters or []
-        self.range_filter = range_filter or {}
-        self.discrete_filter = discrete_filter or {}
-        
-        # L'état d'activation est maintenant directement lu depuis les dictionnaires
-        self.is_software_filter_active = self.range_filter.get('enabled', False) or self.discrete_filter.get('enabled', False)
+        self.id_filter = compile_software_filter(range_filter or {}, discrete_filter or {}, message_names)
+
+        # Livraison par lots : les trames sont accumulées puis émises en une seule liste
+        # toutes les 'batch_interval_ms' ms ou dès que 'batch_max_size' trames sont en attente.
+        # Un intervalle à 0 rétablit l'émission trame par trame via 'message_received'.
+        self.batch_interval = max(0, batch_interval_ms) / 1000.0
+        self.batch_max_size = max(1, batch_max_size)
+        self._batch_mutex = QMutex()
+        self._batch = []
+        self._last_flush = time.monotonic()
+
+        # Table de réponses Trigger/RTR compilée par le GUI : ({id déclencheur: [(ligne, trame)]},
+        # {id RTR: [(ligne, trame)]}). Remplacée d'un bloc par set_tx_dispatch, lue sans verrou.
+        self.tx_dispatch = ({}, {})
+        self._dispatch_counts = Counter()
 
-    def update_filters(self, can_filters=None, range_filter=None, discrete_filter=None):
+    def set_tx_dispatch(self, trigger_map, rtr_map):
+        self.tx_dispatch = (trigger_map, rtr_map)
+
+    def update_filters(self, can_filters=None, range_filter=None, discrete_filter=None, message_names=None):
+        """Applique de nouveaux filtres en cours de réception. Le prédicat logiciel est compilé ici puis
+        remplacé d'un bloc : le thread de réception le lit sans verrou."""
+        self.id_filter = compile_software_filter(range_filter or {}, discrete_filter or {}, message_names)
         with QMutexLocker(self.mutex):
             self.can_filters = can_filters or []
-            self.range_filter = range_filter or {}
-            self.discrete_filter = discrete_filter or {}
-            
-            self.is_software_filter_active = self.range_filter.get('enabled', False) or self.discrete_filter.get('enabled', False)
-            
-            if self.bus and hasattr(self.bus, 'set_filters') and self.interface != "arduino_serial":
+            if self.source and hasattr(self.source, 'set_filters'):
                 try:
-                    self.bus.set_filters(self.can_filters)
+                    self.source.set_filters(self.can_filters)
                 except Exception as e:
                     print(f"Avertissement : Impossible de mettre à jour dynamiquement les filtres matériels : {e}")
 
     def _passes_software_filter(self, msg: can.Message):
-        with QMutexLocker(self.mutex):
-            if not self.is_software_filter_active:
-                return True
-
-            # La vérification de 'enabled' est la première chose à faire.
-            if self.range_filter.get('enabled', False):
-                if self.range_filter.get('start', 0) <= msg.arbitration_id <= self.range_filter.get('end', 0x1FFFFFFF):
-                    return True # Le message passe, pas besoin de vérifier plus loin.
-            
-            if self.discrete_filter.get('enabled', False):
-                # Utilise 'ids' pour correspondre à la structure créée dans le GUI.
-                if msg.arbitration_id in self.discrete_filter.get('ids', []):
-                    return True # Le message passe.
-            
-            return False # Le message n'a passé aucun filtre logiciel actif.
+        id_filter = self.id_filter
+        return id_filter is None or id_filter(msg.arbitration_id)
 
-    def run(self):
-        if self.interface == "arduino_serial":
-            self.run_arduino_serial()
-        else:
-            self.run_python_can()
+    def _dispatch_responses(self, msg: can.Message):
+        """Envoie immédiatement, depuis le thread de réception, les réponses Trigger/RTR associées à la trame."""
+        trigger_map, rtr_map = self.tx_dispatch
+        responses = trigger_map.get(msg.arbitration_id)
+        if msg.is_remote_frame and (rtr_responses := rtr_map.get(msg.arbitration_id)):
+            responses = responses + rtr_responses if responses else rtr_responses
+        if not responses: return
+        if self.send_messages([response for _, response in responses]):
+            self._dispatch_counts.update(row for row, _ in responses)
+
+    def _deliver(self, msg: can.Message):
+        """Transmet une trame au GUI, directement ou via le lot en cours."""
+        self._dispatch_responses(msg)
+        if self.batch_interval <= 0:
+            self.message_received.emit(msg)
+            return
+        with QMutexLocker(self._batch_mutex):
+            self._batch.append(msg)
+            is_full = len(self._batch) >= self.batch_max_size
+        if is_full: self._flush_batch()
+
+    def _flush_batch(self, force=True):
+        """Émet les trames en attente. Sans 'force', n'émet que si l'intervalle est écoulé."""
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.batch_interval: return
+        with QMutexLocker(self._batch_mutex):
+            batch, self._batch = self._batch, []
+        self._last_flush = now
+        if batch: self.messages_received.emit(batch)
+        if self._dispatch_counts:
+            self.tx_dispatched.emit(dict(self._dispatch_counts)); self._dispatch_counts.clear()
 
-    def run_arduino_serial(self):
+    def run(self):
+        error = None
         try:
-            self.bus = serial.Serial(self.channel, self.com_baudrate, timeout=0.1)
+            self.source = open_source(self.interface, self.channel, self.baudrate, self.com_baudrate,
+                                      self.can_filters, self.serial_framing)
             self.connection_status.emit(True)
+            # Lecture avec timeout (plutôt qu'une itération bloquante) pour vider le lot même sur un bus calme.
+            read_timeout = self.batch_interval if self.batch_interval > 0 else 0.1
             while self.is_running():
-                if self.bus.in_waiting > 0:
-                    try:
-                        line_bytes = self.bus.readline()
-                        if not line_bytes: continue
-                        line_str = line_bytes.decode('utf-8', errors='ignore').strip()
-                        if not line_str or line_str.startswith("---") or line_str.startswith("!!!"): continue
-                        parts = line_str.split(',')
-                        if len(parts) < 2: continue
-                        
-                        can_id_str, dlc_str = parts[0], parts[1]
-                        if not can_id_str: continue
-
-                        dlc = int(dlc_str, 16)
-                        
-                        if len(parts) < 2 + dlc: continue
-                        data_str_list = parts[2:2+dlc]
-                        
-                        msg = can.Message(
-                            timestamp=time.time(), arbitration_id=int(can_id_str, 16),
-                            is_extended_id=len(can_id_str) > 3, dlc=dlc,
-                            data=[int(d, 16) for d in data_str_list]
-                        )
-                        # Le filtrage logiciel est maintenant appliqué ici
-                        if self._passes_software_filter(msg):
-                            self.message_received.emit(msg)
-                    except (ValueError, IndexError) as e:
-                        print(f"Erreur de parsing série sur la ligne '{line_str}': {e}")
-                else:
-                    time.sleep(0.001)
+                for message in self.source.read(read_timeout):
+                    # Le filtrage logiciel est aussi appliqué aux interfaces natives.
+                    if self._passes_software_filter(message): self._deliver(message)
+                self._flush_batch(force=False)
         except serial.SerialException as e:
-            self.error_occurred.emit(f"Erreur du port série : {e}")
-        finally:
-            if self.bus and self.bus.is_open: self.bus.close()
-            self.connection_status.emit(False)
-
-    def run_python_can(self):
-        try:
-            # Pour les interfaces natives, les filtres logiciels sont aussi appliqués.
-            self.bus = can.interface.Bus(
-                bustype=self.interface, channel=self.channel, bitrate=self.baudrate,
-                receive_own_messages=False, can_filters=self.can_filters
-            )
-            self.connection_status.emit(True)
-            for message in self.bus:
-                if not self.is_running(): break
-                if message and self._passes_software_filter(message):
-                    self.message_received.emit(message)
+            error = f"Erreur du port série : {e}"
         except Exception as e:
-            self.error_occurred.emit(str(e))
+            error = str(e)
         finally:
-            if self.bus: self.bus.shutdown()
+            # Les envois de l'ordonnanceur et du rejeu échouent désormais sans bruit (voir send_messages).
+            with QMutexLocker(self.mutex): self._is_running = False
+            self._flush_batch()
+            with QMutexLocker(self._send_mutex):
+                source, self.source = self.source, None
+                if source: source.close()
+            # La déconnexion est signalée avant l'erreur : le GUI arrête les émissions avant d'ouvrir un dialogue.
             self.connection_status.emit(False)
+            if error: self.error_occurred.emit(error)
 
     def stop(self):
         with QMutexLocker(self.mutex): self._is_running = False
@@ -131,18 +143,17 @@ class CanWorker(QThread):
         with QMutexLocker(self.mutex): return self._is_running
 
     def send_message(self, msg: can.Message):
-        if not self.bus or not self.is_running():
-            self.error_occurred.emit("Non connecté.")
-            return False
+        return self.send_messages([msg])
+
+    def send_messages(self, msgs):
+        """Envoie un lot de trames. Sur la passerelle série, le lot part en une seule écriture.
+        Renvoie False sans signaler d'erreur si la réception est arrêtée : run() a déjà signalé la cause."""
+        if not self.is_running() or not self.isRunning(): return False
         try:
-            if self.interface == "arduino_serial":
-                id_str = f"{msg.arbitration_id:X}"
-                data_str = ",".join([f"{b:X}" for b in msg.data])
-                command = f"S:{id_str},{msg.dlc},{data_str}\n" if data_str else f"S:{id_str},{msg.dlc}\n"
-                self.bus.write(command.encode('ascii'))
-            else:
-                self.bus.send(msg)
+            with QMutexLocker(self._send_mutex):
+                if not self.source: return False
+                self.source.send(msgs)
             return True
         except Exception as e:
             self.error_occurred.emit(f"Échec de l'envoi : {e}")
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,204 @@
+"""canlab-capture : capture et enregistrement d'un bus CAN en ligne de commande, sans interface graphique.
+
+Exemples :
+    python canlab_capture.py -i socketcan -c can0 -o logs/bench.cltrace --rotate-size 100
+    python canlab_capture.py -i arduino_serial -c /dev/ttyACM0 -o bench.csv --dbc dbc_FMUX --messages "HS4_*"
+    python canlab_capture.py -i virtual -c test -o test.blf --ids 100,200 --range 300-3FF --duration 60
+    python canlab_capture.py --bus HS4=socketcan:can0 --bus DIAG=socketcan:can1 -o reseau.asc
+    python canlab_capture.py --buses bancs.json -o reseau.cltrace --dbc dbc_FMUX
+    python canlab_capture.py -i arduino_serial -c COM5 -o diag.asc --ids 7DF --range 7E0-7EF --hw-offload
+
+Avec plusieurs bus (--bus, --buses), la réception passe par multi_bus (asyncio) et les trames de tous
+les bus sont fusionnées par horodatage dans un seul journal. Fichier --buses : liste JSON d'objets
+{"name", "interface", "channel", "bitrate", "filters": ["ID:MASK[:x]"], "range": "A-B", "ids": "ID,ID",
+"messages": ["MOTIF"]} ; les filtres non précisés reprennent ceux de la ligne de commande.
+
+--hw-offload couvre les filtres logiciels par des couples code/masque matériels (hw_filter) quand aucun
+--filter n'est donné ; les ID en trop qu'ils laissent passer sont éliminés par le filtre logiciel.
+
+PyQt n'est jamais importé : seul capture_core (python-can, pyserial) est chargé, plus cantools avec --dbc."""
+import argparse
+import asyncio
+import fnmatch
+import json
+import os
+import signal
+import sys
+import time
+from capture_core import open_source, RotatingLog, CaptureSession, LOG_FORMATS
+from hw_filter import offload_software_filter
+
+
+def _mask_filter(text):
+    """ID:MASQUE[:x] en hexadécimal -> filtre matériel python-can ('x' : ID étendu)."""
+    fields = text.split(':')
+    if len(fields) not in (2, 3) or (len(fields) == 3 and fields[2].lower() != 'x'):
+        raise argparse.ArgumentTypeError(f"invalid mask filter '{text}' (expected ID:MASK[:x])")
+    return {'can_id': int(fields[0], 16), 'can_mask': int(fields[1], 16), 'extended': len(fields) == 3}
+
+
+def _id_range(text):
+    start, _, end = text.partition('-')
+    if not end: raise argparse.ArgumentTypeError(f"invalid range '{text}' (expected START-END)")
+    return int(start, 16), int(end, 16)
+
+
+def _id_list(text):
+    return [int(token, 16) for token in text.replace(';', ',').split(',') if token.strip()]
+
+
+def _bus_spec(text):
+    """[NOM=]INTERFACE:CANAL[:DÉBIT] -> dictionnaire de bus (même forme qu'une entrée du fichier --buses)."""
+    name, _, spec = text.rpartition('=')
+    fields = spec.split(':')
+    if len(fields) not in (2, 3) or not all(fields[:2]):
+        raise argparse.ArgumentTypeError(f"invalid bus '{text}' (expected [NAME=]INTERFACE:CHANNEL[:BITRATE])")
+    try: bitrate = int(fields[2]) if len(fields) == 3 else None
+    except ValueError: raise argparse.ArgumentTypeError(f"invalid bitrate in '{text}'")
+    return {'name': name or fields[1], 'interface': fields[0], 'channel': fields[1], 'bitrate': bitrate}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="canlab-capture", description="Capture a CAN bus to a log file without the GUI.")
+    bus = parser.add_argument_group("bus")
+    bus.add_argument("-i", "--interface", help="python-can interface (socketcan, pcan, vector, virtual...) or arduino_serial")
+    bus.add_argument("-c", "--channel", help="channel or serial port")
+    bus.add_argument("-b", "--bitrate", type=int, default=500000, help="CAN bitrate (default: 500000)")
+    bus.add_argument("--bus", type=_bus_spec, action="append", default=[], metavar="[NAME=]INTERFACE:CHANNEL[:BITRATE]",
+                     help="capture several python-can buses at once, merged by timestamp (repeatable, replaces -i/-c)")
+    bus.add_argument("--buses", metavar="FILE", help="JSON list of buses with their own filters (see the module docstring)")
+    bus.add_argument("--serial-baudrate", type=int, default=115200, help="serial port speed for arduino_serial (default: 115200)")
+    bus.add_argument("--serial-framing", choices=("auto", "text"), default="auto", help="Arduino framing (default: auto)")
+    log = parser.add_argument_group("log")
+    log.add_argument("-o", "--output", required=True, help="log file; the format follows the extension (" + ", ".join(LOG_FORMATS) + ")")
+    log.add_argument("--rotate-interval", type=float, metavar="SECONDS", help="start a new file every SECONDS")
+    log.add_argument("--rotate-frames", type=int, metavar="N", help="start a new file every N frames")
+    log.add_argument("--rotate-size", type=float, metavar="MB", help="start a new file once the current one exceeds MB megabytes")
+    log.add_argument("--dbc", help="DBC file or folder: message names in TXT/CSV logs, DBC hash in .cltrace logs")
+    filters = parser.add_argument_group("filters")
+    filters.add_argument("--filter", type=_mask_filter, action="append", default=[], metavar="ID:MASK[:x]",
+                         help="hardware acceptance filter (hex, repeatable; 'x' for extended IDs)")
+    filters.add_argument("--range", type=_id_range, metavar="START-END", help="software filter: keep IDs in this hex range")
+    filters.add_argument("--ids", type=_id_list, default=[], metavar="ID,ID,...", help="software filter: keep these hex IDs")
+    filters.add_argument("--messages", action="append", default=[], metavar="PATTERN",
+                         help="software filter: keep DBC messages whose name matches PATTERN (wildcards, repeatable; needs --dbc)")
+    filters.add_argument("--hw-offload", action="store_true", help="cover the software filters with hardware code/mask pairs (unless --filter is given)")
+    filters.add_argument("--hw-slots", type=int, default=4, metavar="N", help="hardware filter pairs of the python-can interface (default: 4; MCP2515: fixed)")
+    filters.add_argument("--fp-budget", type=int, default=32, metavar="N",
+                         help="extra IDs the hardware filters may let through to save pairs (default: 32)")
+    run = parser.add_argument_group("run")
+    run.add_argument("--duration", type=float, metavar="SECONDS", help="stop after SECONDS")
+    run.add_argument("--count", type=int, metavar="N", help="stop after N logged frames")
+    run.add_argument("-q", "--quiet", action="store_true", help="no periodic statistics on stderr")
+    return parser
+
+
+def load_dbc(path):
+    """Charge un fichier ou un dossier DBC (cache disque commun avec le GUI). Renvoie (base, empreinte)."""
+    from dbc_cache import DBCCache
+    from dbc_loader import load_dbc_files, dbc_hash
+    paths = [path] if os.path.isfile(path) else sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith('.dbc'))
+    if not paths: raise ValueError(f"no .dbc file in {path}")
+    db, collisions = load_dbc_files(paths, DBCCache(), strict=False)
+    for frame_id, is_extended, defined_by in collisions:
+        print(f"warning: 0x{frame_id:X} defined in " + ", ".join(f"{name} [{file_name}]" for name, file_name in defined_by), file=sys.stderr)
+    return db, dbc_hash(paths)
+
+
+def software_filters(id_range, ids, patterns, names):
+    """Filtres logiciels au format de capture_core. Les motifs de noms DBC sont résolus en ID."""
+    ids = set(ids)
+    for pattern in patterns:
+        matched = {frame_id for frame_id, name in names.items() if fnmatch.fnmatchcase(name, pattern)}
+        if not matched: print(f"warning: no DBC message matches '{pattern}'", file=sys.stderr)
+        ids |= matched
+    range_filter = {'enabled': True, 'start': id_range[0], 'end': id_range[1]} if id_range else {}
+    return range_filter, {'enabled': bool(ids or patterns), 'ids': ids}
+
+
+def hardware_filters(args, interface, name, range_filter, discrete_filter, names):
+    """Filtres matériels du bus : --filter, sinon avec --hw-offload les filtres logiciels optimisés."""
+    if not args.hw_offload or not (range_filter or discrete_filter.get('enabled')): return None
+    can_filters, false_positives = offload_software_filter(range_filter, discrete_filter, names, args.hw_slots, args.fp_budget,
+                                                           set(names) or None, mcp2515=interface == "arduino_serial")
+    if false_positives is None: print(f"warning: {name}: software filters do not fit the hardware filters, all frames accepted", file=sys.stderr)
+    else: print(f"{name}: {len({(f['can_id'], f['can_mask']) for f in can_filters})} hardware filter pair(s), "
+                f"{false_positives} extra ID(s) dropped in software", file=sys.stderr)
+    return can_filters or None
+
+
+def bus_channels(args, names):
+    """Bus de --bus et --buses (multi_bus.BusChannel), avec leurs filtres ou ceux de la ligne de commande."""
+    from multi_bus import BusChannel
+    specs = list(args.bus)
+    if args.buses:
+        with open(args.buses, 'r', encoding='utf-8') as f: specs += json.load(f)
+    channels = []
+    for index, spec in enumerate(specs):
+        ids = spec.get('ids', args.ids)
+        if isinstance(ids, str): ids = _id_list(ids)
+        else: ids = [int(i, 16) if isinstance(i, str) else i for i in ids]
+        id_range = _id_range(spec['range']) if 'range' in spec else args.range
+        can_filters = [_mask_filter(text) for text in spec['filters']] if 'filters' in spec else args.filter
+        patterns = spec.get('messages', args.messages)
+        if patterns and not names: raise ValueError("message patterns need --dbc")
+        name = spec.get('name') or f"bus{index}"; filters = software_filters(id_range, ids, patterns, names)
+        can_filters = can_filters or hardware_filters(args, spec['interface'], name, *filters, names)
+        channels.append(BusChannel(name, spec['interface'], spec['channel'], spec.get('bitrate') or args.bitrate, can_filters, *filters))
+    return channels
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    multi = bool(args.bus or args.buses)
+    if multi and (args.interface or args.channel): print("error: use either -i/-c or --bus/--buses", file=sys.stderr); return 2
+    if not multi and not (args.interface and args.channel): print("error: -i/-c or --bus/--buses is required", file=sys.stderr); return 2
+    if args.messages and not args.dbc: print("error: --messages needs --dbc", file=sys.stderr); return 2
+    db = dbc_digest = None; names = {}
+    if args.dbc:
+        try: db, dbc_digest = load_dbc(args.dbc)
+        except Exception as e: print(f"error: cannot load DBC: {e}", file=sys.stderr); return 1
+        names = {message.frame_id: message.name for message in db.messages}
+
+    try:
+        log = RotatingLog(args.output, args.rotate_interval, args.rotate_frames,
+                          int(args.rotate_size * 1024 * 1024) if args.rotate_size else None, dbc_digest, lambda msg_id: names.get(msg_id, ""))
+        if multi:
+            from multi_bus import MultiBusReceiver
+            session = MultiBusReceiver(bus_channels(args, names)); source = None
+        else:
+            filters = software_filters(args.range, args.ids, args.messages, names)
+            can_filters = args.filter or hardware_filters(args, args.interface, args.channel, *filters, names)
+            source = open_source(args.interface, args.channel, args.bitrate, args.serial_baudrate, can_filters, args.serial_framing)
+            session = CaptureSession(source, log, *filters)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr); return 1
+    signal.signal(signal.SIGINT, lambda *_: session.stop())
+    if hasattr(signal, 'SIGTERM'): signal.signal(signal.SIGTERM, lambda *_: session.stop())
+
+    def report(session, elapsed):
+        print(f"\r{elapsed:8.1f} s  received {session.received:>10}  logged {session.kept:>10}  "
+              f"({session.kept / elapsed if elapsed else 0:,.0f} frames/s)  file {os.path.basename(log.paths[-1]) if log.paths else '-'}",
+              end="", file=sys.stderr, flush=True)
+    start = time.monotonic(); status = 0
+    async def run_multi():
+        async with session: await session.capture(log, args.duration, args.count, None if args.quiet else report)
+    try:
+        if multi: asyncio.run(run_multi())
+        else: session.run(args.duration, args.count, None if args.quiet else report)
+    except Exception as e:
+        print(f"\nerror: {e}", file=sys.stderr); status = 1
+    finally:
+        if source: source.close()
+        try: log.close()
+        except OSError as e: print(f"\nerror: {e}", file=sys.stderr); status = 1
+    elapsed = time.monotonic() - start
+    if not args.quiet: print(file=sys.stderr)
+    print(f"{session.kept} frames logged ({session.received} received) in {elapsed:.1f} s to " + (", ".join(log.paths) or "no file"), file=sys.stderr)
+    for channel in (session.channels if multi else ()):
+        print(f"  {channel.name} ({channel.interface}:{channel.channel}): {channel.kept} logged, {channel.received} received", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
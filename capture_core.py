@@ -0,0 +1,269 @@
+"""Cœur de capture sans Qt : sources de trames (python-can, passerelle série Arduino), filtrage logiciel et
+journaux de capture avec rotation.
+
+CanWorker (GUI) et canlab_capture (ligne de commande) partagent ces sources. Ce module n'importe jamais
+PyQt, pour démarrer vite sur un poste sans affichage."""
+import os
+import time
+import can
+from serial_protocol import (BinaryFrameDecoder, TextFrameDecoder, DeviceClock, BINARY_MODE_COMMAND,
+                             BINARY_MODE_ACK, FLAG_EXTENDED, FLAG_REMOTE)
+from trace_log import TraceWriter, TextTraceWriter, TRACE_SUFFIX
+from id_filter import compile_software_filter
+from hw_filter import fit_mcp2515, mcp2515_commands
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+# Durée maximale de la négociation du mode binaire (l'Arduino redémarre à l'ouverture du port).
+SERIAL_NEGOTIATION_TIMEOUT = 3.0
+SERIAL_NEGOTIATION_RETRY = 0.5
+READ_BURST = 512         # Nombre maximal de trames lues d'un coup sur un bus python-can
+
+LOG_FORMATS = (TRACE_SUFFIX, '.asc', '.blf', '.txt', '.csv')
+
+
+def serial_command(msg: can.Message) -> bytes:
+    """Commande d'émission du sketch Arduino : "S:ID,DLC,D0,D1,...\\n" en hexadécimal."""
+    id_str = f"{msg.arbitration_id:X}"
+    data_str = ",".join([f"{b:X}" for b in msg.data])
+    command = f"S:{id_str},{msg.dlc},{data_str}\n" if data_str else f"S:{id_str},{msg.dlc}\n"
+    return command.encode('ascii')
+
+
+class PythonCanSource:
+    """Bus python-can natif (socketcan, pcan, vector, virtual...)."""
+    def __init__(self, interface, channel, bitrate, can_filters=None):
+        self.bus = can.interface.Bus(interface=interface, channel=channel, bitrate=bitrate,
+                                     receive_own_messages=False, can_filters=can_filters)
+
+    def read(self, timeout):
+        """Attend au plus 'timeout' s la première trame, puis vide sans attendre ce qui est déjà reçu."""
+        msg = self.bus.recv(timeout=timeout)
+        if msg is None: return []
+        msgs = [msg]
+        while len(msgs) < READ_BURST and (msg := self.bus.recv(timeout=0)) is not None: msgs.append(msg)
+        return msgs
+
+    def send(self, msgs):
+        for msg in msgs: self.bus.send(msg)
+
+    def set_filters(self, can_filters):
+        if hasattr(self.bus, 'set_filters'): self.bus.set_filters(can_filters)
+
+    def close(self):
+        self.bus.shutdown()
+
+
+class SerialSource:
+    """Passerelle série Arduino (voir serial_protocol). En mode "auto", le mode binaire est d'abord négocié
+    avec le sketch ; les trames texte reçues pendant la négociation sont transmises normalement.
+    Les filtres matériels (MCP2515) partent dès que le sketch a répondu : l'Arduino redémarre à l'ouverture."""
+    def __init__(self, port, baudrate, framing="auto", can_filters=None):
+        if serial is None: raise RuntimeError("La bibliothèque 'pyserial' est requise pour la passerelle série.")
+        self.port = serial.Serial(port, baudrate, timeout=0.1)
+        self.binary = False
+        # Horodatage matériel : micros() du sketch converti en temps hôte avec correction de dérive.
+        self.device_clock = DeviceClock()
+        self._decoder = TextFrameDecoder()
+        self._negotiation_deadline = time.monotonic() + SERIAL_NEGOTIATION_TIMEOUT if framing == "auto" else None
+        self._next_request = 0
+        self._alive = False
+        self._filter_commands = None
+        if can_filters: self.set_filters(can_filters)
+
+    def read(self, timeout):
+        """Lecture en bloc de tous les octets disponibles. read() bloque jusqu'au premier octet ou jusqu'au
+        timeout du port : pas de boucle d'attente active."""
+        port = self.port
+        if port.timeout != timeout: port.timeout = timeout
+        if self._negotiation_deadline is not None: return self._negotiate()
+        chunk = port.read(port.in_waiting or 1)
+        if chunk and not self._alive: self._alive = True; self._send_filters()
+        return self._messages(self._decoder.feed(chunk), time.time()) if chunk else []
+
+    def _negotiate(self):
+        now = time.monotonic()
+        if now >= self._negotiation_deadline: self._negotiation_deadline = None; return []
+        if now >= self._next_request:
+            self.port.write(BINARY_MODE_COMMAND); self._next_request = now + SERIAL_NEGOTIATION_RETRY
+        # Lecture ligne à ligne : aucun octet binaire suivant l'acquittement ne doit être consommé ici.
+        line_bytes = self.port.readline()
+        if not line_bytes: return []
+        if not self._alive: self._alive = True; self._send_filters()
+        if line_bytes.decode('utf-8', errors='ignore').strip().startswith(BINARY_MODE_ACK):
+            self.binary = True; self._decoder = BinaryFrameDecoder(); self._negotiation_deadline = None
+            return []
+        return self._messages(self._decoder.feed(line_bytes), time.time())
+
+    def _messages(self, frames, host_time):
+        """Construit les can.Message d'un bloc. 'host_time' est l'heure de lecture du bloc sur le port."""
+        clock = self.device_clock
+        device_times = [clock.unwrap(device_us) if device_us is not None else None for device_us, _, _, _ in frames]
+        stamped = [device_s for device_s in device_times if device_s is not None]
+        # La dernière trame horodatée du bloc est la plus proche de l'heure de lecture.
+        if stamped: clock.observe(stamped[-1], host_time)
+        msgs = []
+        for (device_us, arbitration_id, flags, data), device_s in zip(frames, device_times):
+            is_remote = bool(flags & FLAG_REMOTE)
+            msgs.append(can.Message(
+                timestamp=clock.to_host(device_s) if device_s is not None else host_time, arbitration_id=arbitration_id,
+                is_extended_id=bool(flags & FLAG_EXTENDED), is_remote_frame=is_remote,
+                dlc=len(data), data=None if is_remote else data))
+        return msgs
+
+    def send(self, msgs):
+        """Le lot part en une seule écriture sur le port."""
+        self.port.write(b"".join(getattr(msg, 'serial_command', None) or serial_command(msg) for msg in msgs))
+
+    def set_filters(self, can_filters):
+        """Filtres matériels au format python-can, rangés au besoin dans les 2 masques / 6 filtres du MCP2515.
+        None ou [] : toutes les trames passent."""
+        self._filter_commands = mcp2515_commands(fit_mcp2515(can_filters or []))
+        if self._alive: self._send_filters()
+
+    def _send_filters(self):
+        if self._filter_commands: self.port.write(self._filter_commands); self._filter_commands = None
+
+    def close(self):
+        if self.port.is_open: self.port.close()
+
+
+def open_source(interface, channel, bitrate, com_baudrate=115200, can_filters=None, serial_framing="auto"):
+    """Ouvre la source de trames correspondant à l'interface choisie ("arduino_serial" ou interface python-can)."""
+    if interface == "arduino_serial": return SerialSource(channel, com_baudrate, serial_framing, can_filters)
+    return PythonCanSource(interface, channel, bitrate, can_filters)
+
+
+class VectorLogWriter:
+    """Journal ASC ou BLF écrit avec les writers python-can."""
+    def __init__(self, path):
+        self.writer = can.ASCWriter(path) if path.lower().endswith('.asc') else can.BLFWriter(path)
+        self.error = None
+
+    def write(self, msgs):
+        for msg in msgs: self.writer.on_message_received(msg)
+
+    def close(self):
+        self.writer.stop()
+
+
+class RotatingLog:
+    """Journal de capture au format désigné par l'extension de 'path' (.cltrace, .asc, .blf, .txt, .csv).
+
+    Avec une rotation (durée 'rotate_seconds', nombre de trames 'rotate_frames' ou taille 'rotate_bytes',
+    vérifiée au plus une fois par seconde), les fichiers sont numérotés : capture_0001.cltrace, capture_0002...
+    'name_of(id)' fournit le nom de message des exports texte ; 'dbc_hash' est enregistré dans les .cltrace."""
+    def __init__(self, path, rotate_seconds=None, rotate_frames=None, rotate_bytes=None, dbc_hash=None, name_of=None):
+        self.stem, self.suffix = os.path.splitext(path)
+        if self.suffix.lower() not in LOG_FORMATS: raise ValueError(f"Format de journal non supporté : {self.suffix or path}")
+        self.rotating = bool(rotate_seconds or rotate_frames or rotate_bytes)
+        self.rotate_seconds = rotate_seconds; self.rotate_frames = rotate_frames; self.rotate_bytes = rotate_bytes
+        self.dbc_hash = dbc_hash; self.name_of = name_of
+        self.paths = []; self.frames_written = 0
+        self.writer = None; self._file_frames = 0; self._opened_at = 0.0; self._next_size_check = 0.0
+        self._start_time = None
+
+    def _open(self, first_timestamp):
+        path = f"{self.stem}_{len(self.paths) + 1:04d}{self.suffix}" if self.rotating else self.stem + self.suffix
+        suffix = self.suffix.lower()
+        if suffix == TRACE_SUFFIX: self.writer = TraceWriter(path, self.dbc_hash)
+        elif suffix in ('.asc', '.blf'): self.writer = VectorLogWriter(path)
+        else:
+            # Les temps des exports texte sont relatifs à la première trame de la capture, comme dans le GUI.
+            if self._start_time is None: self._start_time = first_timestamp
+            self.writer = TextTraceWriter(path, self._start_time, self.name_of)
+        self.paths.append(path); self._file_frames = 0; self._opened_at = self._next_size_check = time.monotonic()
+
+    def _should_rotate(self):
+        if not self.rotating: return False
+        if self.rotate_frames and self._file_frames >= self.rotate_frames: return True
+        now = time.monotonic()
+        if self.rotate_seconds and now - self._opened_at >= self.rotate_seconds: return True
+        if self.rotate_bytes and now >= self._next_size_check:
+            self._next_size_check = now + 1.0
+            try: return os.path.getsize(self.paths[-1]) >= self.rotate_bytes
+            except OSError: return False
+        return False
+
+    def write(self, msgs):
+        while msgs:
+            if self.writer is not None and self._should_rotate(): self.close()
+            if self.writer is None: self._open(msgs[0].timestamp)
+            if getattr(self.writer, 'error', None): raise OSError(self.writer.error)
+            # Un lot est coupé à la limite de trames du fichier en cours.
+            count = min(len(msgs), self.rotate_frames - self._file_frames) if self.rotate_frames else len(msgs)
+            self.writer.write(msgs[:count] if count < len(msgs) else msgs)
+            self._file_frames += count; self.frames_written += count; msgs = msgs[count:]
+
+    def close(self):
+        if self.writer is None: return
+        writer, self.writer = self.writer, None
+        writer.close()
+        if getattr(writer, 'error', None): raise OSError(writer.error)
+
+
+class CaptureSession:
+    """Boucle de capture : lit 'source', applique les filtres logiciels (compilés, voir id_filter) et écrit
+    les trames retenues par lots dans 'log' (objet avec write(msgs)). Les lots partent toutes les 'batch_interval' s ou dès
+    'batch_max_size' trames. stop() peut être appelé depuis un autre thread ou un gestionnaire de signal."""
+    def __init__(self, source, log, range_filter=None, discrete_filter=None, batch_interval=0.1, batch_max_size=4096, names=None):
+        self.source = source
+        self.log = log
+        self.id_filter = compile_software_filter(range_filter or {}, discrete_filter or {}, names)
+        self.batch_interval = batch_interval
+        self.batch_max_size = batch_max_size
+        self.received = 0; self.kept = 0
+        self._is_running = True
+
+    def stop(self):
+        self._is_running = False
+
+    def run(self, duration=None, max_frames=None, on_stats=None, stats_interval=1.0):
+        """Capture jusqu'à stop(), 'duration' s ou 'max_frames' trames retenues. 'on_stats(session, elapsed)'
+        est appelé toutes les 'stats_interval' s."""
+        source, log, id_filter = self.source, self.log, self.id_filter
+        start = time.monotonic(); last_flush = next_stats = start
+        deadline = start + duration if duration else None
+        batch = []
+        try:
+            while self._is_running:
+                msgs = source.read(self.batch_interval)
+                self.received += len(msgs)
+                if id_filter is not None: msgs = [msg for msg in msgs if id_filter(msg.arbitration_id)]
+                if max_frames is not None: msgs = msgs[:max_frames - self.kept]
+                batch.extend(msgs); self.kept += len(msgs)
+                now = time.monotonic()
+                if len(batch) >= self.batch_max_size or now - last_flush >= self.batch_interval:
+                    if batch: log.write(batch); batch = []
+                    last_flush = now
+                if on_stats and now >= next_stats: on_stats(self, now - start); next_stats = now + stats_interval
+                if (max_frames is not None and self.kept >= max_frames) or (deadline and now >= deadline): break
+        finally:
+            if batch: log.write(batch)
+        return self.kept
+
+
+if __name__ == "__main__":
+    # Banc d'essai : capture vers chaque format depuis le bus 'virtual' de python-can. La file du bus est
+    # remplie avant la mesure (l'émission virtuelle plafonne vers 70 000 trames/s) : seul le pipeline
+    # lecture, filtrage et écriture est chronométré.
+    import sys, tempfile
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    frames = [can.Message(arbitration_id=0x100 + (i % 64), is_extended_id=False, data=bytes([i & 0xFF] * 8)) for i in range(1024)]
+    filters = ({}, {'enabled': True, 'ids': set(range(0x100, 0x140))})
+    for suffix in LOG_FORMATS:
+        with tempfile.TemporaryDirectory() as folder:
+            channel = f"bench{suffix}"
+            source = PythonCanSource("virtual", channel, None)
+            sender = can.interface.Bus(interface="virtual", channel=channel)
+            for i in range(n): sender.send(frames[i & 1023])
+            log = RotatingLog(os.path.join(folder, "capture" + suffix), rotate_frames=n // 4)
+            session = CaptureSession(source, log, *filters)
+            start = time.perf_counter(); session.run(max_frames=n); log.close(); elapsed = time.perf_counter() - start
+            sender.shutdown(); source.close()
+            size = sum(os.path.getsize(path) for path in log.paths)
+            print(f"{suffix:8}: {session.kept:,} trames en {elapsed:.2f} s ({session.kept / elapsed:,.0f} trames/s, "
+                  f"{len(log.paths)} fichiers, {size / 1e6:.1f} Mo)")
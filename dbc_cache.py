@@ -0,0 +1,79 @@
+import hashlib
+import os
+import pickle
+
+# Incrémenter lorsque le contenu des entrées change de nature : toutes les anciennes entrées deviennent invalides.
+CACHE_FORMAT = 1
+DEFAULT_CACHE_DIR = os.environ.get("CANLAB_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".canlab", "dbc_cache")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+ENTRY_SUFFIX = ".pickle"
+
+
+class DBCCache:
+    """Cache disque des bases DBC déjà analysées.
+
+    Une entrée est identifiée par le hachage du contenu, de la taille et de la date de modification de
+    chaque fichier source (plus une 'variante' décrivant la façon de les charger) : toute modification
+    d'un fichier produit une nouvelle clé. Le dossier est borné à 'max_bytes' en supprimant les entrées
+    les moins récemment utilisées."""
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, paths, variant="") -> str:
+        digest = hashlib.sha256(f"{CACHE_FORMAT}|{variant}".encode('utf-8'))
+        for path in sorted(paths):
+            stat = os.stat(path)
+            digest.update(f"|{os.path.basename(path)}|{stat.st_size}|{stat.st_mtime_ns}|".encode('utf-8'))
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def load(self, key):
+        """Renvoie la base en cache pour 'key', ou None. Une entrée illisible est supprimée."""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                db = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            print(f"Avertissement : entrée de cache DBC invalide ignorée ({e})")
+            self._remove(path)
+            return None
+        try: os.utime(path) # Marque l'entrée comme récemment utilisée pour la politique LRU.
+        except OSError: pass
+        return db
+
+    def store(self, key, db):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._entry_path(key); tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(db, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self.prune()
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            print(f"Avertissement : impossible d'écrire le cache DBC : {e}")
+
+    def prune(self):
+        """Supprime les entrées les moins récemment utilisées jusqu'à repasser sous 'max_bytes'."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX): continue
+            path = os.path.join(self.cache_dir, name)
+            try: stat = os.stat(path)
+            except OSError: continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            self._remove(path); total -= size
+
+    @staticmethod
+    def _remove(path):
+        try: os.remove(path)
+        except OSError: pass
@@ -0,0 +1,85 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import cantools
+except ImportError:
+    cantools = None
+
+
+def parse_dbc_file(path, strict=False):
+    """Analyse un seul fichier DBC. Fonction de niveau module pour pouvoir être exécutée dans un processus fils."""
+    db = cantools.database.Database(strict=strict)
+    db.add_dbc_file(path)
+    return db
+
+
+def merge_databases(parsed, strict=False):
+    """Fusionne des bases analysées séparément, dans l'ordre de 'parsed' [(chemin, base), ...].
+
+    Reproduit Database.add_dbc_file appelé fichier par fichier (les noeuds, bus et attributs DBC du dernier
+    fichier l'emportent) et renvoie (base fusionnée, collisions). Une collision est un identifiant de
+    trame défini par plusieurs fichiers : [(frame_id, is_extended, [(nom du message, fichier), ...]), ...]."""
+    messages = []; owners = {}; last = None
+    for path, db in parsed:
+        for message in db.messages:
+            messages.append(message)
+            owners.setdefault((message.frame_id, message.is_extended_frame), []).append((message.name, os.path.basename(path)))
+        last = db
+    collisions = [(frame_id, is_extended, defined_by) for (frame_id, is_extended), defined_by in sorted(owners.items())
+                  if len({file_name for _, file_name in defined_by}) > 1]
+    merged = cantools.database.Database(
+        messages=messages, nodes=last.nodes if last else None, buses=last.buses if last else None,
+        version=last.version if last else None, dbc_specifics=last.dbc if last else None, strict=strict
+    )
+    return merged, collisions
+
+
+def load_dbc_files(paths, cache=None, strict=False, progress=None, is_cancelled=None, max_workers=None):
+    """Charge plusieurs fichiers DBC en parallèle et les fusionne.
+
+    Les fichiers présents dans 'cache' (DBCCache) sont relus directement ; les autres sont analysés dans un
+    pool de processus. 'progress(terminés, total, nom)' est appelé après chaque fichier et
+    'is_cancelled()' est consulté entre deux fichiers. Renvoie (base, collisions), ou None si annulé."""
+    total = len(paths); done = 0
+    variant = f"cantools-{cantools.__version__}|strict={strict}|file"
+    results = {}; keys = {}
+    for path in paths:
+        keys[path] = cache.key([path], variant) if cache else None
+        db = cache.load(keys[path]) if cache else None
+        if db is not None:
+            results[path] = db; done += 1
+            if progress: progress(done, total, os.path.basename(path))
+    missing = [path for path in paths if path not in results]
+
+    if len(missing) == 1:
+        # Un seul fichier à analyser : pas de coût de démarrage d'un processus.
+        results[missing[0]] = parse_dbc_file(missing[0], strict)
+        if cache: cache.store(keys[missing[0]], results[missing[0]])
+        done += 1
+        if progress: progress(done, total, os.path.basename(missing[0]))
+    elif missing:
+        workers = max_workers or min(len(missing), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(parse_dbc_file, path, strict): path for path in missing}
+            for future in as_completed(futures):
+                if is_cancelled and is_cancelled():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return None
+                path = futures[future]
+                results[path] = future.result()
+                if cache: cache.store(keys[path], results[path])
+                done += 1
+                if progress: progress(done, total, os.path.basename(path))
+
+    if is_cancelled and is_cancelled(): return None
+    return merge_databases([(path, results[path]) for path in paths], strict)
+
+
+def dbc_hash(paths):
+    """SHA-256 du contenu des fichiers DBC (ordre indépendant de 'paths'), enregistré dans les traces binaires."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        with open(path, 'rb') as f: digest.update(f.read())
+    return digest.digest()
@@ -1,17 +1,67 @@
 import os
-from PyQt6.QtWidgets import QFileDialog, QMessageBox
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtWidgets import QFileDialog, QMessageBox, QProgressDialog
+from dbc_cache import DBCCache
+from dbc_loader import load_dbc_files, dbc_hash
+from signal_decoder import compile_message
 
 try:
     import cantools
 except ImportError:
     cantools = None
 
+STANDARD_ID_COUNT = 0x800
+
+
+class MessageInfo:
+    """Métadonnées d'un ID résolues une fois pour toutes au chargement du DBC."""
+    __slots__ = ("name", "message", "signals", "decoder")
+
+    def __init__(self, name="", message=None):
+        self.name = name
+        self.message = message                                  # Message cantools (None si ID inconnu)
+        self.signals = tuple(message.signals) if message else ()
+        self.decoder = compile_message(message) if message else None   # MessageDecoder précompilé
+
+# Résultat partagé de tous les ID absents du DBC : la recherche ne lève jamais d'exception.
+UNKNOWN_MESSAGE = MessageInfo()
+
+
+class DBCFolderLoader(QThread):
+    """Analyse en arrière-plan les fichiers DBC d'un dossier (en parallèle, voir dbc_loader) puis les fusionne."""
+    progress = pyqtSignal(int, int, str)        # terminés, total, dernier fichier
+    loaded = pyqtSignal(object, list)           # base fusionnée, collisions d'ID
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, paths, cache, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.cache = cache
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            result = load_dbc_files(self.paths, self.cache, strict=False, progress=self.progress.emit,
+                                    is_cancelled=lambda: self._cancelled)
+        except Exception as e:
+            self.error_occurred.emit(str(e)); return
+        if result is not None: self.loaded.emit(*result)
+
+
 class DBCManager:
     """Gère le chargement et l'interrogation de fichiers ou dossiers DBC."""
     def __init__(self):
         """Initialise le manager sans base de données chargée."""
         self.db = None
         self.source_name = None # Peut être un nom de fichier ou de dossier
+        self.source_hash = None # SHA-256 du contenu des fichiers chargés, enregistré dans les traces binaires
+        self.cache = DBCCache()
+        self.loaded_from_cache = False
+        self.folder_loader = None
+        self._build_lookup()
 
     def _check_cantools(self, parent_widget):
         """Vérifie si la bibliothèque cantools est installée."""
@@ -22,6 +72,21 @@ class DBCManager:
             return False
         return True
 
+    def _load_databases(self, paths, strict=True):
+        """Charge et fusionne les fichiers DBC 'paths', en passant par le cache disque des bases analysées."""
+        key = self.cache.key(paths, f"cantools-{cantools.__version__}|strict={strict}")
+        db = self.cache.load(key)
+        self.loaded_from_cache = db is not None
+        if db is None:
+            if len(paths) == 1 and strict:
+                db = cantools.database.load_file(paths[0])
+            else:
+                db = cantools.database.Database(strict=strict)
+                for file_path in paths:
+                    db.add_dbc_file(file_path)
+            self.cache.store(key, db)
+        return db
+
     def load_file(self, parent_widget):
         """Ouvre une boîte de dialogue pour sélectionner et charger UN SEUL fichier DBC."""
         if not self._check_cantools(parent_widget): return None
@@ -31,55 +96,103 @@ class DBCManager:
             return None
 
         try:
-            self.db = cantools.database.load_file(path)
-            self.source_name = os.path.basename(path)
+            self._set_database(self._load_databases([path]), os.path.basename(path), [path])
             QMessageBox.information(parent_widget, "Succès", f"Fichier DBC '{self.source_name}' chargé avec succès.")
             return self.source_name
         except Exception as e:
             QMessageBox.critical(parent_widget, "Erreur de chargement DBC", f"Impossible de charger ou de parser le fichier DBC:\n{e}")
-            self.db = None
-            self.source_name = None
+            self._set_database(None, None)
             return None
 
-    def load_folder(self, parent_widget):
-        """Ouvre une boîte de dialogue pour sélectionner un DOSSIER et fusionne tous les fichiers DBC trouvés."""
-        if not self._check_cantools(parent_widget): return None
+    def load_folder(self, parent_widget, on_loaded=None):
+        """Ouvre une boîte de dialogue pour sélectionner un DOSSIER et fusionne tous les fichiers DBC trouvés.
+
+        Le chargement se fait en arrière-plan : la fenêtre reste utilisable et 'on_loaded(nom du dossier ou None)'
+        est appelé à la fin. Les ID définis dans plusieurs fichiers sont signalés à l'utilisateur."""
+        if not self._check_cantools(parent_widget): return False
+        if self.folder_loader is not None and self.folder_loader.isRunning():
+            QMessageBox.information(parent_widget, "Chargement en cours", "Un dossier DBC est déjà en cours de chargement.")
+            return False
 
         path = QFileDialog.getExistingDirectory(parent_widget, "Select DBC Folder")
         if not path:
-            return None
+            return False
 
-        try:
-            dbc_files = [f for f in os.listdir(path) if f.lower().endswith('.dbc')]
-            
-            if not dbc_files:
-                QMessageBox.warning(parent_widget, "Aucun fichier trouvé", f"Aucun fichier .dbc n'a été trouvé dans le dossier:\n{path}")
-                return None
-
-            merged_db = cantools.database.Database(strict=False)
-            for file_name in dbc_files:
-                file_path = os.path.join(path, file_name)
-                merged_db.add_dbc_file(file_path)
-
-            self.db = merged_db
-            self.source_name = os.path.basename(path)
-            QMessageBox.information(parent_widget, "Succès", 
+        dbc_files = sorted(f for f in os.listdir(path) if f.lower().endswith('.dbc'))
+        if not dbc_files:
+            QMessageBox.warning(parent_widget, "Aucun fichier trouvé", f"Aucun fichier .dbc n'a été trouvé dans le dossier:\n{path}")
+            return False
+
+        folder_name = os.path.basename(path)
+        progress_dialog = QProgressDialog(f"Loading DBC folder '{folder_name}'...", "Cancel", 0, len(dbc_files), parent_widget)
+        progress_dialog.setWindowTitle("Load DBC Folder"); progress_dialog.setWindowModality(Qt.WindowModality.NonModal)
+        progress_dialog.setMinimumDuration(0); progress_dialog.setValue(0)
+
+        loader = DBCFolderLoader([os.path.join(path, file_name) for file_name in dbc_files], self.cache, parent_widget)
+        self.folder_loader = loader
+
+        def on_progress(done, total, file_name):
+            progress_dialog.setLabelText(f"Parsed '{file_name}' ({done}/{total})"); progress_dialog.setValue(done)
+
+        def on_success(db, collisions):
+            progress_dialog.close()
+            self._set_database(db, folder_name, loader.paths); self.loaded_from_cache = False
+            QMessageBox.information(parent_widget, "Succès",
                                     f"{len(dbc_files)} fichier(s) DBC du dossier '{self.source_name}' ont été chargés et fusionnés.")
-            return self.source_name
-        except Exception as e:
-            QMessageBox.critical(parent_widget, "Erreur de chargement DBC", f"Une erreur est survenue lors de la fusion des fichiers DBC:\n{e}")
-            self.db = None
-            self.source_name = None
-            return None
+            if collisions:
+                lines = [f"0x{frame_id:X}{' (ext)' if is_extended else ''}: " + ", ".join(f"{name} [{file_name}]" for name, file_name in defined_by)
+                         for frame_id, is_extended, defined_by in collisions]
+                shown = "\n".join(lines[:20]) + (f"\n... (+{len(lines) - 20})" if len(lines) > 20 else "")
+                QMessageBox.warning(parent_widget, "Collisions d'ID",
+                                    f"{len(collisions)} ID défini(s) dans plusieurs fichiers (la dernière définition est utilisée):\n{shown}")
+            if on_loaded: on_loaded(self.source_name)
+
+        def on_error(message):
+            progress_dialog.close()
+            QMessageBox.critical(parent_widget, "Erreur de chargement DBC", f"Une erreur est survenue lors de la fusion des fichiers DBC:\n{message}")
+            self._set_database(None, None)
+            if on_loaded: on_loaded(None)
+
+        loader.progress.connect(on_progress)
+        loader.loaded.connect(on_success)
+        loader.error_occurred.connect(on_error)
+        progress_dialog.canceled.connect(loader.cancel)
+        loader.finished.connect(progress_dialog.close)
+        loader.start()
+        return True
+
+    def _set_database(self, db, source_name, paths=()):
+        self.db = db; self.source_name = source_name
+        self.source_hash = dbc_hash(paths) if db is not None and paths else None
+        self._build_lookup()
+
+    def _build_lookup(self):
+        """Construit la table ID -> MessageInfo : tableau dense pour les ID 11 bits, dictionnaire au-delà.
+
+        Comme dans cantools, en cas d'ID défini plusieurs fois la dernière définition l'emporte."""
+        self._standard_lookup = [UNKNOWN_MESSAGE] * STANDARD_ID_COUNT
+        self._extended_lookup = {}
+        for message in (self.db.messages if self.db else ()):
+            info = MessageInfo(message.name, message)
+            if message.frame_id < STANDARD_ID_COUNT: self._standard_lookup[message.frame_id] = info
+            else: self._extended_lookup[message.frame_id] = info
+
+    def lookup(self, arbitration_id: int) -> MessageInfo:
+        """Renvoie les métadonnées DBC d'un ID, ou UNKNOWN_MESSAGE s'il est inconnu."""
+        if arbitration_id < STANDARD_ID_COUNT: return self._standard_lookup[arbitration_id]
+        return self._extended_lookup.get(arbitration_id, UNKNOWN_MESSAGE)
+
+    def message_names(self) -> dict:
+        """Noms des messages du DBC chargé, par ID ({} sans DBC)."""
+        return {message.frame_id: message.name for message in self.db.messages} if self.db else {}
+
+    def cycle_times(self) -> dict:
+        """Cycles d'émission du DBC en ms, par ID (messages sans cycle déclaré omis)."""
+        return {message.frame_id: message.cycle_time for message in self.db.messages if message.cycle_time} if self.db else {}
 
     def get_message_name(self, arbitration_id: int) -> str:
         """Récupère le nom d'un message CAN à partir de son ID."""
-        if not self.db:
-            return ""
-        try:
-            return self.db.get_message_by_frame_id(arbitration_id).name
-        except KeyError:
-            return ""
+        return self.lookup(arbitration_id).name
 
     def is_loaded(self) -> bool:
         """Vérifie si une base de données DBC est actuellement chargée."""
@@ -1,8 +1,9 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QComboBox, QPushButton, QDialogButtonBox,
-                             QFormLayout, QLineEdit, QCheckBox, QGroupBox, QHBoxLayout, QLabel, QGridLayout)
+                             QFormLayout, QLineEdit, QCheckBox, QGroupBox, QHBoxLayout, QLabel, QGridLayout, QFileDialog, QMessageBox)
 from PyQt6.QtCore import QRegularExpression
-from PyQt6.QtGui import QRegularExpressionValidator
+from PyQt6.QtGui import QRegularExpressionValidator, QIntValidator, QDoubleValidator
 import serial.tools.list_ports
+from id_filter import parse_filter_list, format_filter_list
 
 class ConnectDialog(QDialog):
     """ Dialogue pour sélectionner un port COM. """
@@ -62,6 +63,24 @@ class SettingsDialog(QDialog):
         form_layout.addRow("CAN Interface:", self.can_device_combo)
         form_layout.addRow("Serial Baudrate:", self.com_baudrate_combo)
         form_layout.addRow("CAN Bitrate:", self.can_baudrate_combo)
+
+        self.serial_framing_combo = QComboBox()
+        self.serial_framing_combo.addItems(["auto", "text"])
+        self.serial_framing_combo.setToolTip("'auto' negotiates the compact binary framing with the Arduino sketch and falls back to text")
+        form_layout.addRow("Serial Framing:", self.serial_framing_combo)
+
+        self.rx_batch_interval = QLineEdit(); self.rx_batch_interval.setValidator(QIntValidator(0, 1000))
+        self.rx_batch_interval.setToolTip("Rx delivery cadence to the GUI in ms (0 = one event per frame)")
+        self.rx_batch_max = QLineEdit(); self.rx_batch_max.setValidator(QIntValidator(1, 100000))
+        self.rx_batch_max.setToolTip("Maximum number of frames per Rx batch (bounds the latency)")
+        form_layout.addRow("Rx Batch (ms):", self.rx_batch_interval)
+        form_layout.addRow("Rx Max Batch:", self.rx_batch_max)
+        self.rx_memory_cap = QLineEdit(); self.rx_memory_cap.setValidator(QIntValidator(1, 16384))
+        self.rx_memory_cap.setToolTip("RAM kept for the trace history in MB; older frames spill to a temporary file on disk")
+        form_layout.addRow("Rx Memory (MB):", self.rx_memory_cap)
+        self.hw_filter_slots = QLineEdit(); self.hw_filter_slots.setValidator(QIntValidator(1, 64))
+        self.hw_filter_slots.setToolTip("Acceptance filter pairs of the python-can interface (the Arduino MCP2515 always has 2 masks / 6 filters)")
+        form_layout.addRow("HW Filter Slots:", self.hw_filter_slots)
         
         self.listen_only_check = QCheckBox("Listen Only Mode")
         
@@ -81,6 +100,11 @@ class SettingsDialog(QDialog):
         baud_map_rev = {125000: "125 Kbit/s", 250000: "250 Kbit/s", 500000: "500 Kbit/s", 1000000: "1 Mbit/s"}
         self.can_baudrate_combo.setCurrentText(baud_map_rev.get(self.settings.get("can_baudrate", 500000)))
         self.listen_only_check.setChecked(self.settings.get("listen_only", True))
+        self.serial_framing_combo.setCurrentText(self.settings.get("serial_framing", "auto"))
+        self.rx_batch_interval.setText(str(self.settings.get("rx_batch_interval_ms", 20)))
+        self.rx_batch_max.setText(str(self.settings.get("rx_batch_max", 256)))
+        self.rx_memory_cap.setText(str(self.settings.get("rx_memory_cap_mb", 64)))
+        self.hw_filter_slots.setText(str(self.settings.get("hw_filter_slots", 4)))
 
     def get_settings(self):
         can_baud_text = self.can_baudrate_combo.currentText().split()[0]
@@ -89,7 +113,12 @@ class SettingsDialog(QDialog):
             "can_device": self.can_device_combo.currentText(),
             "can_baudrate": baudrates.get(can_baud_text, 500000),
             "com_baudrate": int(self.com_baudrate_combo.currentText()),
-            "listen_only": self.listen_only_check.isChecked()
+            "listen_only": self.listen_only_check.isChecked(),
+            "serial_framing": self.serial_framing_combo.currentText(),
+            "rx_batch_interval_ms": int(self.rx_batch_interval.text() or 20),
+            "rx_batch_max": int(self.rx_batch_max.text() or 256),
+            "rx_memory_cap_mb": int(self.rx_memory_cap.text() or 64),
+            "hw_filter_slots": int(self.hw_filter_slots.text() or 4)
         }
 
 class FilterDialog(QDialog):
@@ -117,12 +146,21 @@ class FilterDialog(QDialog):
         range_layout = QGridLayout(range_group)
         self.range_start = QLineEdit("00000000"); self.range_start.setValidator(QRegularExpressionValidator(QRegularExpression("[0-9A-Fa-f]{1,8}")))
         self.range_end = QLineEdit("1FFFFFFF"); self.range_end.setValidator(QRegularExpressionValidator(QRegularExpression("[0-9A-Fa-f]{1,8}")))
-        self.discrete_ids = QLineEdit(); self.discrete_ids.setPlaceholderText("Ex: 100, 1A3, 2FF")
+        self.discrete_ids = QLineEdit(); self.discrete_ids.setPlaceholderText("Ex: 100, 1A3, 300-3FF, 7E0/7F0, HS4_*")
+        self.discrete_ids.setToolTip("IDs, ranges START-END, CODE/MASK pairs and DBC message name patterns, comma-separated.\n"
+                                     "A hex-looking word such as ACC is a message name if the loaded DBC has a message with exactly\n"
+                                     "that name, an ID otherwise. Write 0xACC to force the ID or \"ACC\" to force the name.")
         self.enable_range_filter = QCheckBox("Enable Range Filter")
+        self.hw_offload = QCheckBox("Offload to Hardware Filters")
+        self.hw_offload.setToolTip("Cover these rules with the controller's code/mask pairs; the software filter still drops the extra IDs")
+        self.fp_budget = QLineEdit("32"); self.fp_budget.setValidator(QIntValidator(0, 1 << 29))
+        self.fp_budget.setToolTip("Extra IDs the hardware filters may let through to save pairs (known IDs if any, else the whole ID space)")
         range_layout.addWidget(QLabel("Start ID:"), 0, 0); range_layout.addWidget(self.range_start, 0, 1)
         range_layout.addWidget(QLabel("End ID:"), 1, 0); range_layout.addWidget(self.range_end, 1, 1)
-        range_layout.addWidget(QLabel("Discrete IDs:"), 2, 0); range_layout.addWidget(self.discrete_ids, 2, 1)
+        range_layout.addWidget(QLabel("Discrete Rules:"), 2, 0); range_layout.addWidget(self.discrete_ids, 2, 1)
         range_layout.addWidget(self.enable_range_filter, 3, 0, 1, 2)
+        range_layout.addWidget(self.hw_offload, 4, 0, 1, 2)
+        range_layout.addWidget(QLabel("False-Positive Budget:"), 5, 0); range_layout.addWidget(self.fp_budget, 5, 1)
         main_layout.addWidget(range_group)
         
         button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
@@ -142,10 +180,20 @@ class FilterDialog(QDialog):
             self.range_end.setText(f"{self.parent.range_filter.get('end', 0x1FFFFFFF):X}")
         
         if self.parent.discrete_filters:
-            self.discrete_ids.setText(", ".join([f"{fid:X}" for fid in self.parent.discrete_filters]))
+            self.discrete_ids.setText(format_filter_list(self.parent.discrete_filters, self._message_names()))
             
         is_range_group_enabled = self.parent.range_filter_enabled or self.parent.discrete_filter_enabled
         self.enable_range_filter.setChecked(is_range_group_enabled)
+        self.hw_offload.setChecked(self.parent.hw_offload)
+        self.fp_budget.setText(str(self.parent.fp_budget))
+
+    def _message_names(self):
+        return self.parent.dbc_manager.message_names() if self.parent else None
+
+    def accept(self):
+        try: parse_filter_list(self.discrete_ids.text(), self._message_names())
+        except ValueError as e: QMessageBox.warning(self, "Filter", str(e)); return
+        super().accept()
 
     def get_filters(self):
         filters = {
@@ -154,7 +202,9 @@ class FilterDialog(QDialog):
             'range_enabled': self.enable_range_filter.isChecked(),
             'range': {},
             'discrete_enabled': self.enable_range_filter.isChecked(),
-            'discrete_ids': []
+            'discrete_rules': {},
+            'hw_offload': self.hw_offload.isChecked(),
+            'fp_budget': int(self.fp_budget.text() or 0)
         }
         
         if filters['mask_enabled']:
@@ -176,15 +226,65 @@ class FilterDialog(QDialog):
                 filters['range'] = {}
 
             try:
-                id_text = self.discrete_ids.text()
-                if id_text:
-                    id_list = [int(sid.strip(), 16) for sid in id_text.split(',') if sid.strip()]
-                    filters['discrete_ids'] = id_list
-            except (ValueError, TypeError):
-                filters['discrete_ids'] = []
+                filters['discrete_rules'] = parse_filter_list(self.discrete_ids.text(), self._message_names())
+            except ValueError:
+                filters['discrete_rules'] = {}
         
-        if not filters['range'] and not filters['discrete_ids']:
+        if not filters['range'] and not any(filters['discrete_rules'].values()):
             filters['range_enabled'] = False
             filters['discrete_enabled'] = False
             
-        return filters
\ No newline at end of file
+        return filters
+class ReplayDialog(QDialog):
+    """ Dialogue de rejeu d'une trace enregistrée sur le bus. """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Replay Trace")
+        layout = QVBoxLayout(self)
+        form_layout = QFormLayout()
+
+        path_layout = QHBoxLayout()
+        self.path_edit = QLineEdit(); self.path_edit.setMinimumWidth(320)
+        browse_button = QPushButton("Browse..."); browse_button.clicked.connect(self.browse)
+        path_layout.addWidget(self.path_edit); path_layout.addWidget(browse_button)
+        form_layout.addRow("Trace File:", path_layout)
+
+        self.speed_edit = QLineEdit("1.0"); self.speed_edit.setValidator(QDoubleValidator(0.01, 1000.0, 3))
+        self.speed_edit.setToolTip("Playback speed multiplier (2.0 = twice as fast)")
+        form_layout.addRow("Speed:", self.speed_edit)
+
+        self.ids_edit = QLineEdit(); self.ids_edit.setPlaceholderText("Ex: 100, 1A3, 200-2FF (empty = all)")
+        form_layout.addRow("IDs:", self.ids_edit)
+        self.exclude_check = QCheckBox("Exclude listed IDs")
+        form_layout.addRow(self.exclude_check)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addLayout(form_layout)
+        layout.addWidget(button_box)
+
+    def browse(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Replay Trace", "", "CANLab Trace (*.cltrace);;Rx Tracer Export (*.txt *.csv)")
+        if path: self.path_edit.setText(path)
+
+    def get_settings(self):
+        """Renvoie {'path', 'speed', 'id_filter'} ; 'id_filter' vaut None si toutes les trames sont rejouées.
+        Lève ValueError si la liste d'ID est invalide."""
+        try: speed = float(self.speed_edit.text())
+        except ValueError: speed = 1.0
+        ids = set(); ranges = []
+        for token in self.ids_edit.text().split(','):
+            token = token.strip()
+            if not token: continue
+            if '-' in token:
+                start, end = (int(part.strip(), 16) for part in token.split('-', 1)); ranges.append((min(start, end), max(start, end)))
+            else:
+                ids.add(int(token, 16))
+        id_filter = None
+        if ids or ranges:
+            ids = frozenset(ids); ranges = tuple(ranges); exclude = self.exclude_check.isChecked()
+            def id_filter(msg_id):
+                listed = msg_id in ids or any(start <= msg_id <= end for start, end in ranges)
+                return listed != exclude
+        return {'path': self.path_edit.text().strip(), 'speed': speed, 'id_filter': id_filter}
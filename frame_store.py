@@ -0,0 +1,242 @@
+import os
+import struct
+import tempfile
+from array import array
+
+# Bits du champ 'flags' d'une trame stockée
+FLAG_EXTENDED = 0x01
+FLAG_REMOTE = 0x02
+FLAG_ERROR = 0x04
+
+PAYLOAD_SIZE = 8
+
+# Enregistrement binaire d'une trame dans le segment de débordement : timestamp, ID, DLC, flags, 8 octets.
+RECORD = struct.Struct('<dIBB8s')
+RECORD_SIZE = RECORD.size # 22 octets, identique à l'empreinte mémoire d'une trame dans l'anneau
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SPILL_CHUNK = 4096       # Nombre de trames déversées d'un coup quand l'anneau est plein
+READ_BLOCK = 512         # Nombre de trames relues d'un coup depuis le segment
+
+
+def message_flags(msg) -> int:
+    """Résume les attributs booléens d'un can.Message dans un octet de flags."""
+    flags = 0
+    if msg.is_extended_id: flags |= FLAG_EXTENDED
+    if msg.is_remote_frame: flags |= FLAG_REMOTE
+    if msg.is_error_frame: flags |= FLAG_ERROR
+    return flags
+
+
+class FrameStore:
+    """Stockage colonnaire et borné des trames reçues.
+
+    Les trames récentes vivent dans un anneau de colonnes 'array' préallouées dont la taille est fixée
+    par 'max_bytes' (22 octets par trame). Quand l'anneau est plein, les trames les plus anciennes sont
+    déversées par blocs dans un segment binaire en ajout seul sur disque. L'indexation et l'itération
+    couvrent tout l'historique : l'indice 0 est toujours la première trame reçue."""
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, spill_dir=None):
+        self.spill_dir = spill_dir
+        self._spill_path = None; self._spill_writer = None; self._spill_reader = None
+        self._generation = 0
+        self._allocate(max_bytes)
+
+    def _allocate(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.capacity = max(SPILL_CHUNK * 2, max_bytes // RECORD_SIZE)
+        self.timestamps = array('d', [0.0]) * self.capacity
+        self.ids = array('I', [0]) * self.capacity
+        self.dlcs = array('B', [0]) * self.capacity
+        self.flags = array('B', [0]) * self.capacity
+        self.payloads = bytearray(self.capacity * PAYLOAD_SIZE)
+        self._head = 0      # Slot de la plus ancienne trame encore en mémoire
+        self._count = 0     # Nombre de trames en mémoire
+        self.spilled = 0    # Nombre de trames déversées sur disque
+        self._block_index = -1; self._block = []
+        self._publish(new_generation=True)
+
+    def _publish(self, new_generation=False):
+        """Publie en une seule affectation (génération, trames déversées, slot de tête), lue sans verrou par
+        les FrameSnapshot d'autres threads. La génération change quand l'anneau est vidé ou réalloué."""
+        if new_generation: self._generation += 1
+        self._state = (self._generation, self.spilled, self._head)
+
+    def __len__(self):
+        return self.spilled + self._count
+
+    def append(self, msg):
+        """Ajoute un can.Message à la fin du stockage."""
+        if self._count == self.capacity: self._spill(SPILL_CHUNK)
+        slot = (self._head + self._count) % self.capacity
+        dlc = min(msg.dlc, PAYLOAD_SIZE); offset = slot * PAYLOAD_SIZE
+        self.timestamps[slot] = msg.timestamp
+        self.ids[slot] = msg.arbitration_id
+        self.dlcs[slot] = dlc
+        self.flags[slot] = message_flags(msg)
+        self.payloads[offset:offset + PAYLOAD_SIZE] = bytes(msg.data[:PAYLOAD_SIZE]).ljust(PAYLOAD_SIZE, b'\x00')
+        self._count += 1
+
+    def extend(self, msgs):
+        for msg in msgs: self.append(msg)
+
+    def clear(self, max_bytes=None):
+        """Vide le stockage et supprime le segment sur disque. 'max_bytes' permet de redimensionner l'anneau."""
+        self._close_spill()
+        if max_bytes is not None and max_bytes != self.max_bytes:
+            self._allocate(max_bytes)
+        else:
+            self._head = 0; self._count = 0; self.spilled = 0
+            self._block_index = -1; self._block = []
+            self._publish(new_generation=True)
+
+    def close(self):
+        self._close_spill()
+
+    # --- Débordement sur disque ---
+    def _spill(self, n):
+        """Écrit les 'n' trames les plus anciennes de l'anneau à la fin du segment et libère leurs slots."""
+        if self._spill_writer is None:
+            fd, self._spill_path = tempfile.mkstemp(prefix="canlab_trace_", suffix=".seg", dir=self.spill_dir)
+            self._spill_writer = os.fdopen(fd, 'ab')
+        pack = RECORD.pack; chunk = []
+        for k in range(n):
+            slot = (self._head + k) % self.capacity; offset = slot * PAYLOAD_SIZE
+            chunk.append(pack(self.timestamps[slot], self.ids[slot], self.dlcs[slot], self.flags[slot],
+                              bytes(self.payloads[offset:offset + PAYLOAD_SIZE])))
+        # Vidé avant publication : un FrameSnapshot relit sur disque toute trame déclarée déversée.
+        self._spill_writer.write(b''.join(chunk)); self._spill_writer.flush()
+        self._head = (self._head + n) % self.capacity
+        self._count -= n
+        self.spilled += n
+        self._publish()
+
+    def _close_spill(self):
+        for handle in (self._spill_writer, self._spill_reader):
+            if handle: handle.close()
+        self._spill_writer = self._spill_reader = None
+        if self._spill_path:
+            try: os.remove(self._spill_path)
+            except OSError: pass
+            self._spill_path = None
+
+    def _read_spilled(self, start, count):
+        """Relit 'count' enregistrements du segment à partir de l'indice 'start'."""
+        self._spill_writer.flush()
+        if self._spill_reader is None: self._spill_reader = open(self._spill_path, 'rb')
+        self._spill_reader.seek(start * RECORD_SIZE)
+        return list(RECORD.iter_unpack(self._spill_reader.read(count * RECORD_SIZE)))
+
+    def _spilled_record(self, index):
+        block_index = index // READ_BLOCK
+        if block_index != self._block_index:
+            start = block_index * READ_BLOCK
+            self._block = self._read_spilled(start, min(READ_BLOCK, self.spilled - start))
+            self._block_index = block_index
+        return self._block[index - block_index * READ_BLOCK]
+
+    # --- Accès ---
+    def frame(self, index):
+        """Renvoie la trame 'index' (0 = plus ancienne) sous la forme (timestamp, id, dlc, flags, data).
+        Une trame remote n'a pas de données : son DLC n'est que la longueur demandée."""
+        if index < 0: index += len(self)
+        if index < self.spilled:
+            timestamp, msg_id, dlc, flags, payload = self._spilled_record(index)
+            return timestamp, msg_id, dlc, flags, b"" if flags & FLAG_REMOTE else payload[:dlc]
+        slot = (self._head + index - self.spilled) % self.capacity; offset = slot * PAYLOAD_SIZE
+        dlc = self.dlcs[slot]; flags = self.flags[slot]
+        return self.timestamps[slot], self.ids[slot], dlc, flags, b"" if flags & FLAG_REMOTE else bytes(self.payloads[offset:offset + dlc])
+
+    def data(self, index) -> bytes:
+        """Renvoie les octets utiles (DLC) de la trame d'indice 'index'."""
+        return self.frame(index)[4]
+
+    def ring_slices(self):
+        """Plages de slots [début, fin) de l'anneau, dans l'ordre chronologique (au plus deux)."""
+        end = self._head + self._count
+        if end <= self.capacity: return [(self._head, end)]
+        return [(self._head, self.capacity), (0, end - self.capacity)]
+
+    def spill_file(self):
+        """Chemin du segment sur disque (vidé au préalable), ou None si rien n'a été déversé."""
+        if self._spill_writer is None: return None
+        self._spill_writer.flush()
+        return self._spill_path
+
+    def snapshot(self):
+        """Historique figé à sa longueur actuelle, lisible depuis un autre thread pendant que le stockage
+        continue d'évoluer. Rien n'est copié ici : voir FrameSnapshot."""
+        return FrameSnapshot(self)
+
+    def __iter__(self):
+        """Parcourt tout l'historique en lisant le segment sur disque par blocs (mémoire constante)."""
+        spilled, count = self.spilled, self._count
+        for start in range(0, spilled, READ_BLOCK * 8):
+            for timestamp, msg_id, dlc, flags, payload in self._read_spilled(start, min(READ_BLOCK * 8, spilled - start)):
+                yield timestamp, msg_id, dlc, flags, b"" if flags & FLAG_REMOTE else payload[:dlc]
+        for index in range(spilled, spilled + count):
+            yield self.frame(index)
+
+
+class FrameSnapshot:
+    """Historique figé renvoyé par FrameStore.snapshot() : les trames 0 à len - 1 du stockage.
+
+    Seules les positions sont figées. L'itération lit les trames par blocs, sur disque pour celles déjà
+    déversées, dans l'anneau pour les autres. Un bloc de l'anneau déversé pendant sa copie est relu sur
+    disque. ValueError si le stockage est vidé avant la fin de la lecture."""
+    def __init__(self, store):
+        self.store = store
+        self.generation = store._state[0]
+        self.length = len(store)
+        self._reader = None
+
+    def __len__(self):
+        return self.length
+
+    def close(self):
+        if self._reader: self._reader.close(); self._reader = None
+
+    def state(self):
+        """État publié du stockage (génération, trames déversées, slot de tête) ; ValueError s'il a été vidé."""
+        state = self.store._state
+        if state[0] != self.generation: raise ValueError("Historique vidé pendant la lecture.")
+        return state
+
+    def spill_reader(self):
+        """Descripteur propre au snapshot sur le segment disque (ouvert au premier appel)."""
+        if self._reader is None: self._reader = open(self.store._spill_path, 'rb')
+        return self._reader
+
+    def _read_spilled(self, start, count):
+        reader = self.spill_reader(); reader.seek(start * RECORD_SIZE)
+        return [(timestamp, msg_id, dlc, flags, b"" if flags & FLAG_REMOTE else payload[:dlc])
+                for timestamp, msg_id, dlc, flags, payload in RECORD.iter_unpack(reader.read(count * RECORD_SIZE))]
+
+    def _copy_ring(self, state, start, count):
+        """Copie les trames [start, start + count) depuis l'anneau selon 'state'."""
+        store = self.store; capacity = store.capacity; _, spilled, head = state
+        frames = []
+        slot = (head + start - spilled) % capacity
+        while count:
+            n = min(count, capacity - slot); end = slot + n
+            timestamps, ids, dlcs, flags = store.timestamps[slot:end], store.ids[slot:end], store.dlcs[slot:end], store.flags[slot:end]
+            payloads = bytes(store.payloads[slot * PAYLOAD_SIZE:end * PAYLOAD_SIZE])
+            for k in range(n):
+                dlc = dlcs[k]; offset = k * PAYLOAD_SIZE
+                frames.append((timestamps[k], ids[k], dlc, flags[k], b"" if flags[k] & FLAG_REMOTE else payloads[offset:offset + dlc]))
+            count -= n; slot = 0
+        return frames
+
+    def __iter__(self):
+        index = 0
+        while index < self.length:
+            count = min(READ_BLOCK * 8, self.length - index)
+            state = self.state()
+            if index < state[1]:
+                frames = self._read_spilled(index, min(count, state[1] - index))
+            else:
+                frames = self._copy_ring(state, index, count)
+                # Un déversement publié pendant la copie a pu libérer ces slots : le bloc est relu sur disque.
+                if self.store._state is not state: continue
+            self.state()
+            yield from frames
+            index += len(frames)
@@ -0,0 +1,298 @@
+"""Optimisation des filtres matériels d'acceptation : couvre les règles de réception par le moins de couples
+code/masque possible, dans la limite des registres du contrôleur.
+
+Le filtre matériel n'est qu'un pré-filtre : il doit laisser passer tout ce que les règles acceptent, et
+les ID en trop ("faux positifs") sont éliminés ensuite par le filtre logiciel (id_filter). On cherche
+donc un compromis entre nombre de couples et faux positifs :
+  1. couverture exacte : ID et plages sont découpés en blocs alignés, puis les couples qui ne diffèrent
+     que d'un bit sous le même masque sont fusionnés (Quine-McCluskey), sans aucun faux positif ;
+  2. fusions gloutonnes avec perte : à chaque étape, la fusion qui ajoute le moins de faux positifs,
+     jusqu'à tenir dans les registres, puis tant que le budget de faux positifs le permet.
+
+Les couples suivent la convention python-can : {'can_id': code, 'can_mask': masque, 'extended': bool},
+un ID passe si (id & masque) == (code & masque). Comme pour la table 11 bits d'id_filter, les valeurs
+< 0x800 sont traitées comme des ID standard et les autres comme des ID étendus ; une règle code/masque
+couvre les deux types si son masque 29 bits accepte des ID des deux côtés. Pour le MCP2515 de la
+passerelle Arduino, les couples partagent en plus deux masques (RXB0 : masque 0 et filtres 0-1 ; RXB1 :
+masque 1 et filtres 2-5). Sans univers fourni, les faux positifs sont comptés sur tout l'espace des ID
+(exact en 11 bits, estimé en 29 bits) ; avec 'universe' (ID connus : Monitor, DBC), seuls ceux-là comptent."""
+import fnmatch
+from itertools import combinations
+
+STANDARD_BITS = 11
+EXTENDED_BITS = 29
+MCP2515_FILTERS_PER_MASK = (2, 4)
+
+
+def _contains(outer, inner):
+    """Vrai si le couple 'inner' n'accepte que des ID acceptés par 'outer'."""
+    return inner[1] & outer[1] == outer[1] and inner[0] & outer[1] == outer[0]
+
+
+def _size(mask, bits):
+    return 1 << (bits - bin(mask & ((1 << bits) - 1)).count("1"))
+
+
+class _Space:
+    """Espace d'ID (11 ou 29 bits), couples voulus et décompte des faux positifs."""
+    def __init__(self, bits, wanted, universe):
+        self.bits = bits; self.full = (1 << bits) - 1
+        self.wanted = list(wanted)
+        if bits == STANDARD_BITS:
+            # En 11 bits, les ensembles d'ID sont des entiers de 2048 bits : unions et décomptes exacts.
+            undesired = (1 << (1 << bits)) - 1 if universe is None else sum(1 << i for i in set(universe) if i <= self.full)
+            for code, mask in self.wanted: undesired &= ~self._ids(code, mask)
+            self.undesired = undesired
+        else:
+            self.undesired_ids = None if universe is None else [
+                i for i in set(universe) if 1 << STANDARD_BITS <= i <= self.full and not any(i & mask == code for code, mask in self.wanted)]
+
+    def _ids(self, code, mask):
+        ids = 1 << (code & mask)
+        for bit in range(self.bits):
+            if not mask >> bit & 1: ids |= ids << (1 << bit)
+        return ids
+
+    def accepted(self, code, mask):
+        """ID indésirables acceptés par le couple (entier-ensemble en 11 bits, ensemble sinon, None si inconnu)."""
+        if self.bits == STANDARD_BITS: return self._ids(code, mask) & self.undesired
+        if self.undesired_ids is not None: return frozenset(i for i in self.undesired_ids if i & mask == code & mask)
+        return None
+
+    def false_positives(self, pairs):
+        if self.bits == STANDARD_BITS:
+            union = 0
+            for code, mask in pairs: union |= self.accepted(code, mask)
+            return bin(union).count("1")
+        if self.undesired_ids is not None:
+            return len(frozenset().union(*(self.accepted(code, mask) for code, mask in pairs))) if pairs else 0
+        # Estimation sans univers : taille du couple moins les couples voulus qu'il contient (recouvrements ignorés).
+        return sum(max(0, _size(mask, self.bits) - sum(_size(w[1], self.bits) for w in self.wanted if _contains((code, mask), w)))
+                   for code, mask in pairs)
+
+    def pair_cost(self, code, mask):
+        if self.bits == STANDARD_BITS: return bin(self.accepted(code, mask)).count("1")
+        return self.false_positives([(code, mask)])
+
+
+def _range_pairs(start, end, full):
+    """Découpe la plage [start, end] en blocs alignés (couples exacts)."""
+    pairs = []
+    while start <= end:
+        size = start & -start or full + 1
+        while size > end - start + 1: size >>= 1
+        pairs.append((start, full & ~(size - 1))); start += size
+    return pairs
+
+
+def _rule_groups(ids=(), ranges=(), masks=(), universe=None):
+    """Couples exacts des règles, répartis en espaces standard et étendu : [(espace, couples)]."""
+    split = {STANDARD_BITS: set(), EXTENDED_BITS: set()}
+    standard_end = (1 << STANDARD_BITS) - 1; extended_end = (1 << EXTENDED_BITS) - 1
+    for frame_id in ids:
+        if 0 <= frame_id <= standard_end: split[STANDARD_BITS].add((frame_id, standard_end))
+        elif frame_id <= extended_end: split[EXTENDED_BITS].add((frame_id, extended_end))
+    for start, end in ranges:
+        start = max(0, start); end = min(end, extended_end)
+        if start <= min(end, standard_end): split[STANDARD_BITS].update(_range_pairs(start, min(end, standard_end), standard_end))
+        if max(start, standard_end + 1) <= end: split[EXTENDED_BITS].update(_range_pairs(max(start, standard_end + 1), end, extended_end))
+    for code, mask in masks:
+        mask &= extended_end; code &= mask
+        if code <= standard_end:
+            split[STANDARD_BITS].add((code, mask & standard_end))
+            # Comme dans id_filter, un masque qui laisse libres des bits au-delà du 11e accepte aussi des ID étendus.
+            if ~mask & extended_end & ~standard_end: split[EXTENDED_BITS].add((code, mask))
+        else: split[EXTENDED_BITS].add((code, mask))
+    return [(_Space(bits, pairs, universe), _exact_cover(pairs, bits)) for bits, pairs in split.items() if pairs]
+
+
+def _exact_cover(pairs, bits):
+    """Couverture exacte des couples 'pairs' par des implicants premiers (Quine-McCluskey)."""
+    level = set(pairs); primes = set()
+    while level:
+        merged = set(); used = set(); by_mask = {}
+        for code, mask in level: by_mask.setdefault(mask, set()).add(code)
+        for mask, codes in by_mask.items():
+            for code in codes:
+                for bit in range(bits):
+                    if mask >> bit & 1 and not code >> bit & 1 and code | (1 << bit) in codes:
+                        merged.add((code, mask & ~(1 << bit)))
+                        used.add((code, mask)); used.add((code | (1 << bit), mask))
+        primes |= level - used
+        level = merged
+    # Implicants pris du plus large au plus étroit, un implicant qui n'apporte rien est écarté.
+    remaining = set(pairs); cover = []
+    for prime in sorted(primes, key=lambda pair: (bin(pair[1]).count("1"), pair)):
+        covered = {pair for pair in remaining if _contains(prime, pair)}
+        if covered: cover.append(prime); remaining -= covered
+    return cover
+
+
+def _merge(first, second):
+    """Plus petit couple couvrant les deux : les bits où les codes diffèrent deviennent indifférents."""
+    mask = first[1] & second[1] & ~(first[0] ^ second[0])
+    return first[0] & mask, mask
+
+
+def _greedy(pairs, space, max_pairs, budget):
+    """Fusions successives de moindre coût. Renvoie les états parcourus [(couples, faux positifs)] : tous
+    jusqu'à 'max_pairs' couples, puis tant que le budget est tenu."""
+    costs = {pair: space.pair_cost(*pair) for pair in pairs}
+    total = space.false_positives(pairs)
+    states = [(list(pairs), total)]
+    while len(pairs) > 1:
+        best = None
+        for i, j in combinations(range(len(pairs)), 2):
+            merged = _merge(pairs[i], pairs[j])
+            if merged not in costs: costs[merged] = space.pair_cost(*merged)
+            added = costs[merged] - costs[pairs[i]] - costs[pairs[j]]
+            if best is None or added < best[0]: best = (added, i, j, merged)
+        _, i, j, merged = best
+        # Un couple déjà contenu dans le couple fusionné disparaît.
+        candidate = [pair for k, pair in enumerate(pairs) if k not in (i, j) and not _contains(merged, pair)] + [merged]
+        candidate_total = space.false_positives(candidate)
+        if len(pairs) <= max_pairs and candidate_total > budget: break
+        pairs = candidate; total = candidate_total
+        states.append((list(pairs), total))
+    return states
+
+
+def _choices(trajectories):
+    if len(trajectories) == 1: return [(state,) for state in trajectories[0]]
+    return [(first, second) for first in trajectories[0] for second in trajectories[1]]
+
+
+def _as_filters(pairs, extended):
+    return [{'can_id': code, 'can_mask': mask, 'extended': extended} for code, mask in pairs]
+
+
+def optimize_filters(ids=(), max_pairs=4, budget=0, universe=None, ranges=(), masks=()):
+    """Couples code/masque (format python-can) couvrant les règles 'ids', 'ranges' ((début, fin)) et
+    'masks' ((code, masque)), au plus 'max_pairs'.
+
+    Parmi les solutions qui tiennent dans 'max_pairs', la plus compacte dont les faux positifs ne dépassent
+    pas 'budget' est retenue, sinon celle qui en a le moins. Renvoie (filtres, faux positifs) ; ([], 0) sans
+    règle et ([], None) si aucune solution ne tient (ID standard et étendus avec un seul couple)."""
+    groups = _rule_groups(ids, ranges, masks, universe)
+    if not groups: return [], 0
+    if max_pairs < len(groups): return [], None
+    # Standard et étendu ne partagent pas de couple : chaque espace réduit les siens jusqu'au bout, puis
+    # les emplacements sont répartis entre les deux au mieux.
+    trajectories = [_greedy(pairs, space, max_pairs if len(groups) == 1 else 1, budget) for space, pairs in groups]
+    best = None
+    for choice in _choices(trajectories):
+        count = sum(len(pairs) for pairs, _ in choice)
+        if count > max_pairs: continue
+        total = sum(false_positives for _, false_positives in choice)
+        key = (total > budget, count if total <= budget else total, total)
+        if best is None or key < best[0]: best = (key, choice)
+    filters = []
+    for (space, _), (pairs, _) in zip(groups, best[1]): filters += _as_filters(pairs, space.bits == EXTENDED_BITS)
+    return filters, best[0][2]
+
+
+def optimize_mcp2515(ids=(), budget=0, universe=None, ranges=(), masks=()):
+    """Comme optimize_filters, avec la contrainte du MCP2515 : deux masques partagés, l'un par 2 filtres,
+    l'autre par 4 ; un masque ne sert que des ID d'un même type (standard ou étendu).
+    Renvoie (filtres, faux positifs), filtres rangés dans l'ordre des emplacements du contrôleur."""
+    return _mcp2515_layout(_rule_groups(ids, ranges, masks, universe), budget)
+
+
+def fit_mcp2515(can_filters):
+    """Range des couples quelconques (format python-can) dans la disposition du MCP2515, en les élargissant
+    au minimum si nécessaire. Un couple sans clé 'extended' est classé d'après son ID. Renvoie les filtres."""
+    groups = []
+    for extended, bits in ((False, STANDARD_BITS), (True, EXTENDED_BITS)):
+        full = (1 << bits) - 1
+        pairs = {(f['can_id'] & f['can_mask'] & full, f['can_mask'] & full) for f in can_filters
+                 if f.get('extended', f['can_id'] >= 1 << STANDARD_BITS) == extended}
+        if pairs: groups.append((_Space(bits, pairs, None), sorted(pairs)))
+    return _mcp2515_layout(groups, 0)[0]
+
+
+def _mcp2515_layout(groups, budget):
+    """Meilleure répartition des couples de 'groups' ([(espace, couples)]) entre les deux bancs du MCP2515."""
+    if not groups: return [], 0
+    # Standard et étendu : un banc chacun, donc chaque trajectoire doit descendre jusqu'à 2 couples.
+    max_pairs = sum(MCP2515_FILTERS_PER_MASK) if len(groups) == 1 else min(MCP2515_FILTERS_PER_MASK)
+    best = None
+    for candidates in _choices([_greedy(pairs, space, max_pairs, budget) for space, pairs in groups]):
+        tagged = [(space, pair) for (space, _), (pairs, _) in zip(groups, candidates) for pair in pairs]
+        if len(tagged) > sum(MCP2515_FILTERS_PER_MASK): continue
+        for first in _subsets(len(tagged), MCP2515_FILTERS_PER_MASK[0]):
+            banks = [[tagged[k] for k in first], [tagged[k] for k in range(len(tagged)) if k not in first]]
+            if len(banks[1]) > MCP2515_FILTERS_PER_MASK[1] or any(len({space for space, _ in bank}) > 1 for bank in banks): continue
+            layout = []; by_space = {}
+            for bank in banks:
+                if not bank: layout.append(None); continue
+                mask = bank[0][1][1]
+                for _, (code, pair_mask) in bank: mask &= pair_mask
+                layout.append((bank[0][0], mask, [code & mask for _, (code, _) in bank]))
+                by_space.setdefault(bank[0][0], []).extend((code & mask, mask) for _, (code, _) in bank)
+            total = sum(space.false_positives(pairs) for space, pairs in by_space.items())
+            key = (total, len(tagged))
+            if best is None or key < best[0]: best = (key, layout)
+    (total, _), layout = best
+    # Un banc vide reprend le masque et un code de l'autre : un filtre resté à zéro accepterait des ID en trop.
+    if layout[0] is None: layout[0] = (layout[1][0], layout[1][1], layout[1][2][:1])
+    if layout[1] is None: layout[1] = (layout[0][0], layout[0][1], layout[0][2][:1])
+    filters = []
+    for (space, mask, codes), slots in zip(layout, MCP2515_FILTERS_PER_MASK):
+        filters += _as_filters([(code, mask) for code in (codes * slots)[:slots]], space.bits == EXTENDED_BITS)
+    return filters, total
+
+
+def _subsets(count, size):
+    return [set(subset) for k in range(min(size, count) + 1) for subset in combinations(range(count), k)]
+
+
+def offload_software_filter(range_filter, discrete_filter, names=None, max_pairs=4, budget=0, universe=None, mcp2515=False):
+    """Filtres matériels couvrant les filtres logiciels au format du GUI (voir id_filter.compile_software_filter),
+    pour python-can ('max_pairs' couples) ou le MCP2515. Renvoie (filtres, faux positifs) ; ([], None) si
+    aucun filtre logiciel n'est actif ou si aucune solution ne tient : toutes les trames passent alors."""
+    range_enabled = range_filter.get('enabled', False); discrete_enabled = discrete_filter.get('enabled', False)
+    if not range_enabled and not discrete_enabled: return [], None
+    ranges = [(range_filter.get('start', 0), range_filter.get('end', (1 << EXTENDED_BITS) - 1))] if range_enabled else []
+    ids = set(); masks = []
+    if discrete_enabled:
+        ranges += list(discrete_filter.get('ranges', ())); ids.update(discrete_filter.get('ids', ())); masks = list(discrete_filter.get('masks', ()))
+        for pattern in discrete_filter.get('patterns', ()):
+            ids.update(frame_id for frame_id, name in (names or {}).items() if fnmatch.fnmatchcase(name, pattern))
+    if not (ids or ranges or masks): return [], None
+    if mcp2515: return optimize_mcp2515(ids, budget, universe, ranges, masks)
+    return optimize_filters(ids, max_pairs, budget, universe, ranges, masks)
+
+
+def mcp2515_commands(can_filters):
+    """Commandes série du sketch ("K:n,e,MASQUE" puis "F:n,e,ID") pour des filtres rangés comme ceux
+    d'optimize_mcp2515 ou de fit_mcp2515. Une liste vide rétablit l'acceptation de toutes les trames
+    (masques à zéro). ValueError si les filtres ne respectent pas la disposition du MCP2515."""
+    if not can_filters: return b"K:0,0,0\nK:1,0,0\n"
+    if len(can_filters) != sum(MCP2515_FILTERS_PER_MASK): raise ValueError("Le MCP2515 attend 6 filtres (2 + 4)")
+    lines = []; slot = 0
+    for bank, slots in enumerate(MCP2515_FILTERS_PER_MASK):
+        bank_filters = can_filters[slot:slot + slots]
+        masks = {f['can_mask'] for f in bank_filters}; kinds = {bool(f.get('extended')) for f in bank_filters}
+        if len(masks) != 1 or len(kinds) != 1: raise ValueError(f"Les filtres du masque {bank} doivent partager masque et type d'ID")
+        lines.append(f"K:{bank},{int(kinds.pop())},{masks.pop():X}")
+        for f in bank_filters:
+            lines.append(f"F:{slot},{int(bool(f.get('extended')))},{f['can_id'] & f['can_mask']:X}"); slot += 1
+    return ("\n".join(lines) + "\n").encode('ascii')
+
+
+if __name__ == "__main__":
+    # Banc d'essai : règles typiques, contraintes python-can (4 couples) et MCP2515 (2 masques, 6 filtres).
+    import random, time
+    cases = {
+        "diag 7DF + 7E0-7EF": {'ids': [0x7DF], 'ranges': [(0x7E0, 0x7EF)]},
+        "plage 123-3FF": {'ranges': [(0x123, 0x3FF)]},
+        "40 ID standard aléatoires": {'ids': random.Random(0).sample(range(0x800), 40)},
+        "UDS 29 bits 18DA00F1/1FFF00FF + 7E8": {'ids': [0x7E8], 'masks': [(0x18DA00F1, 0x1FFF00FF)]},
+        "plage 29 bits 18FF0000-18FFFFFF": {'ranges': [(0x18FF0000, 0x18FFFFFF)]},
+    }
+    for name, rules in cases.items():
+        for label, optimize in (("python-can x4", lambda: optimize_filters(max_pairs=4, budget=8, **rules)),
+                                ("MCP2515", lambda: optimize_mcp2515(budget=8, **rules))):
+            start = time.perf_counter(); filters, false_positives = optimize(); elapsed = time.perf_counter() - start
+            print(f"{name:36} {label:14}: {len({(f['can_id'], f['can_mask']) for f in filters})} couples distincts, "
+                  f"{false_positives:8} faux positifs ({elapsed * 1000:.0f} ms)")
@@ -0,0 +1,147 @@
+"""Compilation des filtres logiciels de réception en un prédicat immuable sur l'ID de trame.
+
+Une règle accepte un ID : plage (début, fin), ID isolé, couple (code, masque) au sens des filtres
+matériels ((id & masque) == (code & masque)) ou motif de nom de message DBC (jokers fnmatch). Une trame
+passe si une règle au moins l'accepte. Le résultat, IdFilter, répond en temps constant pour les ID
+11 bits (table de 2048 octets) et par dichotomie sur des intervalles triés pour les ID 29 bits."""
+import fnmatch
+import re
+from array import array
+from bisect import bisect_right
+
+STANDARD_ID_COUNT = 0x800
+MAX_ID = 0x1FFFFFFF
+MAX_MASK_INTERVALS = 4096    # Au-delà, un couple code/masque 29 bits est testé tel quel plutôt que déplié
+
+_HEX = re.compile(r"(?:0[xX])?[0-9A-Fa-f]{1,8}")
+_PATTERN = re.compile(r"[\w*?\[\]!]+")
+
+
+class IdFilter:
+    """Prédicat compilé : 'id_filter(arbitration_id) -> bool'. Immuable, donc partageable entre threads sans verrou."""
+    __slots__ = ("table", "starts", "ends", "masks")
+
+    def __init__(self, table, starts, ends, masks):
+        self.table = table      # bytes : 1 si l'ID 11 bits passe
+        self.starts = starts    # Intervalles 29 bits fusionnés, triés : [starts[i], ends[i]]
+        self.ends = ends
+        self.masks = masks      # Couples (code, masque) 29 bits non dépliés
+
+    def __call__(self, arbitration_id):
+        if arbitration_id < STANDARD_ID_COUNT: return self.table[arbitration_id] == 1
+        index = bisect_right(self.starts, arbitration_id) - 1
+        if index >= 0 and arbitration_id <= self.ends[index]: return True
+        for code, mask in self.masks:
+            if arbitration_id & mask == code: return True
+        return False
+
+
+def _mask_intervals(code, mask):
+    """Déplie un couple code/masque en intervalles d'ID, ou None s'il y en aurait trop."""
+    free = ~mask & MAX_ID
+    # Bits libres contigus à partir du bit 0 : un bloc par combinaison des autres bits libres.
+    low = 0
+    while free & (low + 1): low = (low << 1) | 1
+    high_bits = [bit for bit in range(29) if free >> bit & 1 and not low >> bit & 1]
+    if 1 << len(high_bits) > MAX_MASK_INTERVALS: return None
+    intervals = []
+    for combination in range(1 << len(high_bits)):
+        start = code & mask & MAX_ID
+        for position, bit in enumerate(high_bits):
+            if combination >> position & 1: start |= 1 << bit
+        intervals.append((start, start | low))
+    return intervals
+
+
+def compile_filter(ranges=(), ids=(), masks=(), patterns=(), names=None):
+    """Compile les règles en IdFilter. 'masks' : couples (code, masque) ; 'patterns' : motifs résolus avec
+    'names' ({id: nom de message DBC}). Un motif sans DBC chargé n'accepte rien."""
+    table = bytearray(STANDARD_ID_COUNT); intervals = []; residual = []
+    ids = set(ids)
+    for pattern in patterns:
+        ids.update(frame_id for frame_id, name in (names or {}).items() if fnmatch.fnmatchcase(name, pattern))
+    for start, end in ranges:
+        start = max(0, start); end = min(end, MAX_ID)
+        if start > end: continue
+        if start < STANDARD_ID_COUNT: table[start:min(end, STANDARD_ID_COUNT - 1) + 1] = b"\x01" * (min(end, STANDARD_ID_COUNT - 1) - start + 1)
+        if end >= STANDARD_ID_COUNT: intervals.append((max(start, STANDARD_ID_COUNT), end))
+    for frame_id in ids:
+        if frame_id < STANDARD_ID_COUNT: table[frame_id] = 1
+        elif frame_id <= MAX_ID: intervals.append((frame_id, frame_id))
+    for code, mask in masks:
+        mask &= MAX_ID; code &= mask
+        for frame_id in range(STANDARD_ID_COUNT):
+            if frame_id & mask == code: table[frame_id] = 1
+        expanded = _mask_intervals(code, mask)
+        if expanded is None: residual.append((code, mask)); continue
+        intervals.extend((max(start, STANDARD_ID_COUNT), end) for start, end in expanded if end >= STANDARD_ID_COUNT)
+    # Fusion des intervalles qui se chevauchent ou se touchent.
+    starts = array('I'); ends = array('I')
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1] + 1: ends[-1] = max(ends[-1], end)
+        else: starts.append(start); ends.append(end)
+    return IdFilter(bytes(table), starts, ends, tuple(residual))
+
+
+def compile_software_filter(range_filter, discrete_filter, names=None):
+    """Compile les filtres logiciels au format du GUI (voir parse_filter_list). Renvoie None si aucun
+    filtre n'est actif (toutes les trames passent)."""
+    range_enabled = range_filter.get('enabled', False); discrete_enabled = discrete_filter.get('enabled', False)
+    if not range_enabled and not discrete_enabled: return None
+    ranges = [(range_filter.get('start', 0), range_filter.get('end', MAX_ID))] if range_enabled else []
+    if not discrete_enabled: return compile_filter(ranges)
+    return compile_filter(ranges + list(discrete_filter.get('ranges', ())), discrete_filter.get('ids', ()),
+                          discrete_filter.get('masks', ()), discrete_filter.get('patterns', ()), names)
+
+
+def parse_filter_list(text, names=None):
+    """Analyse une liste de règles séparées par des virgules : "100, 300-3FF, 7E0/7F0, HS4_*".
+
+    ID hexadécimal, plage DÉBUT-FIN, couple CODE/MASQUE ou motif de nom DBC. Un mot fait seulement de
+    chiffres hexadécimaux ("ACC", "DCDC") est un nom s'il est exactement celui d'un message de 'names'
+    ({id: nom de message DBC}), un ID sinon ; "0xACC" force l'ID, "'ACC'" (entre guillemets) le nom.
+    Renvoie {'ids', 'ranges', 'masks', 'patterns'} ; ValueError sur une règle illisible."""
+    rules = {'ids': [], 'ranges': [], 'masks': [], 'patterns': []}
+    message_names = set((names or {}).values())
+    for token in (token.strip() for token in text.replace(';', ',').split(',')):
+        if not token: continue
+        if len(token) > 2 and token[0] == token[-1] and token[0] in "'\"" and _PATTERN.fullmatch(token[1:-1]):
+            rules['patterns'].append(token[1:-1]); continue
+        first, separator, second = token.partition('-') if '-' in token else token.partition('/')
+        if separator and _HEX.fullmatch(first.strip()) and _HEX.fullmatch(second.strip()):
+            rules['ranges' if separator == '-' else 'masks'].append((int(first, 16), int(second, 16)))
+        elif _HEX.fullmatch(token) and token not in message_names: rules['ids'].append(int(token, 16))
+        elif _PATTERN.fullmatch(token): rules['patterns'].append(token)
+        else: raise ValueError(f"Règle de filtre illisible : '{token}'")
+    return rules
+
+
+def format_filter_list(rules, names=None):
+    """Texte de parse_filter_list pour des règles {'ids', 'ranges', 'masks', 'patterns'}, relu à l'identique
+    avec les mêmes 'names' : préfixe 0x pour un ID qui s'écrit comme un nom de message, guillemets pour
+    un motif qui s'écrit comme un ID."""
+    message_names = set((names or {}).values())
+    return ", ".join([f"0x{frame_id:X}" if f"{frame_id:X}" in message_names else f"{frame_id:X}" for frame_id in rules.get('ids', ())]
+                     + [f"{start:X}-{end:X}" for start, end in rules.get('ranges', ())]
+                     + [f"{code:X}/{mask:X}" for code, mask in rules.get('masks', ())]
+                     + [f'"{pattern}"' if _HEX.fullmatch(pattern) else pattern for pattern in rules.get('patterns', ())])
+
+
+if __name__ == "__main__":
+    # Banc d'essai : prédicat compilé comparé au filtre à dictionnaires et liste d'ID d'origine.
+    import random, time
+    ids = random.Random(0).sample(range(STANDARD_ID_COUNT), 200)
+    range_filter = {'enabled': True, 'start': 0x18DA0000, 'end': 0x18DAFFFF}
+    discrete_filter = {'enabled': True, 'ids': ids}
+
+    def legacy(arbitration_id):
+        if range_filter.get('enabled', False):
+            if range_filter.get('start', 0) <= arbitration_id <= range_filter.get('end', MAX_ID): return True
+        if discrete_filter.get('enabled', False):
+            if arbitration_id in discrete_filter.get('ids', []): return True
+        return False
+    compiled = compile_software_filter(range_filter, discrete_filter)
+    rng = random.Random(1); frames = [rng.randrange(STANDARD_ID_COUNT) for _ in range(200_000)]
+    for name, predicate in (("dictionnaires + liste", legacy), ("compilé", compiled)):
+        start = time.perf_counter(); kept = sum(1 for i in frames if predicate(i)); elapsed = time.perf_counter() - start
+        print(f"{name:22}: {elapsed / len(frames) * 1e9:6.0f} ns/trame ({kept} trames retenues)")
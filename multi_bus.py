@@ -0,0 +1,218 @@
+"""Réception asyncio sur plusieurs bus python-can à la fois, fusionnés en un seul flux trié par horodatage.
+
+Les bus qui exposent un descripteur (socketcan, ...) sont lus par la boucle asyncio elle-même, sans
+thread ; les autres ont chacun un thread de lecture qui remet ses trames à la boucle par lots. Chaque
+lecture qui trouve la file du bus vide le signale avec l'heure à laquelle elle a commencé : c'est ce qui
+permet de livrer les trames des autres bus sans attendre celui-ci. Une seule coroutine vide
+périodiquement les tampons, filtre et fusionne. Aucun import Qt."""
+import asyncio
+import threading
+import time
+from operator import attrgetter
+import can
+from id_filter import compile_software_filter
+
+MERGE_DELAY = 0.02       # Retard toléré entre l'horodatage d'une trame et sa mise en file par l'interface (s)
+TICK = 0.01              # Période de vidage des tampons (s)
+READ_BATCH = 256         # Trames remises d'un coup par un thread de lecture
+
+_by_timestamp = attrgetter('timestamp')
+
+
+class BusChannel:
+    """Un bus de la capture : interface et canal python-can, débit, filtres matériels et logiciels propres."""
+    def __init__(self, name, interface, channel, bitrate=None, can_filters=None, range_filter=None, discrete_filter=None):
+        self.name = name
+        self.interface = interface
+        self.channel = channel
+        self.bitrate = bitrate
+        self.can_filters = can_filters or None
+        self.id_filter = compile_software_filter(range_filter or {}, discrete_filter or {})
+        self.received = 0; self.kept = 0
+
+
+class MultiBusReceiver:
+    """Reçoit sur tous les bus de 'channels' (BusChannel) et livre un flux unique trié par horodatage.
+
+    Chaque trame livrée porte dans msg.channel l'indice de son bus (repris par les journaux ASC/BLF).
+    Un bus ne livrant ses trames que dans l'ordre, la fusion est sûre jusqu'à la plus ancienne des
+    dernières trames reçues de chaque bus. Un bus dont la lecture a trouvé la file vide à l'instant t ne
+    retient pas les autres au-delà de t - 'merge_delay' (horodatages python-can en temps hôte) ; tant que
+    ce n'est pas confirmé, sa dernière trame reste la borne, même s'il semble silencieux. S'utilise dans
+    une boucle asyncio : 'async with receiver:' puis batches() ou capture()."""
+    def __init__(self, channels, merge_delay=MERGE_DELAY):
+        self.channels = list(channels)
+        self.merge_delay = merge_delay
+        self.kept = 0
+        self._buses = []; self._fds = {}; self._threads = []
+        self._loop = None; self._reading = False; self._error = None
+        self._incoming = [[] for _ in self.channels]              # Trames remises à la boucle, pas encore filtrées
+        self._pending = [[] for _ in self.channels]
+        self._last = [float('-inf')] * len(self.channels)        # Horodatage de la dernière trame de chaque bus
+        self._idle = [float('-inf')] * len(self.channels)        # Début de la dernière lecture qui a trouvé la file vide
+        self._is_running = True
+
+    @property
+    def received(self):
+        return sum(channel.received for channel in self.channels)
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop(); self._reading = True
+        try:
+            for index, channel in enumerate(self.channels):
+                bus = can.interface.Bus(interface=channel.interface, channel=channel.channel, bitrate=channel.bitrate,
+                                        receive_own_messages=False, can_filters=channel.can_filters)
+                self._buses.append(bus)
+                try: fd = bus.fileno()
+                except NotImplementedError: fd = -1
+                if fd >= 0:
+                    self._fds[index] = fd; self._loop.add_reader(fd, self._read_available, index)
+                else:
+                    thread = threading.Thread(target=self._read_thread, args=(index, bus), name=f"CAN reader {channel.name}", daemon=True)
+                    self._threads.append(thread); thread.start()
+        except Exception:
+            self.close(); raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._reading = False
+        for fd in self._fds.values(): self._loop.remove_reader(fd)
+        # recv() rend la main au plus tard après TICK : l'attente est bornée.
+        for thread in self._threads: thread.join(TICK * 10)
+        for bus in self._buses: bus.shutdown()
+        self._fds = {}; self._threads = []; self._buses = []
+
+    def stop(self):
+        """Termine batches() et capture() au prochain vidage (appelable depuis un gestionnaire de signal)."""
+        self._is_running = False
+
+    def _read_available(self, index):
+        """Lit sans attendre tout ce que le bus à descripteur 'index' a reçu (boucle asyncio)."""
+        bus = self._buses[index]; incoming = self._incoming[index]
+        while True:
+            checked = time.time()
+            msg = bus.recv(0)
+            if msg is None: self._idle[index] = checked; return
+            incoming.append(msg)
+
+    def _read_thread(self, index, bus):
+        """Thread de lecture d'un bus sans descripteur : remet les trames à la boucle par lots, chaque lot
+        suivi, si la file du bus s'est trouvée vide, de l'heure de début de cette dernière lecture."""
+        call = self._loop.call_soon_threadsafe
+        try:
+            while self._reading:
+                msgs = []; checked = time.time()
+                msg = bus.recv(TICK)
+                while msg is not None:
+                    msgs.append(msg)
+                    if len(msgs) >= READ_BATCH: checked = None; break
+                    checked = time.time(); msg = bus.recv(0)
+                call(self._received, index, msgs, checked)
+        except Exception as e:
+            if self._reading: call(self._failed, e)
+
+    def _received(self, index, msgs, checked):
+        if msgs: self._incoming[index].extend(msgs)
+        if checked is not None: self._idle[index] = checked
+
+    def _failed(self, error):
+        if self._error is None: self._error = error
+        self.stop()
+
+    def _drain(self):
+        """Transfère les trames reçues dans les files d'attente de fusion, filtrage logiciel appliqué."""
+        for index, channel in enumerate(self.channels):
+            if index in self._fds: self._read_available(index)
+            msgs = self._incoming[index]
+            if not msgs: continue
+            self._incoming[index] = []
+            channel.received += len(msgs)
+            self._last[index] = msgs[-1].timestamp
+            if (id_filter := channel.id_filter) is not None: msgs = [msg for msg in msgs if id_filter(msg.arbitration_id)]
+            for msg in msgs: msg.channel = index
+            channel.kept += len(msgs)
+            self._pending[index].extend(msgs)
+
+    def _release(self, flush=False):
+        """Trames de toutes les files dont l'horodatage ne dépasse pas le seuil de fusion, triées."""
+        if flush: watermark = float('inf')
+        else:
+            # Chaque bus borne la fusion à sa dernière trame, ou plus loin si sa file a été trouvée vide depuis.
+            watermark = min(max(last, idle - self.merge_delay) for last, idle in zip(self._last, self._idle))
+        ready = []
+        for index, pending in enumerate(self._pending):
+            if not pending: continue
+            if pending[-1].timestamp <= watermark:
+                ready.extend(pending); self._pending[index] = []
+            else:
+                count = 0
+                while pending[count].timestamp <= watermark: count += 1
+                if count: ready.extend(pending[:count]); del pending[:count]
+        # Tri stable sur des suites déjà ordonnées par bus : fusion en O(n log k) par timsort.
+        ready.sort(key=_by_timestamp)
+        return ready
+
+    async def batches(self):
+        """Générateur asynchrone des lots fusionnés, un par vidage (vide si rien n'est prêt), jusqu'à stop().
+        Les trames en attente sont livrées à la fin ; l'erreur d'un thread de lecture est relancée ici."""
+        while self._is_running:
+            await asyncio.sleep(TICK)
+            self._drain()
+            yield self._release()
+        if self._error is not None: raise self._error
+        self._drain()
+        if batch := self._release(flush=True): yield batch
+
+    async def capture(self, log, duration=None, max_frames=None, on_stats=None, stats_interval=1.0):
+        """Écrit le flux fusionné dans 'log' (voir capture_core.RotatingLog) jusqu'à stop(), 'duration' s ou
+        'max_frames' trames. Même interface de statistiques que capture_core.CaptureSession."""
+        start = time.monotonic(); next_stats = start
+        deadline = start + duration if duration else None
+        async for batch in self.batches():
+            if max_frames is not None: batch = batch[:max_frames - self.kept]
+            if batch: log.write(batch); self.kept += len(batch)
+            now = time.monotonic()
+            if on_stats and now >= next_stats: on_stats(self, now - start); next_stats = now + stats_interval
+            if (max_frames is not None and self.kept >= max_frames) or (deadline and now >= deadline): self.stop()
+        return self.kept
+
+
+if __name__ == "__main__":
+    # Banc d'essai : N trames par bus sur plusieurs bus 'virtual' émises en parallèle. L'ordre est vérifié
+    # par tests/test_multi_bus.py ; ici, les émetteurs qui se disputent le GIL peuvent horodater une trame
+    # bien avant de la mettre en file, et dépasser 'merge_delay' (3e argument).
+    import sys, threading
+    bus_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    merge_delay = float(sys.argv[3]) if len(sys.argv) > 3 else MERGE_DELAY
+    channels = [BusChannel(f"bus{i}", "virtual", f"multi{i}") for i in range(bus_count)]
+
+    class Collector:
+        def __init__(self): self.count = 0; self.previous = float('-inf'); self.disorders = 0
+        def write(self, msgs):
+            for msg in msgs:
+                if msg.timestamp < self.previous: self.disorders += 1
+                self.previous = msg.timestamp
+            self.count += len(msgs)
+
+    async def bench():
+        collector = Collector()
+        async with MultiBusReceiver(channels, merge_delay) as receiver:
+            def send(index):
+                bus = can.interface.Bus(interface="virtual", channel=f"multi{index}")
+                msg = can.Message(arbitration_id=0x100 + index, is_extended_id=False, data=bytes(8))
+                for _ in range(n): bus.send(msg)
+                bus.shutdown()
+            senders = [threading.Thread(target=send, args=(i,)) for i in range(bus_count)]
+            start = time.perf_counter()
+            for sender in senders: sender.start()
+            # 'virtual' n'a pas de descripteur : un thread de lecture par bus.
+            readers = len(receiver._threads)
+            await receiver.capture(collector, max_frames=n * bus_count, duration=60)
+            elapsed = time.perf_counter() - start
+        print(f"{bus_count} bus : {collector.count:,} trames fusionnées en {elapsed:.2f} s ({collector.count / elapsed:,.0f} trames/s), "
+              f"{collector.disorders} inversions, {readers} threads de lecture")
+    asyncio.run(bench())
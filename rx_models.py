@@ -0,0 +1,316 @@
+import os
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QBrush, QColor
+import bulk_decoder
+from bulk_decoder import np
+
+HIGHLIGHT_DURATION = 0.4     # Durée du fondu de surbrillance d'une ligne dont le contenu change (s)
+FADE_STEPS = 8
+# Rouge clair (#FFCCCC) de plus en plus transparent : un pinceau par pas du fondu, créés une fois pour toutes.
+HIGHLIGHT_FADE = [QBrush(QColor(0xFF, 0xCC, 0xCC, 255 * (FADE_STEPS - step) // FADE_STEPS)) for step in range(FADE_STEPS)]
+DLC_CHANGED_BRUSH = QBrush(QColor("#C00000")) # Rouge foncé
+
+
+class TracerTableModel(QAbstractTableModel):
+    """Modèle virtuel de la vue Tracer : les cellules sont formatées à la demande depuis un FrameStore.
+
+    Le tri calcule avec NumPy une permutation des numéros de trame à partir de la seule colonne concernée ;
+    les trames reçues ensuite sont fusionnées à leur place dans la permutation (voir sync)."""
+    HEADERS = ["Time", "ID", "DLC", "Data", "Comment / Message Name"]
+    LIVE = True                     # Stockage qui grandit : les clés triées sont gardées pour la fusion
+
+    def __init__(self, store, dbc_manager, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.dbc_manager = dbc_manager
+        self.start_time = 0
+        self._row_count = 0
+        self.sort_column = 0        # La colonne Time est l'ordre chronologique : aucune permutation
+        self.descending = False
+        self.order = None           # Permutation (tableau NumPy) ou None pour l'ordre chronologique
+        self.keys = None            # Clés de tri dans l'ordre de 'order'
+        self._name_rank = {}        # Tri par nom : rang de chaque ID
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def record_index(self, row):
+        """Numéro de trame (0 = plus ancienne) affiché à la ligne 'row'."""
+        if self.descending: row = self._row_count - 1 - row
+        return int(self.order[row]) if self.order is not None else row
+
+    def row_of_record(self, record):
+        if self.order is not None: record = int(np.flatnonzero(self.order == record)[0])
+        return self._row_count - 1 - record if self.descending else record
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid(): return None
+        return self._format(self.store.frame(self.record_index(index.row())), index.column())
+
+    def _format(self, frame, col):
+        timestamp, msg_id, dlc, flags, data = frame
+        if col == 0: return f"{timestamp - self.start_time:.3f}"
+        if col == 1: return f"{msg_id:X}"
+        if col == 2: return str(dlc)
+        if col == 3: return data.hex(' ').upper()
+        if col == 4: return self.dbc_manager.get_message_name(msg_id)
+        return None
+
+    def _records(self, start=0):
+        """Enregistrements NumPy des trames à partir de 'start', ou None si numpy n'est pas installé."""
+        return bulk_decoder.store_records(self.store, start) if np is not None else None
+
+    def _sort_keys(self, records, column):
+        """Clés de tri des enregistrements pour 'column', ou None si un ID n'a pas de rang de nom."""
+        if column == 1: return records['id']
+        if column == 2: return records['dlc']
+        if column == 3: return np.ascontiguousarray(records['payload']).view('>u8').ravel()
+        # Tri par nom : un rang par ID distinct, puis tri des rangs.
+        unique_ids, inverse = np.unique(records['id'], return_inverse=True)
+        if any(msg_id not in self._name_rank for msg_id in unique_ids.tolist()): return None
+        return np.array([self._name_rank[msg_id] for msg_id in unique_ids.tolist()], dtype=np.uint32)[inverse.ravel()]
+
+    def _build_order(self, column):
+        """Recalcule la permutation de 'column' sur tout le stockage (sans signaler la vue)."""
+        records = self._records()
+        if column == 0 or records is None:
+            self.order = self.keys = None; self._row_count = len(self.store); return
+        if column == 4:
+            unique_ids = np.unique(records['id']).tolist()
+            names = [self.dbc_manager.get_message_name(msg_id) for msg_id in unique_ids]
+            self._name_rank = {unique_ids[i]: rank for rank, i in enumerate(sorted(range(len(names)), key=names.__getitem__))}
+        keys = self._sort_keys(records, column)
+        order = np.argsort(keys, kind='stable')
+        self.order = order.astype(np.uint32) if len(order) < 2 ** 32 else order
+        self.keys = keys[order] if self.LIVE else None; self._row_count = len(records)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        descending = order == Qt.SortOrder.DescendingOrder
+        if column != 0 and np is None: return # Tri par colonne indisponible sans numpy.
+        if (column, descending) == (self.sort_column, self.descending) and (column == 0 or self.order is not None): return
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column = column; self.descending = descending
+        self._build_order(column)
+        self.layoutChanged.emit()
+
+    def sync(self):
+        """Publie les trames ajoutées au stockage depuis le dernier appel : un seul beginInsertRows dans l'ordre
+        chronologique, une fusion dans la permutation (et un seul layoutChanged) sinon."""
+        new_count = len(self.store); old_count = self._row_count
+        if new_count <= old_count: return
+        if self.order is None:
+            first = 0 if self.descending else old_count
+            self.beginInsertRows(QModelIndex(), first, first + new_count - old_count - 1)
+            self._row_count = new_count
+            self.endInsertRows(); return
+        keys = self._sort_keys(self._records(old_count), self.sort_column)
+        self.layoutAboutToBeChanged.emit()
+        if keys is None:
+            # Un nouvel ID n'a pas encore de rang de nom : le classement est refait.
+            self._build_order(self.sort_column); self.layoutChanged.emit(); return
+        added = np.argsort(keys, kind='stable'); keys = keys[added]
+        # Après les clés égales : à clé égale, l'ordre reste chronologique.
+        positions = np.searchsorted(self.keys, keys, side='right')
+        self.order = np.insert(self.order, positions, (added + old_count).astype(self.order.dtype))
+        self.keys = np.insert(self.keys, positions, keys); self._row_count = new_count
+        # Les index persistants (sélection, ligne courante) suivent leur trame.
+        previous = self.persistentIndexList(); moved = []
+        for index in previous:
+            position = old_count - 1 - index.row() if self.descending else index.row()
+            position += int(np.searchsorted(positions, position, side='right'))
+            moved.append(self.index(new_count - 1 - position if self.descending else position, index.column()))
+        self.changePersistentIndexList(previous, moved)
+        self.layoutChanged.emit()
+
+    def reset(self):
+        """Resynchronise entièrement le modèle après un vidage ou une modification du stockage."""
+        self.beginResetModel()
+        self._build_order(self.sort_column if np is not None else 0)
+        self.endResetModel()
+
+
+class MonitorTableModel(QAbstractTableModel):
+    """Modèle de la vue Monitor : une ligne par ID, servie depuis le cache 'monitor_data_cache' du GUI (contenu,
+    commentaire) et les tableaux de bus_stats.BusStatistics (périodes en ms, débit, cycles manqués).
+
+    Le GUI ne signale pas chaque trame : refresh() repeint d'un coup les ID modifiés depuis le rafraîchissement
+    précédent. La surbrillance se déduit de l'horodatage du dernier changement ('changed_at' du cache)."""
+    HEADERS = ["ID", "DLC", "Data", "Period", "Min", "Avg", "Max", "Jitter", "Rate /s", "Count", "Missed", "Comment / Message Name"]
+    COMMENT_COLUMN = 11
+
+    def __init__(self, cache, dbc_manager, stats, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.dbc_manager = dbc_manager
+        self.stats = stats
+        self.row_ids = []
+        self.id_to_row = {}
+        self.fading = set()     # ID en cours de fondu, repeints à chaque rafraîchissement jusqu'à la fin du fondu
+        self.now = 0.0          # Instant (monotonic) du dernier rafraîchissement
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.row_ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        msg_id = self.row_ids[index.row()]
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if msg_id not in self.fading: return None
+            age = self.now - self.cache[msg_id].get('changed_at', float('-inf'))
+            return HIGHLIGHT_FADE[int(age * FADE_STEPS / HIGHLIGHT_DURATION)] if 0 <= age < HIGHLIGHT_DURATION else None
+        col = index.column(); stats = self.stats; slot = stats.index.get(msg_id)
+        # DLC changeant en cours de réception : signalé en rouge.
+        if col == 1 and slot is not None and stats.dlc_changes[slot]:
+            if role == Qt.ItemDataRole.ForegroundRole: return DLC_CHANGED_BRUSH
+            if role == Qt.ItemDataRole.ToolTipRole: return f"DLC changed {stats.dlc_changes[slot]} time(s)"
+        if col == 10 and role == Qt.ItemDataRole.ToolTipRole and slot is not None and stats.cycle[slot]:
+            return f"DBC cycle time: {stats.cycle[slot]:g} ms"
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole): return None
+        entry = self.cache[msg_id]
+        if col == 0: return f"{msg_id:X}"
+        if col == 1: return str(entry['dlc'])
+        if col == 2: return entry['data'].hex(' ').upper()
+        if col == self.COMMENT_COLUMN: return entry.get('comment', '')
+        if slot is None: return ""
+        if col == 3: return f"{stats.period[slot]:.2f}"
+        if col == 4: return f"{stats.period_min[slot]:.2f}" if stats.count[slot] > 1 else ""
+        if col == 5: return f"{stats.period_mean[slot]:.2f}" if stats.count[slot] > 1 else ""
+        if col == 6: return f"{stats.period_max[slot]:.2f}" if stats.count[slot] > 1 else ""
+        if col == 7: return f"{stats.jitter(slot):.2f}"
+        if col == 8: return f"{stats.rate_at(slot):.1f}"
+        if col == 9: return str(stats.count[slot])
+        if col == 10: return str(stats.missed[slot]) if stats.cycle[slot] else ""
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        # Le commentaire n'est éditable que si aucun DBC ne fournit déjà le nom du message.
+        if index.isValid() and index.column() == self.COMMENT_COLUMN and not self.dbc_manager.is_loaded():
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid() or index.column() != self.COMMENT_COLUMN: return False
+        self.cache[self.row_ids[index.row()]]['comment'] = value
+        self.dataChanged.emit(index, index)
+        return True
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        stats = self.stats
+        def stat(values):
+            return lambda i: values[stats.index[i]] if i in stats.index else 0
+        keys = {
+            0: lambda i: i, 1: lambda i: self.cache[i]['dlc'], 2: lambda i: self.cache[i]['data'],
+            3: stat(stats.period), 4: stat(stats.period_min), 5: stat(stats.period_mean), 6: stat(stats.period_max),
+            7: lambda i: stats.jitter(stats.index[i]) if i in stats.index else 0.0,
+            8: lambda i: stats.rate_at(stats.index[i]) if i in stats.index else 0.0,
+            9: stat(stats.count), 10: stat(stats.missed),
+            self.COMMENT_COLUMN: lambda i: self.cache[i].get('comment', ''),
+        }
+        if column not in keys: return
+        self.layoutAboutToBeChanged.emit()
+        self.row_ids.sort(key=keys[column], reverse=order == Qt.SortOrder.DescendingOrder)
+        self.id_to_row = {msg_id: row for row, msg_id in enumerate(self.row_ids)}
+        self.layoutChanged.emit()
+
+    def refresh(self, dirty, now):
+        """Repeint en une passe les ID de 'dirty' (reçus depuis le rafraîchissement précédent) et les lignes en
+        fondu : une seule insertion pour les nouveaux ID, un seul dataChanged couvrant les lignes concernées."""
+        self.now = now; cache = self.cache; since = now - HIGHLIGHT_DURATION
+        new_ids = [msg_id for msg_id in dirty if msg_id not in self.id_to_row and msg_id in cache]
+        if new_ids:
+            row = len(self.row_ids)
+            self.beginInsertRows(QModelIndex(), row, row + len(new_ids) - 1)
+            for msg_id in sorted(new_ids): self.id_to_row[msg_id] = len(self.row_ids); self.row_ids.append(msg_id)
+            self.endInsertRows()
+        self.fading.update(msg_id for msg_id in dirty if msg_id in cache and cache[msg_id].get('changed_at', since) > since)
+        expired = {msg_id for msg_id in self.fading if msg_id not in cache or cache[msg_id].get('changed_at', since) <= since}
+        # Les lignes dont le fondu se termine sont repeintes une dernière fois, sans surbrillance.
+        rows = [self.id_to_row[msg_id] for msg_id in (self.fading | set(dirty)) if msg_id in self.id_to_row]
+        self.fading -= expired
+        if rows: self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), self.COMMENT_COLUMN))
+
+    def reset(self):
+        """Reconstruit la liste des lignes (triée par ID) depuis le cache."""
+        self.beginResetModel()
+        self.row_ids = sorted(self.cache.keys())
+        self.id_to_row = {msg_id: row for row, msg_id in enumerate(self.row_ids)}
+        self.fading.clear()
+        self.endResetModel()
+
+
+class SignalTableModel(QAbstractTableModel):
+    """Modèle du panneau des signaux décodés : les valeurs d'un message, décodées par son décodeur précompilé."""
+    HEADERS = ["Signal", "Value"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.msg_id = None
+        self.decoder = None
+        self.values = ()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self.decoder is None else len(self.decoder.names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid(): return None
+        row = index.row()
+        if index.column() == 0: return self.decoder.names[row]
+        return self.decoder.format_value(row, self.values[row]) if row < len(self.values) else ""
+
+    def show_message(self, msg_id, decoder, values):
+        """Affiche les signaux de 'msg_id'. Seule la colonne des valeurs est rafraîchie si l'ID ne change pas."""
+        if msg_id == self.msg_id and decoder is self.decoder:
+            self.values = values or ()
+            if self.values: self.dataChanged.emit(self.index(0, 1), self.index(len(self.values) - 1, 1))
+            return
+        self.beginResetModel()
+        self.msg_id = msg_id if decoder is not None else None; self.decoder = decoder; self.values = values or ()
+        self.endResetModel()
+
+    def clear(self):
+        self.show_message(None, None, ())
+
+
+class TraceFileModel(TracerTableModel):
+    """Modèle de la vue "Open Trace" : sert une trace .cltrace projetée en mémoire (TraceReader).
+
+    Comme le Tracer, seules les lignes affichées sont formatées, et le tri est le même : les colonnes
+    sont lues dans la projection NumPy (memmap) de la trace."""
+    LIVE = False
+
+    def __init__(self, reader, dbc_manager, parent=None, name=None):
+        super().__init__(reader, dbc_manager, parent)
+        self.name = name or os.path.basename(reader.path)   # Nom affiché : celui du journal d'origine pour une trace convertie
+        self.start_time = reader.frame(0)[0] if len(reader) else 0
+        self._row_count = len(reader)
+
+    def _records(self, start=0):
+        records = self.store.records()
+        return records[start:] if records is not None else None
+
+    def sync(self): pass
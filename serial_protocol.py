@@ -0,0 +1,230 @@
+"""Protocoles de la passerelle série Arduino (voir 'code_arduino').
+
+Mode texte (historique) : une ligne ASCII par trame, "ID,DLC,D0,D1,...[,Tµs]\\n" en hexadécimal.
+Le champ final "T" (micros() du sketch à la lecture de la trame) est optionnel.
+Les lignes commençant par "---" ou "!!!" sont des messages d'état du sketch.
+
+Mode binaire (négocié à la connexion avec la commande "M:B") : une trame de 12 + DLC octets
+    SYNC (0xA5) | FLAGS | ID (4, LE) | DLC | DATA (DLC octets) | TIMESTAMP µs (4, LE) | CRC-8
+Le CRC-8 (polynôme 0x07) couvre tous les octets entre SYNC et CRC. Une trame dont l'en-tête est
+incohérent ou dont le CRC est faux est rejetée et le décodeur se resynchronise sur le SYNC suivant.
+"""
+import struct
+from collections import deque
+
+SYNC_BYTE = 0xA5
+FLAG_EXTENDED = 0x01
+FLAG_REMOTE = 0x02
+KNOWN_FLAGS = FLAG_EXTENDED | FLAG_REMOTE
+
+HEADER = struct.Struct('<BBIB')     # SYNC, FLAGS, ID, DLC
+TRAILER = struct.Struct('<IB')      # TIMESTAMP, CRC
+MIN_FRAME_SIZE = HEADER.size + TRAILER.size
+
+BINARY_MODE_COMMAND = b"M:B\n"
+TEXT_MODE_COMMAND = b"M:T\n"
+BINARY_MODE_ACK = "--- MODE BIN"
+
+# mcp_can code les drapeaux "étendu" et "RTR" dans les bits de poids fort de l'ID lu.
+MCP_EXTENDED_BIT = 0x80000000
+MCP_REMOTE_BIT = 0x40000000
+CAN_ID_MASK = 0x1FFFFFFF
+
+# Table de conversion des champs hexadécimaux d'un octet ("F", "0F", "f", "0f") vers leur valeur.
+HEX_BYTE = {}
+for _value in range(256):
+    for _text in {f"{_value:X}", f"{_value:02X}", f"{_value:x}", f"{_value:02x}"}:
+        HEX_BYTE[_text.encode('ascii')] = _value
+del _value, _text
+
+
+def _make_crc8_table(poly=0x07):
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+CRC8_TABLE = _make_crc8_table()
+
+
+def crc8(data) -> int:
+    """CRC-8 (polynôme 0x07, valeur initiale 0), identique à celui du sketch."""
+    crc = 0
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode_binary_frame(arbitration_id, data, flags=0, device_us=0) -> bytes:
+    """Construit une trame binaire telle que l'émet le sketch (utile aux tests et aux bancs sans matériel)."""
+    data = bytes(data)
+    body = HEADER.pack(SYNC_BYTE, flags, arbitration_id, len(data))[1:] + data + struct.pack('<I', device_us & 0xFFFFFFFF)
+    return bytes([SYNC_BYTE]) + body + bytes([crc8(body)])
+
+
+class DeviceClock:
+    """Convertit les horodatages micros() du sketch en temps hôte (secondes 'time.time()').
+
+    Chaque bloc lu sur le port fournit une observation (temps device de la dernière trame, heure hôte
+    de la lecture). Le délai de transmission étant toujours positif, l'écart hôte - device minimal sur
+    une fenêtre approche le décalage vrai. Une droite ajustée sur les minima des dernières fenêtres
+    donne le décalage et la dérive relative des deux horloges. Une observation sous la droite (trame
+    reçue "avant" d'être émise) abaisse immédiatement le décalage."""
+    WRAP_US = 1 << 32
+
+    def __init__(self, window_s=1.0, history=60):
+        self.window_s = window_s
+        self._minima = deque(maxlen=history)   # (temps device, écart minimal) par fenêtre
+        self.reset()
+
+    def reset(self):
+        self._last_raw = None; self._wrap_base = 0
+        self._window_end = None; self._window_min = None
+        self._minima.clear()
+        self.offset = None      # Écart hôte - device au temps device de référence
+        self.skew = 0.0         # Dérive relative (s/s)
+        self.reference = 0.0
+
+    def unwrap(self, raw_us) -> float:
+        """Déroule le compteur 32 bits de micros() (environ 71 min) et renvoie des secondes device."""
+        if self._last_raw is not None and raw_us < self._last_raw:
+            if self._last_raw - raw_us > self.WRAP_US // 2: self._wrap_base += self.WRAP_US
+            else: self.reset() # Retour en arrière : le sketch a redémarré.
+        self._last_raw = raw_us
+        return (self._wrap_base + raw_us) * 1e-6
+
+    def observe(self, device_s, host_s):
+        offset = host_s - device_s
+        if self.offset is None:
+            self.offset = offset; self.reference = device_s
+            self._window_end = device_s + self.window_s; self._window_min = (device_s, offset)
+            return
+        if offset < self._predicted_offset(device_s):
+            self.offset -= self._predicted_offset(device_s) - offset
+        if offset < self._window_min[1]: self._window_min = (device_s, offset)
+        if device_s >= self._window_end:
+            self._minima.append(self._window_min)
+            self._window_end = device_s + self.window_s; self._window_min = (device_s, offset)
+            self._fit()
+
+    def _predicted_offset(self, device_s):
+        return self.offset + self.skew * (device_s - self.reference)
+
+    def _fit(self):
+        n = len(self._minima)
+        if n < 3: return
+        mean_x = sum(x for x, _ in self._minima) / n; mean_y = sum(y for _, y in self._minima) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in self._minima)
+        if var_x <= 0: return
+        self.skew = sum((x - mean_x) * (y - mean_y) for x, y in self._minima) / var_x
+        # La droite passe sous tous les minima retenus (enveloppe inférieure).
+        self.reference = mean_x
+        self.offset = min(y - self.skew * (x - mean_x) for x, y in self._minima)
+
+    def to_host(self, device_s) -> float:
+        return device_s + self._predicted_offset(device_s)
+
+
+def parse_text_lines(chunk):
+    """Analyse d'un bloc toutes les lignes complètes du mode texte.
+
+    Renvoie (trames, reste, erreurs) : les trames au format (device_us, arbitration_id, flags, data)
+    avec device_us à None si la ligne n'est pas horodatée, la ligne incomplète à conserver pour le
+    bloc suivant, et le nombre de lignes rejetées."""
+    lines = chunk.split(b'\n')
+    remainder = lines.pop()
+    frames = []; errors = 0
+    append = frames.append; hex_byte = HEX_BYTE.__getitem__
+    for line in lines:
+        fields = line.rstrip(b'\r').split(b',')
+        if len(fields) < 2 or not fields[0] or fields[0][:3] in (b'---', b'!!!'): continue
+        try:
+            raw_id = int(fields[0], 16); dlc = int(fields[1], 16)
+            if dlc > 8 or len(fields) < 2 + dlc: errors += 1; continue
+            # Bits 31/30 du MCP2515 si présents ; sinon (ancien sketch) un ID de plus de 3 chiffres est étendu.
+            flags = FLAG_EXTENDED if (raw_id & MCP_EXTENDED_BIT if raw_id > CAN_ID_MASK else len(fields[0]) > 3) else 0
+            if raw_id & MCP_REMOTE_BIT: flags |= FLAG_REMOTE
+            stamp = fields[2 + dlc] if len(fields) > 2 + dlc else b''
+            device_us = int(stamp[1:], 16) if stamp[:1] == b'T' else None
+            append((device_us, raw_id & CAN_ID_MASK, flags, bytes(map(hex_byte, fields[2:2 + dlc]))))
+        except (ValueError, KeyError):
+            errors += 1
+    return frames, remainder, errors
+
+
+class TextFrameDecoder:
+    """Décodeur incrémental du mode texte, même interface que BinaryFrameDecoder."""
+    def __init__(self):
+        self.buffer = bytearray()
+        self.parse_errors = 0
+
+    def feed(self, chunk):
+        buf = self.buffer
+        buf += chunk
+        end = buf.rfind(b'\n') + 1
+        if not end: return []
+        frames, _, errors = parse_text_lines(bytes(buf[:end]))
+        del buf[:end]
+        self.parse_errors += errors
+        return frames
+
+
+class BinaryFrameDecoder:
+    """Décodeur incrémental du mode binaire.
+
+    feed() accepte des morceaux arbitraires du flux série et renvoie les trames complètes sous la forme
+    (device_us, arbitration_id, flags, data). Les octets d'une trame incomplète sont conservés pour
+    l'appel suivant."""
+    def __init__(self):
+        self.buffer = bytearray()
+        self.crc_errors = 0
+        self.discarded_bytes = 0
+
+    def feed(self, chunk):
+        buf = self.buffer
+        buf += chunk
+        frames = []; pos = 0; end = len(buf)
+        while True:
+            start = buf.find(SYNC_BYTE, pos)
+            if start < 0:
+                self.discarded_bytes += end - pos; pos = end
+                break
+            self.discarded_bytes += start - pos; pos = start
+            if end - pos < MIN_FRAME_SIZE: break
+            _, flags, arbitration_id, dlc = HEADER.unpack_from(buf, pos)
+            if dlc > 8 or flags & ~KNOWN_FLAGS:
+                # Faux SYNC au milieu de données : on avance d'un octet pour se resynchroniser.
+                pos += 1; self.discarded_bytes += 1
+                continue
+            frame_end = pos + MIN_FRAME_SIZE + dlc
+            if frame_end > end: break
+            if crc8(buf[pos + 1:frame_end - 1]) != buf[frame_end - 1]:
+                self.crc_errors += 1
+                pos += 1; self.discarded_bytes += 1
+                continue
+            data_end = pos + HEADER.size + dlc
+            device_us = struct.unpack_from('<I', buf, data_end)[0]
+            frames.append((device_us, arbitration_id, flags, bytes(buf[pos + HEADER.size:data_end])))
+            pos = frame_end
+        del buf[:pos]
+        return frames
+
+
+if __name__ == "__main__":
+    # Banc d'essai sans matériel : débit des décodeurs sur un flux série synthétique.
+    import random, time
+    random.seed(0)
+    samples = [(i * 250, random.randrange(0x800), 0, bytes(random.randrange(256) for _ in range(8))) for i in range(200000)]
+    streams = {
+        "text": b"".join(f"{i:X},{len(d):X}".encode() + b"".join(b"," + f"{b:X}".encode() for b in d) + f",T{us:X}\n".encode() for us, i, _, d in samples),
+        "binary": b"".join(encode_binary_frame(i, d, flags, us) for us, i, flags, d in samples),
+    }
+    for name, decoder in (("text", TextFrameDecoder()), ("binary", BinaryFrameDecoder())):
+        stream = streams[name]; count = 0; start = time.perf_counter()
+        for offset in range(0, len(stream), 4096):
+            count += len(decoder.feed(stream[offset:offset + 4096]))
+        elapsed = time.perf_counter() - start
+        print(f"{name:6s}: {count} trames, {len(stream) / len(samples):.1f} octets/trame, {count / elapsed:,.0f} trames/s")
@@ -0,0 +1,100 @@
+import struct
+
+FLOAT_FORMATS = {32: struct.Struct('>f'), 64: struct.Struct('>d')}
+
+
+def _float_from_bits(raw, length):
+    return FLOAT_FORMATS[length].unpack(raw.to_bytes(length // 8, 'big'))[0]
+
+
+def signal_end_byte(signal):
+    """Nombre d'octets de trame nécessaires pour lire le signal."""
+    if signal.byte_order == 'little_endian': return (signal.start + signal.length - 1) // 8 + 1
+    return signal.start // 8 + max(0, (signal.length - 1 - signal.start % 8 + 7) // 8) + 1
+
+
+def signal_shift(signal, size):
+    """Décalage du bit de poids faible du signal dans l'entier formé par les 'size' octets de la trame."""
+    if signal.byte_order == 'little_endian': return signal.start
+    # Motorola : 'start' désigne le bit de poids fort en numérotation DBC (octet start // 8, bit start % 8).
+    return (size - 1 - signal.start // 8) * 8 + signal.start % 8 - (signal.length - 1)
+
+
+def _raw_expression(signal, size):
+    source = 'big' if signal.byte_order == 'big_endian' else 'little'
+    expression = f"(({source} >> {signal_shift(signal, size)}) & {(1 << signal.length) - 1:#x})"
+    if signal.is_signed and not signal.is_float:
+        sign_bit = 1 << (signal.length - 1)
+        expression = f"(({expression} ^ {sign_bit:#x}) - {sign_bit:#x})"
+    return expression
+
+
+def _physical_expression(raw, signal):
+    if signal.is_float: raw = f"_float_from_bits({raw}, {signal.length})"
+    if signal.scale != 1: raw = f"{raw} * {signal.scale!r}"
+    if signal.offset != 0: raw = f"{raw} + {signal.offset!r}"
+    return raw
+
+
+class MessageDecoder:
+    """Décodeur précompilé d'un message DBC.
+
+    Les masques, décalages, facteurs et offsets de chaque signal sont figés dans une fonction Python
+    générée une fois pour toutes : decode(data) ne fait que quelques opérations entières et renvoie le
+    tuple des valeurs physiques, dans l'ordre de 'names'. Un signal multiplexé dont le multiplexeur
+    n'a pas la bonne valeur vaut None."""
+    def __init__(self, message):
+        self.message_name = message.name
+        # Certains DBC (chargés en mode non strict) placent des signaux au-delà de la longueur déclarée.
+        self.size = max([message.length, 1] + [signal_end_byte(signal) for signal in message.signals])
+        by_name = {signal.name: signal for signal in message.signals}
+
+        def depth(signal):
+            level = 0
+            while signal.multiplexer_signal in by_name: signal = by_name[signal.multiplexer_signal]; level += 1
+            return level
+        # Chaque multiplexeur doit être évalué avant les signaux qu'il sélectionne.
+        signals = sorted(message.signals, key=depth)
+        self.names = [signal.name for signal in signals]
+        self.units = [signal.unit or "" for signal in signals]
+        # Les libellés VAL_ portent sur la valeur brute : ils sont indexés ici par la valeur physique correspondante.
+        self.choices = [{int(raw) * signal.scale + signal.offset: str(text) for raw, text in signal.choices.items()} if signal.choices else None
+                        for signal in signals]
+
+        lines = ["def decode(data):", f"    if len(data) != {self.size}: data = bytes(data[:{self.size}]).ljust({self.size}, b'\\x00')"]
+        if any(signal.byte_order == 'big_endian' for signal in signals): lines.append("    big = int.from_bytes(data, 'big')")
+        if any(signal.byte_order == 'little_endian' for signal in signals): lines.append("    little = int.from_bytes(data, 'little')")
+        selectors = {}; values = []
+        for signal in signals:
+            raw = _raw_expression(signal, self.size)
+            condition = None
+            if signal.multiplexer_signal in selectors and signal.multiplexer_ids:
+                condition = f"{selectors[signal.multiplexer_signal]} in {frozenset(signal.multiplexer_ids)!r}"
+            if signal.is_multiplexer:
+                selectors[signal.name] = variable = f"mux{len(selectors)}"
+                lines.append(f"    {variable} = ({raw}) if {condition} else None" if condition else f"    {variable} = {raw}")
+                raw = variable
+            value = _physical_expression(raw, signal)
+            if condition: value = f"({value}) if {raw} is not None else None" if signal.is_multiplexer else f"({value}) if {condition} else None"
+            values.append(value)
+        lines.append(f"    return ({', '.join(values)}{',' if len(values) == 1 else ''})")
+        namespace = {'_float_from_bits': _float_from_bits}
+        exec(compile("\n".join(lines), f"<decoder {message.name}>", "exec"), namespace)
+        self.decode = namespace['decode']
+
+    def format_value(self, index, value):
+        """Texte affiché pour la valeur 'value' du signal numéro 'index' (libellé VAL_ si défini)."""
+        if value is None: return ""
+        choices = self.choices[index]
+        if choices and value in choices: return choices[value]
+        if isinstance(value, float): value = f"{value:.6g}"
+        return f"{value} {self.units[index]}".rstrip()
+
+
+def compile_message(message):
+    """Compile le décodeur d'un message cantools, ou renvoie None s'il ne peut pas l'être."""
+    try:
+        return MessageDecoder(message)
+    except (SyntaxError, KeyError, ValueError) as e:
+        print(f"Avertissement : décodeur non compilé pour '{message.name}' : {e}")
+        return None
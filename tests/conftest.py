@@ -0,0 +1,49 @@
+import os
+import sys
+
+# Les modules de l'application sont à la racine du dépôt, sans paquet.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+# Petite base DBC synthétique : ordres d'octets mélangés, signaux signés et flottants, multiplexage, trame étendue.
+SAMPLE_DBC = '''VERSION ""
+
+NS_ :
+
+BS_:
+
+BU_: ECU TESTER
+
+BO_ 256 ENGINE: 8 ECU
+ SG_ Speed : 7|16@0+ (0.01,0) [0|655.35] "km/h" TESTER
+ SG_ Temp : 16|8@1- (1,-40) [-168|87] "degC" TESTER
+ SG_ Mode : 24|3@1+ (1,0) [0|7] "" TESTER
+ SG_ Torque : 39|12@0- (0.5,0) [-1024|1023.5] "Nm" TESTER
+ SG_ Ready : 63|1@1+ (1,0) [0|1] "" TESTER
+
+BO_ 2566844912 DIAG_EXT: 8 ECU
+ SG_ Mux M : 0|8@1+ (1,0) [0|255] "" TESTER
+ SG_ Counter : 8|8@1+ (1,0) [0|255] "" TESTER
+ SG_ ValueA m1 : 16|32@1- (1,0) [-2147483648|2147483647] "" TESTER
+ SG_ ValueB m2 : 16|16@1+ (0.1,5) [5|6558.5] "" TESTER
+ SG_ Gain m3 : 16|32@1- (1,0) [-1e+38|1e+38] "" TESTER
+
+BO_ 1024 STATUS: 4 TESTER
+ SG_ State : 0|4@1+ (1,0) [0|15] "" ECU
+ SG_ Level : 15|10@0+ (2,-100) [-100|1946] "%" ECU
+
+BA_DEF_ BO_ "GenMsgCycleTime" INT 0 65535;
+BA_DEF_DEF_ "GenMsgCycleTime" 0;
+BA_ "GenMsgCycleTime" BO_ 256 100;
+BA_ "GenMsgCycleTime" BO_ 1024 20;
+VAL_ 256 Mode 0 "Off" 1 "Idle" 2 "Run" ;
+SIG_VALTYPE_ 2566844912 Gain : 1;
+'''
+
+
+@pytest.fixture
+def sample_dbc(tmp_path):
+    path = tmp_path / "sample.dbc"
+    path.write_text(SAMPLE_DBC)
+    return str(path)
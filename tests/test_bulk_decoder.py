@@ -0,0 +1,102 @@
+import random
+
+import can
+import pytest
+
+np = pytest.importorskip("numpy")
+cantools = pytest.importorskip("cantools")
+
+from bulk_decoder import decode_store, decode_trace, snapshot_to_arrays, store_records, store_to_arrays
+from frame_store import FLAG_REMOTE, RECORD_SIZE, SPILL_CHUNK, FrameStore
+
+
+def random_trace(db, count, seed):
+    """Trames aléatoires des messages de 'db', plus un ID inconnu et quelques trames distantes."""
+    rng = random.Random(seed); messages = db.messages; frames = []
+    for k in range(count):
+        message = rng.choice(messages); data = bytearray(rng.getrandbits(8) for _ in range(8))
+        if message.is_multiplexed(): data[0] = 1 + k % 3
+        if k % 97 == 0:
+            frames.append(can.Message(timestamp=k * 0.001, arbitration_id=message.frame_id, is_extended_id=message.is_extended_frame,
+                                      is_remote_frame=True, dlc=message.length))
+        elif k % 89 == 0:
+            frames.append(can.Message(timestamp=k * 0.001, arbitration_id=0x7E0, data=bytes(data), is_extended_id=False))
+        else:
+            frames.append(can.Message(timestamp=k * 0.001, arbitration_id=message.frame_id, data=bytes(data[:message.length]),
+                                      is_extended_id=message.is_extended_frame))
+    return frames
+
+
+def expected_columns(db, frames):
+    """Décodage trame par trame avec cantools, mis sous la même forme que decode_trace."""
+    expected = {}
+    for msg in frames:
+        if msg.is_remote_frame: continue
+        try: message = db.get_message_by_frame_id(msg.arbitration_id)
+        except KeyError: continue
+        values = message.decode(msg.data, decode_choices=False, scaling=True)
+        columns = expected.setdefault(message.name, {'timestamp': [], **{s.name: [] for s in message.signals}})
+        columns['timestamp'].append(msg.timestamp)
+        for signal in message.signals: columns[signal.name].append(values.get(signal.name, np.nan))
+    return expected
+
+
+@pytest.fixture
+def db(sample_dbc):
+    return cantools.database.load_file(sample_dbc)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FrameStore(max_bytes=SPILL_CHUNK * 2 * RECORD_SIZE, spill_dir=str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_decode_store_matches_cantools(db, store):
+    frames = random_trace(db, 4 * SPILL_CHUNK, seed=3)
+    store.extend(frames)
+    assert store.spilled > 0
+    decoded = decode_store(store, db)
+    expected = expected_columns(db, frames)
+    assert sorted(decoded) == sorted(expected)
+    for name, columns in expected.items():
+        assert sorted(decoded[name]) == sorted(columns)
+        for column, values in columns.items():
+            np.testing.assert_array_equal(decoded[name][column], np.array(values, dtype=np.float64), err_msg=f"{name}.{column}")
+
+
+def test_remote_and_error_frames_are_skipped(db):
+    timestamps = np.array([0.0, 1.0, 2.0]); ids = np.array([0x100, 0x100, 0x100], dtype=np.uint32)
+    payloads = np.zeros((3, 8), dtype=np.uint8); flags = np.array([FLAG_REMOTE, 0, 4], dtype=np.uint8)
+    decoded = decode_trace(timestamps, ids, payloads, db, flags)
+    np.testing.assert_array_equal(decoded["ENGINE"]["timestamp"], [1.0])
+    # Sans drapeaux, toutes les trames sont décodées.
+    np.testing.assert_array_equal(decode_trace(timestamps, ids, payloads, db)["ENGINE"]["timestamp"], timestamps)
+
+
+def test_inactive_multiplexed_signals_are_nan(db):
+    payloads = np.zeros((3, 8), dtype=np.uint8); payloads[:, 0] = [1, 2, 9]; payloads[:, 2] = 10
+    decoded = decode_trace(np.arange(3.0), np.full(3, 0x18FEF1F0, dtype=np.uint32), payloads, db)["DIAG_EXT"]
+    np.testing.assert_array_equal(decoded["Mux"], [1, 2, 9])
+    np.testing.assert_array_equal(decoded["ValueA"], [10, np.nan, np.nan])
+    np.testing.assert_allclose(decoded["ValueB"], [np.nan, 6.0, np.nan])
+    assert np.isnan(decoded["Gain"]).all()
+
+
+def test_array_views_agree(db, store):
+    frames = random_trace(db, 3 * SPILL_CHUNK, seed=4)
+    store.extend(frames)
+    timestamps, ids, flags, payloads = store_to_arrays(store)
+    assert len(timestamps) == len(store) and ids.tolist() == [msg.arbitration_id for msg in frames]
+    records = store_records(store)
+    np.testing.assert_array_equal(records['timestamp'], timestamps)
+    np.testing.assert_array_equal(records['payload'], payloads)
+    tail = store_records(store, len(store) - 10)
+    np.testing.assert_array_equal(tail['id'], ids[-10:])
+    snapshot = store.snapshot()
+    try:
+        for ours, theirs in zip(snapshot_to_arrays(snapshot, block=1000), (timestamps, ids, flags, payloads)):
+            np.testing.assert_array_equal(ours, theirs)
+    finally:
+        snapshot.close()
@@ -0,0 +1,77 @@
+import random
+
+import can
+import pytest
+
+from bus_stats import CRC15_POLYNOMIAL, FRAME_TAIL_BITS, BusStatistics, frame_bits
+
+
+def reference_bits(arbitration_id, is_extended, is_remote, data):
+    """Longueur sur la ligne calculée bit à bit : champs d'en-tête, CRC-15 puis bits de bourrage."""
+    if is_extended:
+        fields = [(0, 1), (arbitration_id >> 18, 11), (1, 1), (1, 1), (arbitration_id & 0x3FFFF, 18), (int(is_remote), 1), (0, 2), (len(data), 4)]
+    else:
+        fields = [(0, 1), (arbitration_id, 11), (int(is_remote), 1), (0, 2), (len(data), 4)]
+    bits = [value >> shift & 1 for value, width in fields for shift in range(width - 1, -1, -1)]
+    if not is_remote: bits += [byte >> shift & 1 for byte in data for shift in range(7, -1, -1)]
+    crc = 0
+    for bit in bits:
+        feedback = bit ^ (crc >> 14); crc = (crc << 1) & 0x7FFF
+        if feedback: crc ^= CRC15_POLYNOMIAL
+    bits += [crc >> shift & 1 for shift in range(14, -1, -1)]
+    stuffed = 0; run = 0; last = -1
+    for bit in bits:
+        if bit == last: run += 1
+        else: last = bit; run = 1
+        if run == 5: stuffed += 1; last ^= 1; run = 1
+    return len(bits) + stuffed + FRAME_TAIL_BITS
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_frame_bits_matches_bit_by_bit_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        extended = rng.random() < 0.5; remote = rng.random() < 0.1
+        frame_id = rng.randrange(1 << 29) if extended else rng.randrange(0x800)
+        data = bytes(rng.choice([0, 0xFF, rng.randrange(256)]) for _ in range(rng.randrange(9)))
+        assert frame_bits(frame_id, extended, remote, data) == reference_bits(frame_id, extended, remote, data)
+
+
+def test_frame_bits_known_lengths():
+    assert frame_bits(0, False, False, bytes(8)) == reference_bits(0, False, False, bytes(8))
+    assert frame_bits(0x7FF, False, True, b"") == reference_bits(0x7FF, False, True, b"")
+
+
+def message(timestamp, arbitration_id, data, **kwargs):
+    return can.Message(timestamp=timestamp, arbitration_id=arbitration_id, data=data, is_extended_id=arbitration_id >= 0x800, **kwargs)
+
+
+def test_counts_periods_and_dlc_changes():
+    stats = BusStatistics(500000)
+    stats.update([message(0.000, 0x100, bytes(8)), message(0.010, 0x100, bytes(8)), message(0.015, 0x200, bytes(2))])
+    stats.update([message(0.030, 0x100, bytes(4)), message(0.040, 0x100, bytes(8))])
+    summary = stats.summary(0x100)
+    assert summary['count'] == 4 and stats.summary(0x200)['count'] == 1
+    assert summary['period'] == pytest.approx(10.0)
+    assert summary['min'] == pytest.approx(10.0) and summary['max'] == pytest.approx(20.0)
+    assert summary['avg'] == pytest.approx(40.0 / 3)
+    assert summary['dlc_changes'] == 2
+    assert stats.summary(0x300) is None
+    assert stats.frames == 5
+    assert sum(stats.summary(i)['share'] for i in (0x100, 0x200)) == pytest.approx(100.0)
+
+
+def test_missed_cycles_against_dbc_cycle_time():
+    stats = BusStatistics(500000, {0x100: 10.0})
+    stats.update([message(t, 0x100, bytes(8)) for t in (0.000, 0.010, 0.040, 0.050, 0.064)])
+    # 30 ms au lieu de 10 : deux trames manquées ; 14 ms reste sous le seuil de 1,5 cycle.
+    assert stats.summary(0x100)['missed'] == 2
+
+
+def test_bus_load_uses_line_bits():
+    stats = BusStatistics(500000)
+    msgs = [message(k * 0.001, 0x123, bytes(8)) for k in range(1000)]
+    stats.update(msgs)
+    expected = sum(frame_bits(0x123, False, False, bytes(8)) for _ in msgs) * 100.0 / (500000 * 1.0)
+    assert stats.bus_load(1.0) == pytest.approx(expected)
+    assert stats.bus_load(1.0) == 0.0
@@ -0,0 +1,122 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+import can
+import pytest
+
+import canlab_capture
+from capture_core import CaptureSession, PythonCanSource, RotatingLog
+from frame_store import FLAG_EXTENDED
+from vector_formats import iter_frames
+
+
+def messages(count, start=100.0):
+    return [can.Message(timestamp=start + k * 0.001, arbitration_id=0x100 + k % 4, is_extended_id=False, data=bytes([k & 0xFF, k >> 8]))
+            for k in range(count)]
+
+
+class FakeSource:
+    """Source qui rend des lots préparés, puis plus rien."""
+    def __init__(self, batches):
+        self.batches = list(batches); self.reads = 0
+
+    def read(self, timeout):
+        self.reads += 1
+        return self.batches.pop(0) if self.batches else []
+
+
+class ListLog:
+    def __init__(self): self.batches = []
+    def write(self, msgs): self.batches.append(list(msgs))
+
+
+def test_session_filters_and_stops_at_max_frames():
+    msgs = messages(1000); log = ListLog()
+    session = CaptureSession(FakeSource([msgs[k:k + 100] for k in range(0, 1000, 100)]), log,
+                             discrete_filter={'enabled': True, 'ids': {0x101, 0x103}}, batch_interval=0.001)
+    assert session.run(max_frames=300) == 300
+    kept = [msg for batch in log.batches for msg in batch]
+    assert kept == [msg for msg in msgs if msg.arbitration_id in (0x101, 0x103)][:300]
+    assert session.received == 600
+
+
+def test_session_flushes_batches_on_stop():
+    log = ListLog(); source = FakeSource([messages(10)])
+    session = CaptureSession(source, log, batch_interval=60)
+    def on_stats(session, elapsed):
+        if source.reads > 3: session.stop()
+    session.run(on_stats=on_stats, stats_interval=0)
+    assert [len(batch) for batch in log.batches] == [10]
+
+
+@pytest.mark.parametrize("suffix", [".cltrace", ".asc", ".blf", ".csv"])
+def test_rotation_by_frames(tmp_path, suffix):
+    msgs = messages(2500); log = RotatingLog(str(tmp_path / f"capture{suffix}"), rotate_frames=1000)
+    for k in range(0, len(msgs), 300): log.write(msgs[k:k + 300])
+    log.close()
+    assert [os.path.basename(path) for path in log.paths] == [f"capture_{n:04d}{suffix}" for n in (1, 2, 3)]
+    files = [list(iter_frames(path)) for path in log.paths]
+    assert [len(frames) for frames in files] == [1000, 1000, 500] and log.frames_written == 2500
+    assert [frame[4] for frames in files for frame in frames] == [bytes(msg.data) for msg in msgs]
+
+
+def test_single_log_and_bad_format(tmp_path):
+    log = RotatingLog(str(tmp_path / "capture.cltrace")); log.write(messages(10)); log.close()
+    assert log.paths == [str(tmp_path / "capture.cltrace")]
+    with pytest.raises(ValueError):
+        RotatingLog(str(tmp_path / "capture.mf4"))
+
+
+def test_python_can_source_reads_bursts():
+    channel = f"capture-{os.getpid()}"
+    source = PythonCanSource("virtual", channel, None)
+    try:
+        with can.interface.Bus(interface="virtual", channel=channel) as sender:
+            for msg in messages(600): sender.send(msg)
+        first = source.read(0.1)
+        assert len(first) == 512 and len(source.read(0.1)) == 88 and source.read(0.01) == []
+    finally:
+        source.close()
+
+
+@pytest.fixture
+def restore_signals():
+    # main() installe ses propres gestionnaires SIGINT/SIGTERM.
+    handlers = {number: signal.getsignal(number) for number in (signal.SIGINT, signal.SIGTERM)}
+    yield
+    for number, handler in handlers.items(): signal.signal(number, handler)
+
+
+def test_cli_captures_virtual_bus(tmp_path, restore_signals):
+    channel = f"cli-{os.getpid()}"; output = str(tmp_path / "capture.cltrace"); done = threading.Event()
+    def send():
+        with can.interface.Bus(interface="virtual", channel=channel) as sender:
+            k = 0
+            while not done.wait(0.0005):
+                sender.send(can.Message(arbitration_id=0x100 if k % 2 else 0x18DA00F1, is_extended_id=not k % 2, data=bytes([k & 0xFF])))
+                k += 1
+    thread = threading.Thread(target=send); thread.start()
+    try:
+        status = canlab_capture.main(["-i", "virtual", "-c", channel, "-o", output, "--ids", "100", "--count", "50", "--duration", "10", "-q"])
+    finally:
+        done.set(); thread.join()
+    assert status == 0
+    frames = list(iter_frames(output))
+    assert len(frames) == 50 and {frame[1] for frame in frames} == {0x100} and not any(frame[3] & FLAG_EXTENDED for frame in frames)
+
+
+def test_cli_argument_errors(tmp_path, capsys):
+    output = str(tmp_path / "capture.cltrace")
+    assert canlab_capture.main(["-o", output]) == 2
+    assert canlab_capture.main(["-i", "virtual", "-c", "x", "--bus", "virtual:y", "-o", output]) == 2
+    assert canlab_capture.main(["-i", "virtual", "-c", "x", "-o", output, "--messages", "HS4_*"]) == 2
+    assert "error" in capsys.readouterr().err
+
+
+def test_cli_does_not_import_qt():
+    code = "import sys, canlab_capture; sys.exit(any(name.startswith('PyQt') for name in sys.modules))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
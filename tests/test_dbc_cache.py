@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+cantools = pytest.importorskip("cantools")
+
+import dbc_loader
+from dbc_cache import DBCCache, ENTRY_SUFFIX
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DBCCache(str(tmp_path / "cache"))
+
+
+def test_key_is_stable(cache, sample_dbc):
+    assert cache.key([sample_dbc]) == cache.key([sample_dbc])
+    assert len(cache.key([sample_dbc])) == 64
+
+
+def test_key_follows_content_even_with_same_size_and_mtime(cache, sample_dbc):
+    before = cache.key([sample_dbc]); stat = os.stat(sample_dbc)
+    with open(sample_dbc, 'rb') as f: content = f.read()
+    with open(sample_dbc, 'wb') as f: f.write(content.replace(b"ENGINE", b"MOTEUR"))
+    os.utime(sample_dbc, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(sample_dbc).st_size == stat.st_size
+    assert cache.key([sample_dbc]) != before
+
+
+def test_key_follows_mtime_and_variant(cache, sample_dbc):
+    before = cache.key([sample_dbc]); stat = os.stat(sample_dbc)
+    os.utime(sample_dbc, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.key([sample_dbc]) != before
+    assert cache.key([sample_dbc], "strict=True") != cache.key([sample_dbc], "strict=False")
+
+
+def test_key_ignores_path_order(cache, sample_dbc, tmp_path):
+    other = tmp_path / "other.dbc"; other.write_text('VERSION ""\n\nNS_ :\n\nBS_:\n\nBU_:\n')
+    assert cache.key([sample_dbc, str(other)]) == cache.key([str(other), sample_dbc])
+    assert cache.key([sample_dbc, str(other)]) != cache.key([sample_dbc])
+
+
+def test_store_then_load(cache, sample_dbc):
+    db = dbc_loader.parse_dbc_file(sample_dbc); key = cache.key([sample_dbc])
+    assert cache.load(key) is None
+    cache.store(key, db)
+    loaded = cache.load(key)
+    assert [m.name for m in loaded.messages] == [m.name for m in db.messages]
+    data = bytes(range(8))
+    assert loaded.decode_message(0x100, data) == db.decode_message(0x100, data)
+
+
+def test_corrupt_entry_is_removed(cache, sample_dbc):
+    key = cache.key([sample_dbc]); os.makedirs(cache.cache_dir)
+    path = os.path.join(cache.cache_dir, key + ENTRY_SUFFIX)
+    with open(path, 'wb') as f: f.write(b"pas un pickle")
+    assert cache.load(key) is None
+    assert not os.path.exists(path)
+
+
+def test_prune_drops_least_recently_used(tmp_path):
+    cache = DBCCache(str(tmp_path / "cache"), max_bytes=3500)
+    for index, name in enumerate("abc"):
+        cache.store(name, b"x" * 1000)
+        os.utime(os.path.join(cache.cache_dir, name + ENTRY_SUFFIX), (1000 + index, 1000 + index))
+    # 'a' est relue : elle devient la plus récente et 'b' est la prochaine à partir.
+    assert cache.load("a") == b"x" * 1000
+    cache.store("d", b"x" * 1000)
+    remaining = sorted(name[:-len(ENTRY_SUFFIX)] for name in os.listdir(cache.cache_dir))
+    assert remaining == ["a", "c", "d"]
+
+
+def test_loader_reuses_cached_database(cache, sample_dbc, monkeypatch):
+    db, collisions = dbc_loader.load_dbc_files([sample_dbc], cache=cache)
+    assert collisions == []
+
+    def fail(*args, **kwargs): raise AssertionError("fichier réanalysé malgré le cache")
+    monkeypatch.setattr(dbc_loader, "parse_dbc_file", fail)
+    cached, _ = dbc_loader.load_dbc_files([sample_dbc], cache=cache)
+    assert [m.name for m in cached.messages] == [m.name for m in db.messages]
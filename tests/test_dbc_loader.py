@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+cantools = pytest.importorskip("cantools")
+
+import dbc_loader
+
+HEADER = 'VERSION ""\n\nNS_ :\n\nBS_:\n\nBU_: ECU\n\n'
+BODY = 'BO_ 512 BODY: 2 ECU\n SG_ Door : 0|2@1+ (1,0) [0|3] "" Vector__XXX\n SG_ Light : 8|8@1+ (0.5,0) [0|127.5] "" Vector__XXX\n'
+# Redéfinit STATUS (0x400) de la base d'exemple sous un autre nom.
+CLASH = 'BO_ 1024 STATUS_V2: 1 ECU\n SG_ State : 0|8@1+ (1,0) [0|255] "" Vector__XXX\n'
+
+
+@pytest.fixture
+def dbc_files(tmp_path, sample_dbc):
+    body = tmp_path / "body.dbc"; body.write_text(HEADER + BODY)
+    clash = tmp_path / "clash.dbc"; clash.write_text(HEADER + CLASH)
+    return [sample_dbc, str(body), str(clash)]
+
+
+def sequential(paths):
+    db = cantools.database.Database()
+    for path in paths: db.add_dbc_file(path)
+    return db
+
+
+def test_parallel_load_matches_sequential(dbc_files):
+    paths = dbc_files[:2]
+    db, collisions = dbc_loader.load_dbc_files(paths, max_workers=2)
+    reference = sequential(paths)
+    assert collisions == []
+    assert [m.name for m in db.messages] == [m.name for m in reference.messages]
+    data = bytes([0x02, 0x34, 0x56, 0x78, 0x9A, 0xBC, 0xDE, 0xF0])
+    for message in reference.messages:
+        payload = data[:message.length]
+        assert db.decode_message(message.frame_id, payload) == reference.decode_message(message.frame_id, payload)
+
+
+def test_collisions_are_reported(dbc_files):
+    progress = []
+    db, collisions = dbc_loader.load_dbc_files(dbc_files, progress=lambda done, total, name: progress.append((done, total)))
+    assert collisions == [(0x400, False, [("STATUS", "sample.dbc"), ("STATUS_V2", "clash.dbc")])]
+    # Comme add_dbc_file, le dernier fichier l'emporte pour un même identifiant.
+    assert db.get_message_by_frame_id(0x400).name == "STATUS_V2"
+    assert progress[-1] == (3, 3) and len(progress) == 3
+
+
+def test_cancel_returns_none(dbc_files):
+    assert dbc_loader.load_dbc_files(dbc_files, is_cancelled=lambda: True) is None
+
+
+def test_dbc_hash_ignores_order(dbc_files):
+    assert dbc_loader.dbc_hash(dbc_files) == dbc_loader.dbc_hash(dbc_files[::-1])
+    assert dbc_loader.dbc_hash(dbc_files) != dbc_loader.dbc_hash(dbc_files[:2])
@@ -0,0 +1,52 @@
+import pytest
+
+cantools = pytest.importorskip("cantools")
+pytest.importorskip("PyQt6")
+
+from dbc_cache import DBCCache
+from dbc_manager import DBCManager, UNKNOWN_MESSAGE, STANDARD_ID_COUNT
+
+
+@pytest.fixture
+def manager(tmp_path, sample_dbc):
+    manager = DBCManager(); manager.cache = DBCCache(str(tmp_path / "cache"))
+    manager._set_database(manager._load_databases([sample_dbc]), "sample.dbc", [sample_dbc])
+    return manager
+
+
+def test_lookup_matches_cantools(manager, sample_dbc):
+    db = cantools.database.load_file(sample_dbc)
+    for frame_id in range(STANDARD_ID_COUNT):
+        try: expected = db.get_message_by_frame_id(frame_id).name
+        except KeyError: expected = None
+        info = manager.lookup(frame_id)
+        assert (info.name or None) == expected
+        assert (info.decoder is not None) == (expected is not None)
+    extended = manager.lookup(0x18FEF1F0)
+    assert extended.name == "DIAG_EXT" and extended.message.is_extended_frame
+    assert [s.name for s in extended.signals] == [s.name for s in db.get_message_by_name("DIAG_EXT").signals]
+    assert manager.get_message_name(0x100) == "ENGINE"
+
+
+def test_unknown_ids(manager):
+    for frame_id in (0x7FF, 0x800, 0x18FEF1F1, 0x1FFFFFFF):
+        assert manager.lookup(frame_id) is UNKNOWN_MESSAGE
+    assert UNKNOWN_MESSAGE.name == "" and UNKNOWN_MESSAGE.decoder is None and UNKNOWN_MESSAGE.signals == ()
+
+
+def test_names_and_cycle_times(manager):
+    assert manager.message_names() == {0x100: "ENGINE", 0x18FEF1F0: "DIAG_EXT", 0x400: "STATUS"}
+    assert manager.cycle_times() == {0x100: 100, 0x400: 20}
+    assert manager.is_loaded() and len(manager.source_hash) == 32
+
+
+def test_second_load_comes_from_cache(manager, sample_dbc):
+    assert not manager.loaded_from_cache
+    db = manager._load_databases([sample_dbc])
+    assert manager.loaded_from_cache and [m.name for m in db.messages] == ["ENGINE", "DIAG_EXT", "STATUS"]
+
+
+def test_without_database():
+    manager = DBCManager()
+    assert manager.lookup(0x100) is UNKNOWN_MESSAGE
+    assert manager.message_names() == {} and manager.cycle_times() == {} and not manager.is_loaded()
@@ -0,0 +1,61 @@
+import can
+import pytest
+
+from frame_store import FLAG_EXTENDED, FLAG_REMOTE, RECORD_SIZE, SPILL_CHUNK, FrameStore
+
+
+def message(k):
+    return can.Message(timestamp=k * 0.001, arbitration_id=k % 0x800, data=k.to_bytes(4, 'little')[:k % 5], is_extended_id=False)
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Anneau minimal (2 blocs de déversement) pour passer par le segment disque.
+    store = FrameStore(max_bytes=SPILL_CHUNK * 2 * RECORD_SIZE, spill_dir=str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_history_spans_ring_and_spill_file(store):
+    store.extend([message(k) for k in range(5 * SPILL_CHUNK)])
+    assert store.spilled > 0
+    frames = list(store)
+    assert len(frames) == len(store) == 5 * SPILL_CHUNK
+    assert frames[0] == store.frame(0) and frames[-1] == store.frame(-1)
+    assert [frame[1] for frame in frames] == [k % 0x800 for k in range(5 * SPILL_CHUNK)]
+
+
+def test_remote_frames_have_no_data(store):
+    remote = can.Message(timestamp=1.0, arbitration_id=0x29A3D23, is_extended_id=True, is_remote_frame=True, dlc=3)
+    store.extend([remote] + [message(k) for k in range(3 * SPILL_CHUNK)] + [remote])
+    assert store.spilled > 0
+    for index in (0, -1):
+        assert store.frame(index) == (1.0, 0x29A3D23, 3, FLAG_EXTENDED | FLAG_REMOTE, b"")
+        assert store.data(index) == b""
+    frames = list(store)
+    assert frames[0] == frames[-1] == store.frame(0)
+    snapshot = store.snapshot()
+    assert list(snapshot) == frames
+    snapshot.close()
+
+
+def test_snapshot_is_frozen_while_store_keeps_growing(store):
+    store.extend([message(k) for k in range(SPILL_CHUNK + 10)])
+    snapshot = store.snapshot(); expected = list(store)
+    frames = []
+    for frame in snapshot:
+        frames.append(frame)
+        # Ajouts pendant la lecture : l'anneau déverse les slots pas encore copiés.
+        if len(frames) % 1000 == 0: store.extend([message(k) for k in range(SPILL_CHUNK)])
+    snapshot.close()
+    assert frames == expected
+
+
+def test_snapshot_rejects_cleared_store(store):
+    store.extend([message(k) for k in range(3 * SPILL_CHUNK)])
+    snapshot = store.snapshot()
+    reader = iter(snapshot); next(reader)
+    store.clear()
+    with pytest.raises(ValueError):
+        list(reader)
+    snapshot.close()
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from hw_filter import fit_mcp2515, mcp2515_commands, offload_software_filter, optimize_filters, optimize_mcp2515
+from id_filter import compile_filter, compile_software_filter
+
+
+def hardware_accepts(can_filters, frame_id):
+    """Acceptation matérielle d'un ID, valeurs < 0x800 en standard (convention de hw_filter)."""
+    return any(bool(f['extended']) == (frame_id >= 0x800) and frame_id & f['can_mask'] == f['can_id'] & f['can_mask']
+               for f in can_filters)
+
+
+def random_rules(rng):
+    ids = rng.sample(range(0x800), rng.randrange(6)) + [rng.randrange(0x800, 1 << 29) for _ in range(rng.randrange(3))]
+    ranges = []
+    if rng.random() < 0.5: start = rng.randrange(0x800); ranges.append((start, start + rng.randrange(64)))
+    if rng.random() < 0.2: start = rng.randrange(0x800, 1 << 29); ranges.append((start, start + rng.randrange(1 << 12)))
+    masks = [(rng.randrange(1 << 29), rng.choice([0x7F0, 0x700, 0x1FFFFF00, 0x1FFF00FF]))] if rng.random() < 0.3 else []
+    return ids, ranges, masks
+
+
+def probe_ids(rng, ids, ranges, masks):
+    """Tous les ID standard, et des ID étendus pris aux abords des règles et au hasard."""
+    probes = list(range(0x800)) + [rng.randrange(0x800, 1 << 29) for _ in range(2000)]
+    for frame_id in ids: probes += [frame_id - 1, frame_id, frame_id + 1]
+    for start, end in ranges: probes += [start - 1, start, (start + end) // 2, end, end + 1]
+    for code, mask in masks: probes += [(code & mask) | (rng.randrange(1 << 29) & ~mask) for _ in range(200)]
+    return [frame_id for frame_id in probes if 0 <= frame_id < 1 << 29]
+
+
+def assert_superset(can_filters, software, probes):
+    missed = [f"{frame_id:X}" for frame_id in probes if software(frame_id) and not hardware_accepts(can_filters, frame_id)]
+    assert not missed, f"ID rejetés par le matériel mais acceptés par le filtre logiciel : {missed[:10]}"
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_optimize_filters_is_superset_of_software_filter(seed):
+    rng = random.Random(seed)
+    ids, ranges, masks = random_rules(rng)
+    software = compile_filter(ranges, ids, masks)
+    for max_pairs in (1, 2, 4, 8):
+        can_filters, false_positives = optimize_filters(ids, max_pairs, rng.choice([0, 8, 1000]), None, ranges, masks)
+        if false_positives is None: assert can_filters == []; continue
+        assert len(can_filters) <= max_pairs
+        if ids or ranges or masks: assert_superset(can_filters, software, probe_ids(rng, ids, ranges, masks))
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_optimize_mcp2515_is_superset_and_fits_controller(seed):
+    rng = random.Random(seed)
+    ids, ranges, masks = random_rules(rng)
+    if not (ids or ranges or masks): ids = [rng.randrange(0x800)]
+    can_filters, _ = optimize_mcp2515(ids, rng.choice([0, 8]), None, ranges, masks)
+    assert len(can_filters) == 6
+    mcp2515_commands(can_filters) # ValueError si les bancs ne partagent pas masque et type
+    assert_superset(can_filters, compile_filter(ranges, ids, masks), probe_ids(rng, ids, ranges, masks))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_false_positives_counted_on_universe(seed):
+    rng = random.Random(seed)
+    ids, ranges, masks = random_rules(rng)
+    if not (ids or ranges or masks): ids = [rng.randrange(0x800)]
+    universe = set(rng.sample(range(0x800), 300) + ids)
+    software = compile_filter(ranges, ids, masks)
+    for can_filters, false_positives in (optimize_filters(ids, 4, 0, universe, ranges, masks), optimize_mcp2515(ids, 0, universe, ranges, masks)):
+        if false_positives is None: continue
+        assert false_positives == sum(1 for frame_id in universe if hardware_accepts(can_filters, frame_id) and not software(frame_id))
+
+
+def test_exact_cover_has_no_false_positive():
+    can_filters, false_positives = optimize_filters([0x7DF], 4, 0, None, [(0x7E0, 0x7EF)])
+    assert false_positives == 0
+    assert [frame_id for frame_id in range(0x800) if hardware_accepts(can_filters, frame_id)] == [0x7DF] + list(range(0x7E0, 0x7F0))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fit_mcp2515_widens_arbitrary_pairs(seed):
+    rng = random.Random(seed)
+    pairs = [{'can_id': rng.randrange(0x800), 'can_mask': rng.choice([0x7FF, 0x7F0, 0x700])} for _ in range(rng.randrange(1, 9))]
+    if rng.random() < 0.5: pairs.append({'can_id': rng.randrange(0x800, 1 << 29), 'can_mask': 0x1FFFFFFF, 'extended': True})
+    can_filters = fit_mcp2515(pairs)
+    mcp2515_commands(can_filters)
+    # Un couple sans clé 'extended' est classé d'après son ID, comme dans fit_mcp2515.
+    typed = [dict(f, extended=f.get('extended', f['can_id'] >= 0x800)) for f in pairs]
+    assert_superset(can_filters, lambda frame_id: hardware_accepts(typed, frame_id), list(range(0x800)) + [f['can_id'] for f in pairs])
+
+
+@pytest.mark.parametrize("mcp2515", [False, True])
+def test_offload_software_filter_covers_gui_filters(mcp2515):
+    names = {0x100: "HS4_Status", 0x2A0: "HS4_Command", 0x3C0: "ACC", 0x18DAF110: "DIAG_Response"}
+    range_filter = {'enabled': True, 'start': 0x600, 'end': 0x61F}
+    discrete_filter = {'enabled': True, 'ids': [0x7DF], 'ranges': [(0x7E0, 0x7EF)], 'masks': [(0x18DA00F1, 0x1FFF00FF)], 'patterns': ["HS4_*", "DIAG_*"]}
+    can_filters, false_positives = offload_software_filter(range_filter, discrete_filter, names, max_pairs=4, mcp2515=mcp2515)
+    assert false_positives is not None
+    software = compile_software_filter(range_filter, discrete_filter, names)
+    rng = random.Random(0)
+    assert_superset(can_filters, software, probe_ids(rng, [0x7DF, *names], [(0x600, 0x61F), (0x7E0, 0x7EF)], [(0x18DA00F1, 0x1FFF00FF)]))
+
+
+def test_offload_without_active_filter_lets_everything_through():
+    assert offload_software_filter({'enabled': False}, {'enabled': False}) == ([], None)
+    assert offload_software_filter({'enabled': False}, {'enabled': True, 'patterns': ["ABSENT_*"]}, {0x100: "HS4_Status"}) == ([], None)
+
+
+def test_mixed_id_types_do_not_fit_one_pair():
+    assert optimize_filters([0x100, 0x18DAF110], max_pairs=1) == ([], None)
+    assert optimize_filters() == ([], 0)
+
+
+def test_mcp2515_commands():
+    assert mcp2515_commands([]) == b"K:0,0,0\nK:1,0,0\n"
+    can_filters, _ = optimize_mcp2515([0x100, 0x101])
+    lines = mcp2515_commands(can_filters).decode('ascii').splitlines()
+    assert [line[:2] for line in lines] == ["K:", "F:", "F:", "K:", "F:", "F:", "F:", "F:"]
+    with pytest.raises(ValueError):
+        mcp2515_commands(can_filters[:5])
+    with pytest.raises(ValueError):
+        mcp2515_commands([dict(f, can_mask=0x7FF if k else 0x7F0) for k, f in enumerate(can_filters)])
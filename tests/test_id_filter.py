@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from id_filter import MAX_ID, STANDARD_ID_COUNT, compile_filter, compile_software_filter, format_filter_list, parse_filter_list
+
+
+def legacy_filter(range_filter, discrete_filter):
+    """Filtre à dictionnaires et liste d'ID remplacé par compile_software_filter."""
+    def accepts(arbitration_id):
+        if range_filter.get('enabled', False):
+            if range_filter.get('start', 0) <= arbitration_id <= range_filter.get('end', MAX_ID): return True
+        if discrete_filter.get('enabled', False):
+            if arbitration_id in discrete_filter.get('ids', []): return True
+        return False
+    return accepts
+
+
+@pytest.mark.parametrize("range_enabled, discrete_enabled", [(True, True), (True, False), (False, True)])
+def test_compiled_filter_matches_legacy_filter(range_enabled, discrete_enabled):
+    rng = random.Random(0)
+    range_filter = {'enabled': range_enabled, 'start': 0x18DA0000, 'end': 0x18DAFFFF}
+    discrete_filter = {'enabled': discrete_enabled, 'ids': rng.sample(range(STANDARD_ID_COUNT), 200) + [0x18DB0000, 0x1FFFFFFF]}
+    legacy = legacy_filter(range_filter, discrete_filter); compiled = compile_software_filter(range_filter, discrete_filter)
+    frames = list(range(STANDARD_ID_COUNT)) + [0x18D9FFFF, 0x18DA0000, 0x18DAFFFF, 0x18DB0000, 0x1FFFFFFF]
+    frames += [rng.randrange(MAX_ID + 1) for _ in range(20000)]
+    assert [legacy(i) for i in frames] == [compiled(i) for i in frames]
+
+
+def test_no_active_filter_compiles_to_none():
+    assert compile_software_filter({'enabled': False}, {'enabled': False, 'ids': [0x100]}) is None
+
+
+@pytest.mark.parametrize("code, mask", [(0x7E0, 0x7F0), (0x18DA00F1, 0x1FFF00FF), (0x100, 0x100), (0x0, 0x1F0F0F0F), (0x5, 0x0)])
+def test_mask_rules_match_brute_force(code, mask):
+    compiled = compile_filter(masks=[(code, mask)])
+    rng = random.Random(code ^ mask)
+    frames = list(range(STANDARD_ID_COUNT)) + [(code & mask) | (rng.randrange(MAX_ID + 1) & ~mask) for _ in range(5000)]
+    frames += [rng.randrange(MAX_ID + 1) for _ in range(5000)]
+    assert [compiled(i) for i in frames] == [i & mask == code & mask for i in frames]
+
+
+def test_patterns_resolve_against_dbc_names():
+    names = {0x100: "HS4_Status", 0x2A0: "HS4_Command", 0x3C0: "ACC"}
+    compiled = compile_filter(patterns=["HS4_*"], names=names)
+    assert [compiled(i) for i in (0x100, 0x2A0, 0x3C0)] == [True, True, False]
+    assert not compile_filter(patterns=["HS4_*"])(0x100)
+
+
+def test_parse_filter_list():
+    assert parse_filter_list("100, 300-3FF; 7E0/7F0, HS4_*") == {'ids': [0x100], 'ranges': [(0x300, 0x3FF)], 'masks': [(0x7E0, 0x7F0)], 'patterns': ["HS4_*"]}
+    names = {0x3C0: "ACC"}
+    assert parse_filter_list("ACC", names)['patterns'] == ["ACC"]
+    assert parse_filter_list("ACC")['ids'] == [0xACC]
+    assert parse_filter_list("0xACC", names)['ids'] == [0xACC]
+    assert parse_filter_list("'ACC'")['patterns'] == ["ACC"]
+    with pytest.raises(ValueError):
+        parse_filter_list("100, 3G0-")
+
+
+@pytest.mark.parametrize("names", [None, {0x3C0: "ACC", 0x100: "DCDC"}])
+def test_format_filter_list_round_trip(names):
+    rules = {'ids': [0xACC, 0xDCDC, 0x123], 'ranges': [(0x300, 0x3FF)], 'masks': [(0x18DA00F1, 0x1FFF00FF)], 'patterns': ["ACC", "HS4_*", "DCDC"]}
+    assert parse_filter_list(format_filter_list(rules, names), names) == rules
@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+from PyQt6.QtCore import Qt
+
+from bus_stats import BusStatistics
+from rx_models import HIGHLIGHT_DURATION, HIGHLIGHT_FADE, MonitorTableModel
+
+
+class FakeDBC:
+    def get_message_name(self, msg_id): return ""
+
+
+@pytest.fixture
+def model():
+    cache = {}; model = MonitorTableModel(cache, FakeDBC(), BusStatistics())
+    model.inserted = []; model.changed = []
+    model.rowsInserted.connect(lambda parent, first, last: model.inserted.append((first, last)))
+    model.dataChanged.connect(lambda top_left, bottom_right, roles=(): model.changed.append((top_left.row(), bottom_right.row())))
+    return model
+
+
+def entry(data, changed_at):
+    return {'dlc': len(data), 'data': data, 'comment': "", 'changed_at': changed_at}
+
+
+def background(model, msg_id):
+    return model.data(model.index(model.id_to_row[msg_id], 0), Qt.ItemDataRole.BackgroundRole)
+
+
+def test_new_ids_inserted_in_one_pass(model):
+    for msg_id in (0x300, 0x100, 0x200): model.cache[msg_id] = entry(b"\x01", 10.0)
+    model.refresh({0x300, 0x100, 0x200, 0x400}, 10.0) # 0x400 : absent du cache (vidé entre-temps), ignoré.
+    assert model.inserted == [(0, 2)] and model.row_ids == [0x100, 0x200, 0x300]
+    assert model.changed == [(0, 2)]
+    assert model.data(model.index(1, 0)) == "200" and model.data(model.index(1, 2)) == "01"
+    model.cache[0x050] = entry(b"\x02", 10.1)
+    model.refresh({0x050}, 10.1)
+    # Les nouveaux ID sont ajoutés en fin de liste, sans retrier les lignes existantes.
+    assert model.inserted[-1] == (3, 3) and model.row_ids[-1] == 0x050
+
+
+def test_highlight_fades_then_stops_repainting(model):
+    model.cache[0x100] = entry(b"\x01", 10.0); model.cache[0x200] = entry(b"\x01", 0.0)
+    model.refresh({0x100, 0x200}, 10.0)
+    assert background(model, 0x100) is HIGHLIGHT_FADE[0] and background(model, 0x200) is None
+    assert model.fading == {0x100}
+
+    model.changed.clear()
+    model.refresh(set(), 10.0 + HIGHLIGHT_DURATION * 0.6)
+    assert 0 < background(model, 0x100).color().alpha() < HIGHLIGHT_FADE[0].color().alpha()
+    assert model.changed == [(0, 0)]
+
+    # Fin du fondu : un dernier repeint sans surbrillance, puis plus rien.
+    model.changed.clear()
+    model.refresh(set(), 10.0 + HIGHLIGHT_DURATION)
+    assert model.changed == [(0, 0)] and not model.fading and background(model, 0x100) is None
+    model.changed.clear()
+    model.refresh(set(), 11.0)
+    assert model.changed == []
+
+
+def test_unchanged_dirty_row_is_repainted_without_highlight(model):
+    model.cache[0x100] = entry(b"\x01", 0.0); model.cache[0x200] = entry(b"\x01", 0.0)
+    model.refresh({0x100, 0x200}, 10.0); model.changed.clear()
+    model.refresh({0x200}, 10.1)
+    assert model.changed == [(1, 1)] and not model.fading
+
+
+def test_reset_rebuilds_sorted_rows(model):
+    model.cache.update({0x300: entry(b"", 1.0), 0x100: entry(b"", 1.0)})
+    model.refresh({0x300}, 1.0); model.refresh({0x100}, 1.0)
+    assert model.row_ids == [0x300, 0x100]
+    model.reset()
+    assert model.row_ids == [0x100, 0x300] and model.id_to_row == {0x100: 0, 0x300: 1} and not model.fading
@@ -0,0 +1,58 @@
+import asyncio
+import random
+import threading
+import time
+
+import can
+from can.interfaces.virtual import VirtualBus
+
+import multi_bus
+from multi_bus import BusChannel, MultiBusReceiver
+
+
+class StalledVirtualBus(VirtualBus):
+    """Bus virtuel dont la lecture garde parfois une trame déjà sortie de la file, comme un thread de
+    lecture privé de processeur."""
+    def __init__(self, channel, stall=0.1, **kwargs):
+        super().__init__(channel=channel, **kwargs)
+        self.stall = stall; self.rng = random.Random(channel)
+
+    def _recv_internal(self, timeout):
+        msg, filtered = super()._recv_internal(timeout)
+        if msg is not None and self.rng.random() < 0.005: time.sleep(self.stall)
+        return msg, filtered
+
+
+def send(channel, count, start_delay=0.0):
+    time.sleep(start_delay)
+    bus = VirtualBus(channel=channel)
+    for k in range(count):
+        bus.send(can.Message(arbitration_id=k % 0x800, is_extended_id=False, data=bytes(8)))
+        if k % 20 == 19: time.sleep(0.001)
+    bus.shutdown()
+
+
+def test_batches_never_go_back_in_time(monkeypatch):
+    monkeypatch.setattr(multi_bus.can.interface, "Bus", lambda interface, channel, **kwargs: StalledVirtualBus(channel, **kwargs))
+    channels = [BusChannel(f"bus{index}", "virtual", f"test_multi_bus_{index}") for index in range(3)]
+    count = 3000
+
+    async def collect():
+        merged = []
+        async with MultiBusReceiver(channels, merge_delay=0.05) as receiver:
+            # Le dernier bus ne commence à émettre qu'une fois les autres lancés.
+            senders = [threading.Thread(target=send, args=(channel.channel, count, 0.3 if index == 2 else 0.0))
+                       for index, channel in enumerate(channels)]
+            for sender in senders: sender.start()
+            deadline = time.monotonic() + 30
+            async for batch in receiver.batches():
+                merged += batch
+                if len(merged) >= count * len(channels) or time.monotonic() > deadline: receiver.stop()
+            for sender in senders: sender.join()
+        return merged
+
+    merged = asyncio.run(collect())
+    assert len(merged) == 3 * count
+    assert sorted({msg.channel for msg in merged}) == [0, 1, 2]
+    backwards = [(previous.timestamp, msg.timestamp) for previous, msg in zip(merged, merged[1:]) if msg.timestamp < previous.timestamp]
+    assert not backwards
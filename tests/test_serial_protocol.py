@@ -0,0 +1,61 @@
+import random
+
+from serial_protocol import (FLAG_EXTENDED, FLAG_REMOTE, MCP_EXTENDED_BIT, MCP_REMOTE_BIT, SYNC_BYTE, BinaryFrameDecoder, TextFrameDecoder,
+                             encode_binary_frame, parse_text_lines)
+
+
+def random_frames(rng, count):
+    frames = []
+    for k in range(count):
+        flags = rng.choice([0, 0, FLAG_EXTENDED, FLAG_REMOTE])
+        frame_id = rng.randrange(1 << 29) if flags & FLAG_EXTENDED else rng.randrange(0x800)
+        # Des octets SYNC dans les données éprouvent la resynchronisation.
+        data = bytes(rng.choice([SYNC_BYTE, rng.randrange(256)]) for _ in range(rng.randrange(9)))
+        frames.append((k * 250 & 0xFFFFFFFF, frame_id, flags, data))
+    return frames
+
+
+def feed_in_chunks(decoder, stream, rng):
+    frames = []; offset = 0
+    while offset < len(stream):
+        size = rng.randrange(1, 40); frames += decoder.feed(stream[offset:offset + size]); offset += size
+    return frames
+
+
+def test_binary_round_trip_with_arbitrary_chunks():
+    rng = random.Random(0)
+    frames = random_frames(rng, 2000)
+    stream = b"".join(encode_binary_frame(frame_id, data, flags, us) for us, frame_id, flags, data in frames)
+    decoder = BinaryFrameDecoder()
+    assert feed_in_chunks(decoder, stream, rng) == frames
+    assert decoder.crc_errors == 0 and decoder.discarded_bytes == 0 and not decoder.buffer
+
+
+def test_binary_resynchronises_after_garbage_and_corrupt_frame():
+    rng = random.Random(1)
+    frames = random_frames(rng, 50)
+    encoded = [encode_binary_frame(frame_id, data, flags, us) for us, frame_id, flags, data in frames]
+    corrupt = bytearray(encoded[10]); corrupt[-1] ^= 0xFF
+    stream = bytes([0x00, SYNC_BYTE, 0xFF, 0x12]) + b"".join(encoded[:10]) + bytes(corrupt) + b"".join(encoded[11:])
+    decoder = BinaryFrameDecoder()
+    assert feed_in_chunks(decoder, stream, rng) == frames[:10] + frames[11:]
+    assert decoder.crc_errors >= 1 and decoder.discarded_bytes >= 4 + len(corrupt)
+
+
+def test_text_round_trip_with_arbitrary_chunks():
+    rng = random.Random(2)
+    # Le sketch écrit l'ID tel que le rend la bibliothèque MCP2515 : bits 31 (étendu) et 30 (RTR) compris.
+    frames = [(us, frame_id, flags, b"" if flags & FLAG_REMOTE else data) for us, frame_id, flags, data in random_frames(rng, 2000)]
+    raw_id = lambda frame_id, flags: frame_id | (MCP_EXTENDED_BIT if flags & FLAG_EXTENDED else 0) | (MCP_REMOTE_BIT if flags & FLAG_REMOTE else 0)
+    stream = b"".join(f"{raw_id(frame_id, flags):X},{len(data):X}".encode() + b"".join(f",{b:X}".encode() for b in data) + f",T{us:X}\n".encode()
+                      for us, frame_id, flags, data in frames)
+    decoder = TextFrameDecoder()
+    assert feed_in_chunks(decoder, stream, rng) == frames
+    assert decoder.parse_errors == 0
+
+
+def test_text_status_lines_errors_and_remainder():
+    frames, remainder, errors = parse_text_lines(b"--- CAN OK\n!!! overflow\n123,2,A,B\n7E8,9,0\n1FF,1,ZZ\n456,1")
+    assert frames == [(None, 0x123, 0, b"\x0A\x0B")]
+    assert remainder == b"456,1"
+    assert errors == 2
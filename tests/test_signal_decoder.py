@@ -0,0 +1,100 @@
+import math
+import os
+import random
+
+import pytest
+
+cantools = pytest.importorskip("cantools")
+from cantools.database.can import Message
+
+from signal_decoder import compile_message, signal_end_byte
+
+REPO_DBC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DBC_Total_Final.dbc")
+
+
+def same(value, expected):
+    if isinstance(expected, float) and math.isnan(expected): return isinstance(value, float) and math.isnan(value)
+    return value == expected
+
+
+def reference(message, data):
+    """Décodage cantools ; {} pour une valeur de multiplexeur inconnue."""
+    try:
+        return message.decode(data, decode_choices=False, scaling=True)
+    except cantools.database.DecodeError:
+        if message.is_multiplexed(): return {}
+    # cantools refuse les messages dont les signaux se chevauchent (DBC chargé en non strict) : un signal à la fois.
+    expected = {}
+    for signal in message.signals:
+        single = Message(message.frame_id, message.name, message.length, [signal], strict=False)
+        expected.update(single.decode(data, decode_choices=False, scaling=True))
+    return expected
+
+
+def check_against_cantools(db, payloads):
+    for message in db.messages:
+        decoder = compile_message(message)
+        assert decoder is not None and sorted(decoder.names) == sorted(s.name for s in message.signals)
+        for data in payloads(message):
+            expected = reference(message, data)
+            values = dict(zip(decoder.names, decoder.decode(data)))
+            for name, value in values.items():
+                if name in expected: assert same(value, expected[name]), (message.name, name, data.hex())
+                elif not message.is_multiplexed(): pytest.fail(f"{message.name}.{name} absent de cantools")
+                elif expected: assert value is None, (message.name, name, data.hex())
+
+
+def random_payloads(seed, count=300):
+    rng = random.Random(seed)
+    def payloads(message):
+        for index in range(count):
+            data = bytearray(rng.getrandbits(8) for _ in range(message.length))
+            # Pour les messages multiplexés, balaie surtout les valeurs de multiplexeur définies.
+            if message.is_multiplexed() and index % 4: data[0] = index % 4
+            yield bytes(data)
+    return payloads
+
+
+@pytest.mark.skipif(not os.path.exists(REPO_DBC), reason="DBC du dépôt absent")
+def test_matches_cantools_on_repo_dbc():
+    check_against_cantools(cantools.database.load_file(REPO_DBC, strict=False), random_payloads(1))
+
+
+def test_matches_cantools_on_sample_dbc(sample_dbc):
+    # Ordres d'octets mélangés, signes, flottant, facteurs et offsets, multiplexage, trame étendue.
+    check_against_cantools(cantools.database.load_file(sample_dbc), random_payloads(2))
+
+
+def test_multiplexed_values(sample_dbc):
+    message = cantools.database.load_file(sample_dbc).get_message_by_name("DIAG_EXT")
+    decoder = compile_message(message)
+    decode = lambda data: dict(zip(decoder.names, decoder.decode(data)))
+    values = decode(bytes([2, 7, 0x10, 0x00, 0, 0, 0, 0]))
+    assert values["Mux"] == 2 and values["Counter"] == 7
+    assert values["ValueA"] is None and values["Gain"] is None
+    assert values["ValueB"] == pytest.approx(0x10 * 0.1 + 5)
+    values = decode(bytes([3, 0]) + bytes.fromhex("0000c03f") + bytes(2))
+    assert values["Gain"] == 1.5 and values["ValueB"] is None
+    values = decode(bytes([9]) + bytes(7))
+    assert values["ValueA"] is None and values["ValueB"] is None and values["Gain"] is None
+
+
+def test_short_payload_is_zero_padded(sample_dbc):
+    message = cantools.database.load_file(sample_dbc).get_message_by_name("ENGINE")
+    decoder = compile_message(message)
+    assert decoder.decode(bytes([0x01, 0x02])) == decoder.decode(bytes([0x01, 0x02]) + bytes(6))
+
+
+def test_format_value(sample_dbc):
+    message = cantools.database.load_file(sample_dbc).get_message_by_name("ENGINE")
+    decoder = compile_message(message); index = decoder.names.index
+    assert decoder.format_value(index("Mode"), 2) == "Run"
+    assert decoder.format_value(index("Mode"), 5) == "5"
+    assert decoder.format_value(index("Speed"), 12.345) == "12.345 km/h"
+    assert decoder.format_value(index("Temp"), None) == ""
+
+
+def test_signal_end_byte(sample_dbc):
+    db = cantools.database.load_file(sample_dbc)
+    ends = {s.name: signal_end_byte(s) for m in db.messages for s in m.signals}
+    assert ends["Speed"] == 2 and ends["Torque"] == 6 and ends["Ready"] == 8 and ends["Level"] == 3
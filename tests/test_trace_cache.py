@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from frame_store import FLAG_EXTENDED
+from trace_cache import TraceCache
+from trace_log import TraceReader, index_path, write_trace_file
+from vector_formats import convert_frames, iter_frames
+
+FRAMES = [(100.0 + k * 0.01, 0x100 + k % 3, 2, 0, bytes([k, k])) for k in range(200)] + [(102.0, 0x18DAF110, 1, FLAG_EXTENDED, b"\x07")]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TraceCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = str(tmp_path / "bench.asc"); convert_frames(iter(FRAMES), path)
+    return path
+
+
+def convert(cache, key, source):
+    pending = cache.pending_path(key)
+    write_trace_file(pending, iter_frames(source))
+    return cache.commit(key, pending)
+
+
+def test_key_follows_source_file(cache, log):
+    key = cache.key(log)
+    assert key == cache.key(log)
+    stat = os.stat(log)
+    os.utime(log, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    touched = cache.key(log)
+    assert touched != key
+    with open(log, 'a') as f: f.write("\n")
+    os.utime(log, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.key(log) != touched
+
+
+def test_commit_then_lookup(cache, log):
+    key = cache.key(log)
+    assert cache.lookup(key) is None
+    path = convert(cache, key, log)
+    assert cache.lookup(key) == path and os.path.exists(index_path(path))
+    assert [name for name in os.listdir(cache.cache_dir) if ".tmp" in name] == []
+    reader = TraceReader(path)
+    try: assert [reader.frame(index)[1:] for index in range(len(reader))] == [frame[1:] for frame in FRAMES]
+    finally: reader.close()
+
+
+def test_discard_removes_pending(cache, log):
+    pending = cache.pending_path(cache.key(log)); write_trace_file(pending, FRAMES)
+    cache.discard(pending)
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_prune_keeps_new_entry(tmp_path, log):
+    probe = convert(TraceCache(str(tmp_path / "probe")), "probe", log)
+    entry_size = os.path.getsize(probe) + os.path.getsize(index_path(probe))
+    cache = TraceCache(str(tmp_path / "cache"), max_bytes=int(entry_size * 2.5))
+    for index, key in enumerate(("a", "b")):
+        path = convert(cache, key, log); os.utime(path, (1000 + index, 1000 + index))
+    assert cache.lookup("a") # 'a' redevient la plus récente.
+    kept = convert(cache, "c", log)
+    assert cache.lookup("b") is None and cache.lookup("a") and cache.lookup("c") == kept
+    # Même seule au-dessus de la limite, la trace qui vient d'être convertie est conservée.
+    small = TraceCache(str(tmp_path / "small"), max_bytes=1)
+    assert os.path.exists(convert(small, "big", log))
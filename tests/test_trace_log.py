@@ -0,0 +1,123 @@
+import bisect
+import os
+import random
+
+import can
+import pytest
+
+from frame_store import FLAG_ERROR, FLAG_EXTENDED, FLAG_REMOTE, FrameStore
+from trace_log import TraceReader, index_path, TraceWriter, import_text_trace, iter_text_trace, iter_trace, read_header, write_text_trace
+
+
+def random_messages(count, seed=0, start=1000.0):
+    """Trames standard, étendues et remote (avec DLC) à horodatages croissants."""
+    rng = random.Random(seed); msgs = []
+    for k in range(count):
+        extended = rng.random() < 0.3; remote = rng.random() < 0.05
+        frame_id = rng.randrange(1 << 29) if extended else rng.randrange(0x800)
+        if remote: msgs.append(can.Message(timestamp=start + k * 0.001, arbitration_id=frame_id, is_extended_id=extended, is_remote_frame=True, dlc=rng.randrange(9)))
+        else: msgs.append(can.Message(timestamp=start + k * 0.001, arbitration_id=frame_id, is_extended_id=extended, data=bytes(rng.randrange(256) for _ in range(rng.randrange(9)))))
+    return msgs
+
+
+def as_frame(msg):
+    flags = (FLAG_EXTENDED if msg.is_extended_id else 0) | (FLAG_REMOTE if msg.is_remote_frame else 0)
+    return msg.timestamp, msg.arbitration_id, msg.dlc, flags, b"" if msg.is_remote_frame else bytes(msg.data)
+
+
+@pytest.fixture
+def trace(tmp_path):
+    msgs = random_messages(20000)
+    path = str(tmp_path / "capture.cltrace")
+    writer = TraceWriter(path, dbc_hash=b"\x01" * 32, index_interval=1024)
+    for k in range(0, len(msgs), 500): writer.write(msgs[k:k + 500])
+    writer.close()
+    assert writer.error is None and writer.frames_written == len(msgs)
+    return path, [as_frame(msg) for msg in msgs]
+
+
+def test_trace_round_trip(trace):
+    path, frames = trace
+    assert read_header(path)['dbc_hash'] == b"\x01" * 32
+    assert list(iter_trace(path, chunk_frames=1000)) == frames
+    reader = TraceReader(path)
+    try:
+        assert len(reader) == len(frames)
+        assert [reader.frame(index) for index in range(len(reader))] == frames
+        assert reader.frame(-1) == frames[-1]
+    finally: reader.close()
+
+
+@pytest.mark.parametrize("with_index", [True, False])
+def test_find_time(trace, with_index):
+    path, frames = trace
+    if not with_index: os.remove(index_path(path)) # L'index est alors reconstruit depuis la trace.
+    times = [frame[0] for frame in frames]
+    reader = TraceReader(path)
+    try:
+        for timestamp in [0.0, times[0], times[1] - 1e-4, times[5000], times[5000] + 1e-4, times[-1], times[-1] + 1e-4, 1e12]:
+            assert reader.find_time(timestamp) == bisect.bisect_left(times, timestamp)
+        assert reader.find_time(1e12) == len(frames)
+    finally: reader.close()
+
+
+def test_remote_frames_read_back_without_data(trace):
+    path, frames = trace
+    remote = [frame for frame in frames if frame[3] & FLAG_REMOTE]
+    assert remote and any(frame[2] for frame in remote)
+    assert all(frame[4] == b"" for frame in iter_trace(path) if frame[3] & FLAG_REMOTE)
+
+
+def test_write_frames_from_store_snapshot(tmp_path):
+    msgs = random_messages(5000, seed=1)
+    store = FrameStore(); store.extend(msgs)
+    path = str(tmp_path / "history.cltrace")
+    writer = TraceWriter(path); writer.write_frames(store.snapshot()); writer.close()
+    assert list(iter_trace(path)) == list(store) == [as_frame(msg) for msg in msgs]
+    store.close()
+
+
+def test_truncated_record_is_ignored(trace):
+    path, frames = trace
+    with open(path, 'ab') as f: f.write(b"\x00" * 5)
+    reader = TraceReader(path)
+    try: assert len(reader) == len(frames)
+    finally: reader.close()
+
+
+def test_not_a_trace(tmp_path):
+    path = tmp_path / "other.cltrace"; path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        read_header(str(path))
+
+
+@pytest.mark.parametrize("suffix", [".txt", ".csv"])
+def test_text_export_round_trip(tmp_path, suffix):
+    # ID étendus au-delà de 0xFFF : l'export ne garde que le nombre de chiffres pour le type d'ID.
+    frames = [as_frame(msg) for msg in random_messages(20000, seed=2) if not msg.is_extended_id or msg.arbitration_id > 0xFFF]
+    assert any(frame[3] & FLAG_REMOTE and frame[2] == 0 for frame in frames)
+    frames[::1000] = [(frame[0], 0, 0, FLAG_ERROR, b"") for frame in frames[::1000]]
+    path = str(tmp_path / f"rx_tracer{suffix}")
+    assert write_text_trace(path, frames, start_time=1000.0, name_of=lambda frame_id: f"MSG_{frame_id:X}") == len(frames)
+    stats = {}
+    read = list(iter_text_trace(path, stats))
+    assert stats.get('skipped', 0) == 0
+    assert [frame[1:] for frame in read] == [frame[1:] for frame in frames]
+    assert [frame[0] for frame in read] == [pytest.approx(frame[0] - 1000.0, abs=5e-4) for frame in frames]
+    imported, skipped = import_text_trace(path, str(tmp_path / "imported.cltrace"))
+    assert (imported, skipped) == (len(frames), 0)
+    assert [frame[1:] for frame in iter_trace(str(tmp_path / "imported.cltrace"))] == [frame[1:] for frame in frames]
+
+
+def test_text_export_without_remote_marker(tmp_path):
+    # Exports antérieurs : colonne Data vide pour une trame remote.
+    (tmp_path / "old.txt").write_text("Time   ID        DLC  Data                     Message Name\n"
+                                      "0.030  29A3D23   3                             \n"
+                                      "0.040  123       2    0A 0B                    HS4_Status\n"
+                                      "0.050  123       2    0A\n")
+    (tmp_path / "old.csv").write_text("Time;ID;DLC;Data;Message Name\n0.030;29A3D23;3;;\n0.040;123;2;0A 0B;HS4_Status\n")
+    expected = [(0.03, 0x29A3D23, 3, FLAG_EXTENDED | FLAG_REMOTE, b""), (0.04, 0x123, 2, 0, b"\x0a\x0b")]
+    stats = {}
+    assert list(iter_text_trace(str(tmp_path / "old.txt"), stats)) == expected
+    assert stats == {'skipped': 1}
+    assert list(iter_text_trace(str(tmp_path / "old.csv"))) == expected
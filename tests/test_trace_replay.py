@@ -0,0 +1,93 @@
+import time
+
+import can
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from frame_store import FLAG_ERROR, FLAG_EXTENDED, FLAG_REMOTE
+from trace_log import write_text_trace, write_trace_file
+from trace_replay import TraceReplayer
+
+
+def frames():
+    """Rafales de 3 trames toutes les 20 ms (dont une étendue et une remote), plus des trames d'erreur."""
+    frames = []
+    for k in range(25):
+        t = 500.0 + k * 0.02
+        frames.append((t, 0x100, 2, 0, bytes([k, 1])))
+        frames.append((t + 0.0001, 0x18DAF110, 3, FLAG_EXTENDED, bytes([k, 2, 3])))
+        frames.append((t + 0.0002, 0x200, 4, FLAG_REMOTE, b""))
+        if k % 5 == 0: frames.append((t + 0.005, 0, 0, FLAG_ERROR, b""))
+    return frames
+
+
+class Recorder:
+    def __init__(self, result=True):
+        self.sent = []; self.result = result
+
+    def __call__(self, msgs):
+        now = time.perf_counter(); self.sent.extend((now, msg) for msg in msgs)
+        return self.result
+
+
+def replay(path, send_batch, **kwargs):
+    replayer = TraceReplayer(path, send_batch, **kwargs); reports = []
+    replayer.stats_updated.connect(reports.append)
+    replayer.run() # Directement dans le thread du test.
+    return reports[-1]
+
+
+@pytest.fixture(params=[".cltrace", ".csv"])
+def trace(request, tmp_path):
+    path = str(tmp_path / f"capture{request.param}")
+    (write_trace_file if request.param == ".cltrace" else write_text_trace)(path, frames())
+    return path
+
+
+def test_replays_in_order_with_original_spacing(trace):
+    recorder = Recorder()
+    stats = replay(trace, recorder)
+    expected = [frame for frame in frames() if not frame[3] & FLAG_ERROR]
+    assert stats['sent'] == len(expected) and stats['skipped'] == 5 and stats['errors'] == 0
+    sent = [msg for _, msg in recorder.sent]
+    assert [msg.arbitration_id for msg in sent] == [frame[1] for frame in expected]
+    assert [msg.is_extended_id for msg in sent] == [bool(frame[3] & FLAG_EXTENDED) for frame in expected]
+    assert [msg.is_remote_frame for msg in sent] == [bool(frame[3] & FLAG_REMOTE) for frame in expected]
+    assert [bytes(msg.data) for msg in sent if not msg.is_remote_frame] == [frame[4] for frame in expected if not frame[3] & FLAG_REMOTE]
+    assert all(msg.dlc == frame[2] for msg, frame in zip(sent, expected))
+    # Échéances absolues : l'écart à l'origine reste celui de la trace, sans dérive cumulée.
+    first = recorder.sent[0][0]
+    errors = sorted(abs((sent_at - first) - (frame[0] - expected[0][0])) for (sent_at, _), frame in zip(recorder.sent, expected))
+    assert errors[len(errors) // 2] < 0.002 and errors[-1] < 0.03
+    assert stats['mean_ms'] < 3
+
+
+def test_speed_and_filter(trace):
+    recorder = Recorder()
+    stats = replay(trace, recorder, speed=4.0, id_filter=lambda msg_id: msg_id == 0x100)
+    assert [msg.data[0] for _, msg in recorder.sent] == list(range(25))
+    assert stats['skipped'] == 2 * 25 + 5
+    duration = recorder.sent[-1][0] - recorder.sent[0][0]
+    assert abs(duration - 0.48 / 4) < 0.02
+
+
+def test_failed_sends_are_counted(trace):
+    stats = replay(trace, Recorder(result=False), speed=10.0)
+    assert stats['sent'] == 0 and stats['errors'] == 75
+
+
+def test_replay_onto_virtual_bus(tmp_path):
+    path = str(tmp_path / "capture.cltrace"); write_trace_file(path, frames())
+    channel = f"replay-{id(path)}"
+    with can.interface.Bus(interface='virtual', channel=channel) as tx, can.interface.Bus(interface='virtual', channel=channel) as rx:
+        def send_batch(msgs):
+            for msg in msgs: tx.send(msg)
+            return True
+        replay(path, send_batch, speed=5.0)
+        received = []
+        while (msg := rx.recv(0.1)) is not None: received.append(msg)
+    expected = [frame for frame in frames() if not frame[3] & FLAG_ERROR]
+    assert [(msg.arbitration_id, msg.is_remote_frame) for msg in received] == [(frame[1], bool(frame[3] & FLAG_REMOTE)) for frame in expected]
+    gaps = sorted(b.timestamp - a.timestamp for a, b in zip(received[::3], received[3::3]))
+    assert gaps and abs(gaps[len(gaps) // 2] - 0.004) < 0.001
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from tx_scheduler import TxScheduler
+
+
+class Recorder:
+    """send_batch factice : note l'instant (perf_counter) et le contenu de chaque lot."""
+    def __init__(self, delays=None):
+        self.batches = []; self.lock = threading.Lock(); self.delays = delays or {}
+
+    def __call__(self, msgs):
+        with self.lock:
+            self.batches.append((time.perf_counter(), list(msgs)))
+            delay = self.delays.get(len(self.batches))
+        if delay: time.sleep(delay)
+        return True
+
+    def times(self, msg):
+        with self.lock: return [t for t, msgs in self.batches if msg in msgs]
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+    def start(send_batch):
+        scheduler = TxScheduler(send_batch, report_interval_ms=60000); scheduler.start(); schedulers.append(scheduler)
+        return scheduler
+    yield start
+    for scheduler in schedulers: scheduler.stop()
+
+
+def test_absolute_deadlines_do_not_drift(scheduler):
+    recorder = Recorder(); tx = scheduler(recorder)
+    tx.schedule("a", "A", 10)
+    time.sleep(0.5)
+    times = recorder.times("A")
+    assert 45 <= len(times) <= 51
+    # Échéance k = première émission + k périodes : ni dérive cumulée, ni rafale.
+    # Médiane stricte, maximum large : une préemption ponctuelle de la machine ne fait pas échouer le test.
+    offsets = sorted(abs(t - (times[0] + k * 0.010)) for k, t in enumerate(times))
+    assert offsets[len(offsets) // 2] < 0.002 and offsets[-1] < 0.02
+    assert min(b - a for a, b in zip(times, times[1:])) > 0.0005
+
+
+def test_entries_due_together_share_a_batch(scheduler):
+    recorder = Recorder(); tx = scheduler(recorder)
+    # Planifiées coup sur coup, les deux entrées ont leurs échéances dans la même BATCH_WINDOW.
+    tx.schedule("a", "A", 20, start_delay_ms=30); tx.schedule("b", "B", 20, start_delay_ms=30)
+    time.sleep(0.2)
+    batches = [msgs for _, msgs in recorder.batches]
+    assert len(batches) >= 5
+    assert all(sorted(msgs) == ["A", "B"] for msgs in batches)
+
+
+def test_cancel_update_and_clear(scheduler):
+    recorder = Recorder(); tx = scheduler(recorder)
+    tx.schedule("a", "A", 5); tx.schedule("b", "B", 5)
+    time.sleep(0.05)
+    tx.cancel("a"); cancelled_at = time.perf_counter()
+    tx.update_message("b", "B2"); updated_at = time.perf_counter()
+    time.sleep(0.05)
+    assert recorder.times("A") and max(recorder.times("A")) < cancelled_at
+    assert all(t < updated_at for t in recorder.times("B"))
+    assert len(recorder.times("B2")) >= 5
+    assert tx.is_active()
+    tx.clear(); cleared_at = time.perf_counter()
+    time.sleep(0.03)
+    assert not tx.is_active()
+    assert all(t < cleared_at + 0.001 for t, _ in recorder.batches)
+
+
+def test_late_send_skips_missed_cycles(scheduler):
+    # Le 3e envoi bloque 4,5 périodes : les cycles perdus sont comptés, pas rattrapés en rafale.
+    recorder = Recorder(delays={3: 0.045}); tx = scheduler(recorder)
+    start = time.perf_counter(); tx.schedule("a", "A", 10)
+    time.sleep(0.2)
+    tx.stop()
+    times = [t - start for t in recorder.times("A")]
+    # Une seule émission en retard à la fin du blocage, puis retour sur la grille d'origine.
+    assert len([t for t in times if times[2] + 0.005 < t < times[2] + 0.045]) == 0
+    assert len([t for t in times if times[2] + 0.045 <= t < 0.069]) == 1
+    deviations = sorted(abs(t - round(t / 0.010) * 0.010) for t in times[4:])
+    assert deviations[len(deviations) // 2] < 0.002
+    reports = []
+    tx.stats_updated.connect(reports.append); tx._report()
+    assert reports[0]["a"]["missed"] >= 3
+    assert reports[0]["a"]["sent"] == len(times)
@@ -0,0 +1,81 @@
+import os
+import random
+
+import pytest
+
+from frame_store import FLAG_ERROR, FLAG_EXTENDED, FLAG_REMOTE
+from trace_log import index_path, iter_trace, write_trace_file
+from vector_formats import convert_frames, iter_frames, iter_vector_log
+
+
+def sample_frames(count=5000, seed=5, start=1_700_000_000.0):
+    """Trames standard, étendues, remote et d'erreur à horodatages absolus croissants."""
+    rng = random.Random(seed); frames = []
+    for k in range(count):
+        timestamp = start + k * 0.0013; kind = rng.random()
+        extended = rng.random() < 0.3; frame_id = rng.randrange(1 << 29) if extended else rng.randrange(0x800)
+        flags = FLAG_EXTENDED if extended else 0
+        if kind < 0.01: frames.append((timestamp, 0, 0, FLAG_ERROR, b""))
+        elif kind < 0.05: frames.append((timestamp, frame_id, rng.randrange(9), flags | FLAG_REMOTE, b""))
+        else:
+            dlc = rng.randrange(9); frames.append((timestamp, frame_id, dlc, flags, bytes(rng.randrange(256) for _ in range(dlc))))
+    return frames
+
+
+def assert_same_frames(read, frames, tolerance=1e-5):
+    assert [frame[1:] for frame in read] == [frame[1:] for frame in frames]
+    assert all(abs(a[0] - b[0]) < tolerance for a, b in zip(read, frames))
+
+
+@pytest.mark.parametrize("suffix", [".asc", ".blf"])
+def test_vector_round_trip(tmp_path, suffix):
+    frames = sample_frames(); path = str(tmp_path / f"log{suffix}")
+    assert convert_frames(iter(frames), path) == len(frames)
+    assert_same_frames(list(iter_vector_log(path)), frames)
+
+
+def test_conversion_chain(tmp_path):
+    frames = sample_frames()
+    source = str(tmp_path / "capture.cltrace"); write_trace_file(source, frames)
+    asc, blf, back = (str(tmp_path / name) for name in ("log.asc", "log.blf", "back.cltrace"))
+    assert convert_frames(iter_frames(source), asc) == len(frames)
+    assert convert_frames(iter_frames(asc), blf) == len(frames)
+    assert convert_frames(iter_frames(blf), back) == len(frames)
+    assert_same_frames(list(iter_trace(back)), frames)
+    assert os.path.exists(index_path(back))
+
+
+def test_text_export(tmp_path):
+    frames = [frame for frame in sample_frames(2000) if not frame[3] & FLAG_EXTENDED or frame[1] > 0xFFF]
+    asc = str(tmp_path / "log.asc"); convert_frames(iter(frames), asc)
+    csv = str(tmp_path / "rx_tracer.csv")
+    assert convert_frames(iter_frames(asc), csv, start_time=frames[0][0]) == len(frames)
+    stats = {}
+    read = list(iter_frames(csv, stats))
+    assert stats.get('skipped', 0) == 0
+    assert [frame[1:] for frame in read] == [frame[1:] for frame in frames]
+    assert all(abs(a[0] - (b[0] - frames[0][0])) < 1e-3 for a, b in zip(read, frames))
+
+
+@pytest.mark.parametrize("suffix", [".asc", ".blf", ".cltrace", ".csv"])
+def test_cancel_removes_output(tmp_path, suffix):
+    path = str(tmp_path / f"log{suffix}"); progress = []
+    assert convert_frames(iter(sample_frames(20000)), path, progress.append, lambda: True) is None
+    assert progress and not os.path.exists(path) and not os.path.exists(index_path(path))
+
+
+def test_unknown_destination(tmp_path):
+    with pytest.raises(ValueError):
+        convert_frames(iter(sample_frames(10)), str(tmp_path / "log.mf4"))
+    assert not os.path.exists(tmp_path / "log.mf4")
+
+
+def test_conversion_job(tmp_path):
+    pytest.importorskip("PyQt6")
+    from trace_jobs import TraceConversionJob
+    frames = sample_frames(1000); source = str(tmp_path / "log.blf"); convert_frames(iter(frames), source)
+    job = TraceConversionJob(source, str(tmp_path / "capture.cltrace")); completed = []
+    job.completed.connect(completed.append)
+    job.run()
+    assert completed == [len(frames)]
+    assert_same_frames(list(iter_trace(str(tmp_path / "capture.cltrace"))), frames)
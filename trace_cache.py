@@ -0,0 +1,74 @@
+import hashlib
+import os
+from trace_log import index_path, TRACE_SUFFIX
+
+# Incrémenter lorsque le format des traces converties change : toutes les anciennes entrées deviennent invalides.
+CACHE_FORMAT = 1
+DEFAULT_CACHE_DIR = os.environ.get("CANLAB_TRACE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".canlab", "trace_cache")
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class TraceCache:
+    """Cache disque des journaux (ASC, BLF, exports TXT/CSV) convertis en .cltrace pour "Open Trace".
+
+    Une entrée est identifiée par le chemin absolu, la taille et la date de modification du fichier source :
+    toute modification produit une nouvelle clé. Le journal n'est pas relu pour calculer la clé. La
+    conversion écrit dans un fichier temporaire, renommé par commit() une fois complet. Le dossier est
+    borné à 'max_bytes' en supprimant les entrées les moins récemment utilisées."""
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, path) -> str:
+        stat = os.stat(path)
+        return hashlib.sha256(f"{CACHE_FORMAT}|{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + TRACE_SUFFIX)
+
+    def lookup(self, key):
+        """Chemin de la trace convertie pour 'key', ou None si elle n'est pas en cache."""
+        path = self._entry_path(key)
+        if not os.path.isfile(path): return None
+        try: os.utime(path) # Marque l'entrée comme récemment utilisée pour la politique LRU.
+        except OSError: pass
+        return path
+
+    def pending_path(self, key):
+        """Destination temporaire de la conversion (le dossier du cache est créé si besoin)."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return f"{self._entry_path(key)}.{os.getpid()}.tmp{TRACE_SUFFIX}"
+
+    def commit(self, key, pending):
+        """Publie la conversion terminée sous sa clé et renvoie son chemin ('pending' si le renommage échoue)."""
+        path = self._entry_path(key)
+        try:
+            os.replace(index_path(pending), index_path(path)); os.replace(pending, path)
+        except OSError as e:
+            print(f"Avertissement : impossible d'enregistrer la trace convertie dans le cache : {e}")
+            return pending
+        self.prune(keep=path)
+        return path
+
+    def discard(self, pending):
+        for leftover in (pending, index_path(pending)): self._remove(leftover)
+
+    def prune(self, keep=None):
+        """Supprime les entrées les moins récemment utilisées jusqu'à repasser sous 'max_bytes' ('keep' est épargnée)."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(TRACE_SUFFIX) or ".tmp" in name: continue
+            path = os.path.join(self.cache_dir, name)
+            try: stat = os.stat(path); size = stat.st_size + (os.path.getsize(index_path(path)) if os.path.exists(index_path(path)) else 0)
+            except OSError: continue
+            entries.append((stat.st_mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            if path == keep: continue
+            self.discard(path); total -= size
+
+    @staticmethod
+    def _remove(path):
+        try: os.remove(path)
+        except OSError: pass
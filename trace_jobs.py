@@ -0,0 +1,73 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from vector_formats import convert_frames, iter_frames
+import bulk_decoder
+
+
+class TraceConversionJob(QThread):
+    """Conversion de trace en arrière-plan : lit 'source' (chemin d'un fichier de trace, ou itérable de
+    tuples FrameStore tel qu'un FrameSnapshot) et écrit 'destination' au format de son extension.
+    'start_time' et 'name_of' ne servent qu'aux exports TXT/CSV (voir vector_formats.convert_frames).
+
+    'progress' publie le nombre de trames écrites ; 'completed' le total à la fin (rien si annulé)."""
+    progress = pyqtSignal(int)
+    completed = pyqtSignal(int)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, source, destination, dbc_hash=None, parent=None, start_time=0.0, name_of=None):
+        super().__init__(parent)
+        self.source = source
+        self.destination = destination
+        self.dbc_hash = dbc_hash
+        self.start_time = start_time
+        self.name_of = name_of
+        self.read_stats = {'skipped': 0}
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        frames = iter_frames(self.source, self.read_stats) if isinstance(self.source, str) else self.source
+        try:
+            written = convert_frames(frames, self.destination, self.progress.emit, lambda: self._cancelled, self.dbc_hash,
+                                     self.start_time, self.name_of)
+        except Exception as e:
+            self.error_occurred.emit(str(e)); return
+        finally:
+            if hasattr(self.source, 'close'): self.source.close()
+        if written is not None: self.completed.emit(written)
+
+
+class SignalExportJob(QThread):
+    """Décodage en arrière-plan de tout un FrameSnapshot avec la base cantools 'db', enregistré en .npz
+    (voir bulk_decoder). 'progress' publie le nombre de trames lues ; 'completed' le nombre de signaux
+    exportés (rien si annulé). 'message_count' donne ensuite le nombre de messages décodés."""
+    progress = pyqtSignal(int)
+    completed = pyqtSignal(int)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, snapshot, db, destination, parent=None):
+        super().__init__(parent)
+        self.source = snapshot
+        self.db = db
+        self.destination = destination
+        self.message_count = 0
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            arrays = bulk_decoder.snapshot_to_arrays(self.source, self.progress.emit, lambda: self._cancelled)
+            if arrays is None: return
+            timestamps, ids, flags, payloads = arrays
+            decoded = bulk_decoder.decode_trace(timestamps, ids, payloads, self.db, flags)
+            if self._cancelled: return
+            bulk_decoder.save_npz(self.destination, decoded)
+        except Exception as e:
+            self.error_occurred.emit(str(e)); return
+        finally:
+            self.source.close()
+        self.message_count = len(decoded)
+        self.completed.emit(sum(len(columns) - 1 for columns in decoded.values()))
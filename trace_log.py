@@ -0,0 +1,334 @@
+"""Journal de trace binaire natif de CANLab (.cltrace).
+
+Fichier de trace : un en-tête de 64 octets suivi d'enregistrements de taille fixe, ajoutés à la fin.
+    En-tête : MAGIC (8) | VERSION (2) | TAILLE D'ENREGISTREMENT (2) | PAS D'INDEX (4) |
+              DATE DE CRÉATION (double) | SHA-256 du DBC (32, zéros si aucun) | réservé
+    Enregistrement : frame_store.RECORD (timestamp double, ID, DLC, flags, 8 octets de données)
+L'enregistrement n se trouve donc à l'offset HEADER_SIZE + n * RECORD_SIZE.
+
+Index clairsemé (fichier voisin '<trace>.idx') : un en-tête MAGIC (8) puis, tous les 'PAS D'INDEX'
+enregistrements, le couple (timestamp, numéro d'enregistrement). Il permet d'aller à un instant
+donné sans parcourir la trace ; il peut être reconstruit depuis la trace s'il manque.
+"""
+import bisect
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from frame_store import FLAG_EXTENDED, FLAG_REMOTE, FLAG_ERROR, RECORD, RECORD_SIZE, PAYLOAD_SIZE, message_flags
+
+TRACE_MAGIC = b"CANLTRC1"
+INDEX_MAGIC = b"CANLIDX1"
+TRACE_VERSION = 1
+TRACE_SUFFIX = ".cltrace"
+INDEX_SUFFIX = ".idx"
+
+HEADER = struct.Struct('<8sHHId32s')
+HEADER_SIZE = 64
+INDEX_ENTRY = struct.Struct('<dQ')
+DEFAULT_INDEX_INTERVAL = 4096
+FLUSH_INTERVAL = 0.5     # Période maximale entre deux écritures sur disque (s)
+WRITE_CHUNK = 8192       # Enregistrements écrits d'un coup au plus (reprise d'historique)
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def read_header(path):
+    """Lit l'en-tête d'une trace. Renvoie {'version', 'index_interval', 'created', 'dbc_hash'} ; ValueError si invalide."""
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE: raise ValueError("Fichier de trace tronqué")
+    magic, version, record_size, index_interval, created, dbc_hash = HEADER.unpack_from(raw)
+    if magic != TRACE_MAGIC: raise ValueError("Ce fichier n'est pas une trace CANLab")
+    if version != TRACE_VERSION or record_size != RECORD_SIZE: raise ValueError(f"Version de trace non supportée ({version})")
+    return {'version': version, 'index_interval': index_interval, 'created': created,
+            'dbc_hash': dbc_hash if any(dbc_hash) else None}
+
+
+class TraceWriter:
+    """Écrit un journal .cltrace depuis un thread dédié.
+
+    write() et write_frames() ne font que déposer les lots dans une file : le formatage binaire et les
+    écritures (un seul descripteur ouvert) se font dans le thread d'écriture, qui vide la file au plus
+    tard toutes les FLUSH_INTERVAL secondes. close() écrit ce qui reste puis ferme les fichiers.
+    write_frames() accepte un FrameSnapshot : l'historique est alors lu et écrit par le thread d'écriture."""
+    def __init__(self, path, dbc_hash=None, index_interval=DEFAULT_INDEX_INTERVAL):
+        self.path = path
+        self.index_interval = index_interval
+        self.frames_written = 0
+        self.error = None
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, 'wb')
+        self._index = open(index_path(path), 'wb')
+        self._file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, RECORD_SIZE, index_interval, time.time(),
+                                     (dbc_hash or b"")[:32].ljust(32, b"\x00")).ljust(HEADER_SIZE, b"\x00"))
+        self._index.write(INDEX_MAGIC)
+        self._thread = threading.Thread(target=self._run, name="TraceWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, msgs):
+        """Ajoute un lot de can.Message au journal."""
+        if msgs: self._queue.put((False, msgs))
+
+    def write_frames(self, frames):
+        """Ajoute des trames déjà stockées, au format (timestamp, id, dlc, flags, data) de FrameStore.
+        'frames' peut être un itérable quelconque, parcouru (puis fermé s'il a une méthode close) dans le thread d'écriture."""
+        self._queue.put((True, frames))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        pack = RECORD.pack; running = True
+        while running:
+            try: items = [self._queue.get(timeout=FLUSH_INTERVAL)]
+            except queue.Empty: continue
+            # Tout ce qui est arrivé entre-temps part dans la même écriture.
+            while True:
+                try: items.append(self._queue.get_nowait())
+                except queue.Empty: break
+            chunk = []
+            for item in items:
+                if item is None: running = False; continue
+                stored, frames = item
+                if stored:
+                    try:
+                        for timestamp, msg_id, dlc, flags, data in frames:
+                            self._record(chunk, pack(timestamp, msg_id, dlc, flags, data), timestamp)
+                            if len(chunk) == WRITE_CHUNK: self._write(chunk); chunk = []
+                    except (OSError, ValueError) as e:
+                        if self.error is None: self.error = e; print(f"Erreur de lecture de l'historique : {e}")
+                    finally:
+                        if hasattr(frames, 'close'): frames.close()
+                else:
+                    for msg in frames:
+                        self._record(chunk, pack(msg.timestamp, msg.arbitration_id, min(msg.dlc, PAYLOAD_SIZE), message_flags(msg),
+                                                 bytes(msg.data[:PAYLOAD_SIZE])), msg.timestamp)
+            self._write(chunk)
+        for handle in (self._file, self._index):
+            try: handle.close()
+            except OSError: pass
+
+    def _write(self, chunk):
+        if self.error is not None: return
+        try:
+            self._file.write(b"".join(chunk)); self._file.flush(); self._index.flush()
+        except OSError as e:
+            self.error = e; print(f"Erreur d'écriture de la trace : {e}")
+
+    def _record(self, chunk, record, timestamp):
+        if self.frames_written % self.index_interval == 0 and self.error is None:
+            try: self._index.write(INDEX_ENTRY.pack(timestamp, self.frames_written))
+            except OSError as e: self.error = e
+        chunk.append(record); self.frames_written += 1
+
+
+class TraceReader:
+    """Accès en lecture seule à une trace .cltrace projetée en mémoire (mmap).
+
+    Même interface d'accès que FrameStore (len(), frame(index)) : seules les pages réellement lues sont
+    chargées par le système, quelle que soit la taille du fichier."""
+    def __init__(self, path):
+        self.path = path
+        self.header = read_header(path)
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # Un enregistrement partiel en fin de fichier (écriture interrompue) est ignoré.
+        self.count = max(0, (size - HEADER_SIZE) // RECORD_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+        self._index = self._load_index()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self._map is not None: self._map.close(); self._map = None
+        self._file.close()
+
+    def frame(self, index):
+        """Renvoie l'enregistrement 'index' sous la forme (timestamp, id, dlc, flags, data), sans données
+        pour une trame remote (comme FrameStore.frame)."""
+        if index < 0: index += self.count
+        timestamp, msg_id, dlc, flags, payload = RECORD.unpack_from(self._map, HEADER_SIZE + index * RECORD_SIZE)
+        return timestamp, msg_id, dlc, flags, b"" if flags & FLAG_REMOTE else payload[:dlc]
+
+    def timestamp(self, index):
+        return struct.unpack_from('<d', self._map, HEADER_SIZE + index * RECORD_SIZE)[0]
+
+    def records(self):
+        """Vue NumPy (np.memmap) de tous les enregistrements, ou None si numpy n'est pas installé."""
+        import bulk_decoder # Import différé : NumPy n'est chargé que par la vue de trace (démarrage rapide de canlab_capture).
+        if bulk_decoder.np is None or not self.count: return None
+        return bulk_decoder.np.memmap(self.path, dtype=bulk_decoder.RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(self.count,))
+
+    def _load_index(self):
+        """Lit l'index clairsemé, ou le reconstruit (une lecture tous les 'PAS D'INDEX' enregistrements) s'il manque."""
+        interval = self.header['index_interval'] or DEFAULT_INDEX_INTERVAL
+        try:
+            with open(index_path(self.path), 'rb') as f:
+                raw = f.read()
+            if raw[:len(INDEX_MAGIC)] != INDEX_MAGIC: raise ValueError
+            body = raw[len(INDEX_MAGIC):]; body = body[:len(body) - len(body) % INDEX_ENTRY.size]
+            entries = [(timestamp, record) for timestamp, record in INDEX_ENTRY.iter_unpack(body) if record < self.count]
+        except (OSError, ValueError):
+            entries = [(self.timestamp(record), record) for record in range(0, self.count, interval)]
+        return [timestamp for timestamp, _ in entries], [record for _, record in entries]
+
+    def find_time(self, timestamp):
+        """Indice du premier enregistrement dont le timestamp est >= 'timestamp' (recherche dans l'index,
+        puis dichotomie dans le bloc visé) ; len(self) si la trace s'arrête avant."""
+        times, records = self._index
+        position = bisect.bisect_right(times, timestamp) - 1
+        low = records[position] if position >= 0 else 0
+        high = records[position + 1] if position + 1 < len(records) else self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp: low = middle + 1
+            else: high = middle
+        return low
+
+
+def iter_trace(path, chunk_frames=8192):
+    """Parcourt une trace .cltrace par blocs de 'chunk_frames' enregistrements (mémoire constante).
+    Produit des tuples (timestamp, id, dlc, flags, data)."""
+    read_header(path)
+    with open(path, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        while True:
+            raw = f.read(chunk_frames * RECORD_SIZE)
+            raw = raw[:len(raw) - len(raw) % RECORD_SIZE]
+            if not raw: break
+            for timestamp, msg_id, dlc, flags, payload in RECORD.iter_unpack(raw):
+                yield timestamp, msg_id, dlc, flags, b"" if flags & FLAG_REMOTE else payload[:dlc]
+
+
+TEXT_HEADERS = ("Time", "ID", "DLC", "Data", "Message Name")
+TEXT_WIDTHS = (12, 8, 3, 23)     # Largeurs fixes des colonnes de l'export TXT (le nom n'est pas complété)
+REMOTE_MARKER = "RTR"            # Colonne Data d'une trame remote, qui n'a pas de données
+ERROR_MARKER = "ERR"             # Colonne Data d'une trame d'erreur
+
+
+def _hex_byte(token):
+    try: return len(token) <= 2 and 0 <= int(token, 16) <= 0xFF
+    except ValueError: return False
+
+
+def iter_text_trace(path, stats=None):
+    """Parcourt ligne à ligne un export 'rx_tracer' TXT ou CSV de CANLab (mêmes tuples que iter_trace).
+
+    Les temps de l'export (relatifs au début de l'acquisition) deviennent les timestamps ; un ID de plus
+    de 3 chiffres hexadécimaux est considéré comme étendu. Une trame remote a "RTR" dans la colonne
+    Data, ou rien avec un DLC non nul (exports antérieurs) ; une trame d'erreur a "ERR". Les lignes illisibles sont comptées dans
+    stats['skipped'] si 'stats' est fourni."""
+    csv_format = path.lower().endswith('.csv')
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line_number, line in enumerate(f):
+            fields = line.rstrip('\r\n').split(';') if csv_format else line.split()
+            try:
+                timestamp = float(fields[0]); id_text = fields[1].strip(); dlc = int(fields[2])
+                data_tokens = fields[3].split() if csv_format else fields[3:3 + max(dlc, 1)]
+                if not 0 <= dlc <= PAYLOAD_SIZE: raise ValueError
+                if data_tokens[:1] == [ERROR_MARKER]:
+                    flags = FLAG_ERROR; data = b""
+                elif data_tokens[:1] == [REMOTE_MARKER] or (dlc and not (data_tokens and _hex_byte(data_tokens[0]))):
+                    flags = FLAG_REMOTE; data = b""
+                else:
+                    flags = 0; data = bytes(int(token, 16) for token in data_tokens[:dlc])
+                    if len(data) != dlc: raise ValueError
+                msg_id = int(id_text, 16)
+            except (ValueError, IndexError):
+                # La première ligne est l'en-tête de colonnes.
+                if line_number and stats is not None: stats['skipped'] = stats.get('skipped', 0) + 1
+                continue
+            yield timestamp, msg_id, dlc, flags | (FLAG_EXTENDED if len(id_text) > 3 else 0), data
+
+
+def iter_any_trace(path, stats=None):
+    """Parcourt une trace .cltrace ou un export TXT/CSV selon l'extension du fichier."""
+    if path.lower().endswith(('.txt', '.csv')): return iter_text_trace(path, stats)
+    return iter_trace(path)
+
+
+class TextTraceWriter:
+    """Export 'rx_tracer' TXT ou CSV écrit en flux, relisible par iter_text_trace.
+
+    Les colonnes du TXT ont une largeur fixe (TEXT_WIDTHS) : aucune passe préalable sur les données n'est
+    nécessaire. Les temps sont relatifs à 'start_time' ; 'name_of(id)' fournit le nom de message DBC."""
+    def __init__(self, path, start_time=0.0, name_of=None):
+        self.path = path
+        self.start_time = start_time
+        self.name_of = name_of
+        self.frames_written = 0
+        self.csv = path.lower().endswith('.csv')
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._file.write(self._line(TEXT_HEADERS))
+
+    def _line(self, fields):
+        if self.csv: return ";".join(fields) + "\n"
+        return "  ".join([field.ljust(width) for field, width in zip(fields, TEXT_WIDTHS)] + [fields[-1]]).rstrip() + "\n"
+
+    def write_frames(self, frames):
+        """Ajoute des trames au format (timestamp, id, dlc, flags, data) de FrameStore."""
+        start, name_of, line = self.start_time, self.name_of, self._line; lines = []
+        for timestamp, msg_id, dlc, flags, data in frames:
+            data_text = ERROR_MARKER if flags & FLAG_ERROR else REMOTE_MARKER if flags & FLAG_REMOTE else data.hex(' ').upper()
+            lines.append(line((f"{timestamp - start:.3f}", f"{msg_id:X}", str(dlc), data_text, name_of(msg_id) if name_of else "")))
+        self._file.write("".join(lines)); self.frames_written += len(lines)
+
+    def write(self, msgs):
+        """Ajoute un lot de can.Message."""
+        self.write_frames([(msg.timestamp, msg.arbitration_id, min(msg.dlc, PAYLOAD_SIZE), message_flags(msg),
+                            bytes(msg.data[:PAYLOAD_SIZE])) for msg in msgs])
+
+    def close(self):
+        self._file.close()
+
+
+def write_trace_file(destination, frames, dbc_hash=None, progress=None, is_cancelled=None):
+    """Écrit en flux les tuples (timestamp, id, dlc, flags, data) de 'frames' dans une trace .cltrace et son index.
+
+    'progress(trames écrites)' est appelé tous les 8192 enregistrements et 'is_cancelled()' consulté au
+    même rythme. Renvoie le nombre de trames écrites, ou None si l'écriture a été annulée."""
+    pack = RECORD.pack; written = 0; chunk = []
+    with open(destination, 'wb') as out, open(index_path(destination), 'wb') as index:
+        out.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, RECORD_SIZE, DEFAULT_INDEX_INTERVAL, time.time(),
+                              (dbc_hash or b"")[:32].ljust(32, b"\x00")).ljust(HEADER_SIZE, b"\x00"))
+        index.write(INDEX_MAGIC)
+        for timestamp, msg_id, dlc, flags, data in frames:
+            if written % DEFAULT_INDEX_INTERVAL == 0: index.write(INDEX_ENTRY.pack(timestamp, written))
+            chunk.append(pack(timestamp, msg_id, dlc, flags, data)); written += 1
+            if len(chunk) == 8192:
+                out.write(b"".join(chunk)); chunk = []
+                if progress: progress(written)
+                if is_cancelled and is_cancelled(): return None
+        out.write(b"".join(chunk))
+    return written
+
+
+def write_text_trace(destination, frames, start_time=0.0, name_of=None, progress=None, is_cancelled=None):
+    """Écrit en flux les tuples de 'frames' dans un export 'rx_tracer' TXT ou CSV (voir TextTraceWriter), par
+    blocs de 8192 trames. Mêmes rappels et même valeur de retour que write_trace_file."""
+    writer = TextTraceWriter(destination, start_time, name_of); chunk = []
+    try:
+        for frame in frames:
+            chunk.append(frame)
+            if len(chunk) == 8192:
+                writer.write_frames(chunk); chunk = []
+                if progress: progress(writer.frames_written)
+                if is_cancelled and is_cancelled(): return None
+        writer.write_frames(chunk)
+    finally: writer.close()
+    return writer.frames_written
+
+
+def import_text_trace(source, destination, progress=None):
+    """Convertit un export 'rx_tracer' TXT ou CSV de CANLab en trace .cltrace, en flux.
+    Renvoie (trames importées, lignes ignorées)."""
+    stats = {'skipped': 0}
+    imported = write_trace_file(destination, iter_text_trace(source, stats), progress=progress)
+    return imported, stats['skipped']
@@ -0,0 +1,100 @@
+import math
+import time
+import can
+from PyQt6.QtCore import QThread, pyqtSignal
+from frame_store import FLAG_EXTENDED, FLAG_REMOTE, FLAG_ERROR
+from trace_log import iter_any_trace
+from tx_scheduler import SPIN_WINDOW, BATCH_WINDOW
+
+START_DELAY = 0.05       # Marge avant la première trame (s)
+MAX_SLEEP = 0.05         # Durée maximale d'une attente, pour rester réactif à stop()
+
+
+class ReplayStats:
+    """Écart entre l'instant d'émission visé et l'instant réel, cumulé sur tout le rejeu."""
+    __slots__ = ("sent", "skipped", "errors", "late_sum", "late_sq_sum", "late_max")
+
+    def __init__(self):
+        self.sent = 0; self.skipped = 0; self.errors = 0
+        self.late_sum = 0.0; self.late_sq_sum = 0.0; self.late_max = 0.0
+
+    def as_dict(self):
+        mean = self.late_sum / self.sent if self.sent else 0.0
+        variance = max(0.0, self.late_sq_sum / self.sent - mean * mean) if self.sent else 0.0
+        return {'sent': self.sent, 'skipped': self.skipped, 'errors': self.errors,
+                'mean_ms': mean * 1000, 'std_ms': math.sqrt(variance) * 1000, 'max_ms': self.late_max * 1000}
+
+
+class TraceReplayer(QThread):
+    """Rejoue une trace (.cltrace, ou export TXT/CSV du Tracer) sur le bus en respectant ses écarts temporels.
+
+    Le fichier est lu en flux. Chaque trame a une échéance absolue : début + (t - t0) / speed, donc un
+    retard ponctuel ne se reporte pas sur la suite. Les trames dues ensemble partent en un seul appel à
+    'send_batch'. 'id_filter(arbitration_id) -> bool' sélectionne les trames à rejouer. Les statistiques
+    de retard sont publiées toutes les 'report_interval_ms' via 'stats_updated' (voir ReplayStats)."""
+    stats_updated = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, path, send_batch, speed=1.0, id_filter=None, report_interval_ms=500, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.send_batch = send_batch
+        self.speed = speed if speed > 0 else 1.0
+        self.id_filter = id_filter
+        self.report_interval = report_interval_ms / 1000.0
+        self.stats = ReplayStats()
+        self.read_stats = {'skipped': 0}
+        self._is_running = True
+
+    def stop(self):
+        self._is_running = False
+        self.wait()
+
+    def _frames(self):
+        """Trames à rejouer sous la forme (timestamp, can.Message), filtrées au fil de la lecture."""
+        id_filter = self.id_filter
+        for timestamp, msg_id, dlc, flags, data in iter_any_trace(self.path, self.read_stats):
+            if flags & FLAG_ERROR or (id_filter is not None and not id_filter(msg_id)):
+                self.stats.skipped += 1; continue
+            yield timestamp, can.Message(arbitration_id=msg_id, is_extended_id=bool(flags & FLAG_EXTENDED),
+                                         is_remote_frame=bool(flags & FLAG_REMOTE), dlc=dlc,
+                                         data=None if flags & FLAG_REMOTE else data)
+
+    def run(self):
+        stats = self.stats; speed = self.speed
+        next_report = time.perf_counter() + self.report_interval
+        origin = start = None; pending = None
+        try:
+            frames = self._frames()
+            while self._is_running:
+                if pending is None:
+                    pending = next(frames, None)
+                    if pending is None: break
+                timestamp, msg = pending
+                if origin is None: origin = timestamp; start = time.perf_counter() + START_DELAY
+                deadline = start + (timestamp - origin) / speed
+                now = time.perf_counter()
+                if deadline - now > SPIN_WINDOW:
+                    time.sleep(min(MAX_SLEEP, deadline - now - SPIN_WINDOW))
+                else:
+                    while time.perf_counter() < deadline: time.sleep(0)
+                    # Regroupe les trames dues dans la même fenêtre.
+                    batch = [(deadline, msg)]; pending = None
+                    while (pending := next(frames, None)) is not None:
+                        next_deadline = start + (pending[0] - origin) / speed
+                        if next_deadline > deadline + BATCH_WINDOW: break
+                        batch.append((next_deadline, pending[1]))
+                    now = time.perf_counter()
+                    if self.send_batch([msg for _, msg in batch]):
+                        for frame_deadline, _ in batch:
+                            lateness = max(0.0, now - frame_deadline)
+                            stats.sent += 1; stats.late_sum += lateness; stats.late_sq_sum += lateness * lateness
+                            stats.late_max = max(stats.late_max, lateness)
+                    else:
+                        stats.errors += len(batch)
+                    if pending is None: break
+                if time.perf_counter() >= next_report:
+                    self.stats_updated.emit(stats.as_dict()); next_report = time.perf_counter() + self.report_interval
+        except (OSError, ValueError) as e:
+            self.error_occurred.emit(f"Replay error: {e}")
+        self.stats_updated.emit(stats.as_dict())
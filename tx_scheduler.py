@@ -0,0 +1,138 @@
+import heapq
+import math
+import time
+from PyQt6.QtCore import QThread, pyqtSignal, QMutex, QMutexLocker, QWaitCondition
+
+# En dessous de cette avance sur l'échéance, le thread n'attend plus sur la condition (granularité de
+# l'OS) mais cède la main en boucle jusqu'à l'instant exact.
+SPIN_WINDOW = 0.002
+# Les entrées dont l'échéance tombe dans cette fenêtre partent dans le même lot.
+BATCH_WINDOW = 0.0002
+
+
+class _Entry:
+    """Trame périodique planifiée, avec ses statistiques de retard depuis le dernier rapport."""
+    __slots__ = ("msg", "period", "generation", "fired", "sent", "late_sum", "late_sq_sum", "late_max", "missed")
+
+    def __init__(self, msg, period, generation):
+        self.msg = msg; self.period = period; self.generation = generation
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.fired = 0; self.sent = 0; self.late_sum = 0.0; self.late_sq_sum = 0.0; self.late_max = 0.0; self.missed = 0
+
+
+class TxScheduler(QThread):
+    """Ordonnanceur des émissions périodiques, hors du thread GUI.
+
+    Les échéances sont absolues (échéance suivante = échéance précédente + période) : un réveil tardif
+    ne décale pas les émissions suivantes. Les trames dues ensemble sont transmises en un seul appel à
+    'send_batch'. Le nombre d'envois et la gigue par clé sont publiés toutes les 'report_interval_ms'
+    via 'stats_updated' : {clé: {'sent', 'mean_ms', 'std_ms', 'max_ms', 'missed'}}."""
+    stats_updated = pyqtSignal(dict)
+
+    def __init__(self, send_batch, report_interval_ms=500, parent=None):
+        super().__init__(parent)
+        self.send_batch = send_batch
+        self.report_interval = report_interval_ms / 1000.0
+        self.mutex = QMutex(); self.wakeup = QWaitCondition()
+        self._is_running = True
+        self._heap = []          # (échéance, séquence, clé, génération)
+        self._entries = {}
+        self._sequence = 0; self._generation = 0
+
+    def schedule(self, key, msg, period_ms, start_delay_ms=0):
+        """Planifie (ou replanifie) l'émission périodique de 'msg' sous la clé 'key'."""
+        with QMutexLocker(self.mutex):
+            self._generation += 1
+            entry = _Entry(msg, period_ms / 1000.0, self._generation)
+            self._entries[key] = entry
+            self._push(time.perf_counter() + start_delay_ms / 1000.0, key, entry)
+            self.wakeup.wakeAll()
+
+    def update_message(self, key, msg):
+        """Remplace la trame d'une entrée planifiée sans toucher à son cadencement."""
+        with QMutexLocker(self.mutex):
+            if (entry := self._entries.get(key)) is not None and msg is not None: entry.msg = msg
+
+    def cancel(self, key):
+        with QMutexLocker(self.mutex):
+            self._entries.pop(key, None) # L'élément du tas devient obsolète et sera ignoré.
+
+    def clear(self):
+        with QMutexLocker(self.mutex):
+            self._entries.clear(); self._heap.clear()
+
+    def is_active(self):
+        with QMutexLocker(self.mutex): return bool(self._entries)
+
+    def stop(self):
+        with QMutexLocker(self.mutex):
+            self._is_running = False
+            self.wakeup.wakeAll()
+        self.wait()
+
+    def _push(self, deadline, key, entry):
+        self._sequence += 1
+        heapq.heappush(self._heap, (deadline, self._sequence, key, entry.generation))
+
+    def _next_deadline(self):
+        """Renvoie la prochaine échéance valide (en purgeant les entrées annulées), ou None."""
+        while self._heap:
+            deadline, _, key, generation = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry.generation == generation: return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def run(self):
+        next_report = time.perf_counter() + self.report_interval
+        while True:
+            self.mutex.lock()
+            if not self._is_running: self.mutex.unlock(); break
+            deadline = self._next_deadline()
+            now = time.perf_counter()
+            if deadline is not None and deadline - now <= SPIN_WINDOW:
+                self.mutex.unlock()
+                while time.perf_counter() < deadline: time.sleep(0)
+                self._send_due()
+            else:
+                wait_s = (deadline - now - SPIN_WINDOW) if deadline is not None else self.report_interval
+                wait_s = min(wait_s, next_report - now)
+                if wait_s > 0: self.wakeup.wait(self.mutex, max(1, int(wait_s * 1000)))
+                self.mutex.unlock()
+            if time.perf_counter() >= next_report:
+                self._report(); next_report = time.perf_counter() + self.report_interval
+
+    def _send_due(self):
+        batch = []
+        with QMutexLocker(self.mutex):
+            now = time.perf_counter()
+            while (deadline := self._next_deadline()) is not None and deadline <= now + BATCH_WINDOW:
+                _, _, key, _ = heapq.heappop(self._heap)
+                entry = self._entries[key]
+                lateness = max(0.0, now - deadline)
+                entry.fired += 1; entry.late_sum += lateness; entry.late_sq_sum += lateness * lateness
+                entry.late_max = max(entry.late_max, lateness)
+                batch.append(entry)
+                next_deadline = deadline + entry.period
+                if next_deadline <= now:
+                    # Retard supérieur à une période : on saute les cycles perdus sans rattrapage en rafale.
+                    skipped = math.floor((now - deadline) / entry.period)
+                    entry.missed += skipped; next_deadline = deadline + (skipped + 1) * entry.period
+                self._push(next_deadline, key, entry)
+        if batch and self.send_batch([entry.msg for entry in batch]):
+            with QMutexLocker(self.mutex):
+                for entry in batch: entry.sent += 1
+
+    def _report(self):
+        stats = {}
+        with QMutexLocker(self.mutex):
+            for key, entry in self._entries.items():
+                if not entry.fired and not entry.missed: continue
+                mean = entry.late_sum / entry.fired if entry.fired else 0.0
+                variance = max(0.0, entry.late_sq_sum / entry.fired - mean * mean) if entry.fired else 0.0
+                stats[key] = {'sent': entry.sent, 'mean_ms': mean * 1000, 'std_ms': math.sqrt(variance) * 1000,
+                              'max_ms': entry.late_max * 1000, 'missed': entry.missed}
+                entry.reset_stats()
+        if stats: self.stats_updated.emit(stats)
@@ -0,0 +1,74 @@
+"""Lecture et écriture en flux des journaux Vector (ASC, BLF) et conversions entre formats de trace.
+
+Les trames circulent sous la forme des tuples (timestamp, id, dlc, flags, data) de FrameStore : une
+conversion ne garde jamais plus d'un bloc en mémoire, quelle que soit la taille du fichier."""
+import os
+import can
+from frame_store import FLAG_EXTENDED, FLAG_REMOTE, FLAG_ERROR, PAYLOAD_SIZE, message_flags
+from trace_log import iter_any_trace, write_trace_file, write_text_trace, index_path, TRACE_SUFFIX
+
+VECTOR_SUFFIXES = ('.asc', '.blf')
+PROGRESS_STEP = 8192
+
+
+def is_vector_log(path):
+    return path.lower().endswith(VECTOR_SUFFIXES)
+
+
+def iter_vector_log(path):
+    """Parcourt un journal ASC ou BLF avec les lecteurs en flux de python-can. Les horodatages sont absolus,
+    comme ceux du Tracer."""
+    reader = can.ASCReader(path, relative_timestamp=False) if path.lower().endswith('.asc') else can.BLFReader(path)
+    try:
+        for msg in reader:
+            # Une trame d'erreur ASC n'a ni ID ni type d'ID (python-can la relit comme étendue).
+            if msg.is_error_frame: yield msg.timestamp, 0, 0, FLAG_ERROR, b""; continue
+            dlc = min(msg.dlc, PAYLOAD_SIZE)
+            yield msg.timestamp, msg.arbitration_id, dlc, message_flags(msg), bytes(msg.data[:dlc])
+    finally:
+        reader.stop()
+
+
+def iter_frames(path, stats=None):
+    """Parcourt n'importe quel format de trace reconnu (.cltrace, export TXT/CSV du Tracer, ASC, BLF)."""
+    return iter_vector_log(path) if is_vector_log(path) else iter_any_trace(path, stats)
+
+
+def write_vector_log(path, frames, progress=None, is_cancelled=None):
+    """Écrit les trames dans un journal ASC ou BLF. Renvoie le nombre de trames écrites, ou None si annulé."""
+    writer = can.ASCWriter(path) if path.lower().endswith('.asc') else can.BLFWriter(path)
+    written = 0
+    try:
+        for timestamp, msg_id, dlc, flags, data in frames:
+            writer.on_message_received(can.Message(
+                timestamp=timestamp, arbitration_id=msg_id, is_extended_id=bool(flags & FLAG_EXTENDED),
+                is_remote_frame=bool(flags & FLAG_REMOTE), is_error_frame=bool(flags & FLAG_ERROR),
+                dlc=dlc, data=None if flags & FLAG_REMOTE else data))
+            written += 1
+            if written % PROGRESS_STEP == 0:
+                if progress: progress(written)
+                if is_cancelled and is_cancelled(): return None
+    finally:
+        writer.stop()
+    return written
+
+
+def convert_frames(frames, destination, progress=None, is_cancelled=None, dbc_hash=None, start_time=0.0, name_of=None):
+    """Écrit un flux de trames au format désigné par l'extension de 'destination' (.cltrace, .asc, .blf, ou
+    export .txt/.csv du Tracer avec des temps relatifs à 'start_time' et les noms de 'name_of(id)').
+    Un fichier incomplet (annulation ou erreur) est supprimé. Renvoie le nombre de trames ou None si annulé."""
+    try:
+        if is_vector_log(destination): written = write_vector_log(destination, frames, progress, is_cancelled)
+        elif destination.lower().endswith(('.txt', '.csv')): written = write_text_trace(destination, frames, start_time, name_of, progress, is_cancelled)
+        elif destination.endswith(TRACE_SUFFIX): written = write_trace_file(destination, frames, dbc_hash, progress, is_cancelled)
+        else: raise ValueError(f"Format de destination non supporté : {os.path.basename(destination)}")
+    except Exception:
+        _remove_output(destination); raise
+    if written is None: _remove_output(destination)
+    return written
+
+
+def _remove_output(path):
+    for leftover in (path, index_path(path)):
+        try: os.remove(leftover)
+        except OSError: pass